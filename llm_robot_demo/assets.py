@@ -0,0 +1,64 @@
+"""Resolved asset paths plus a page-cache warmer for the URDFs the sim loads.
+
+`warm()` reads each URDF and the meshes it references once (typically in a
+background thread at app creation), so the first `loadURDF` calls do not pay for
+cold disk reads.
+"""
+
+import functools
+import os
+import re
+import time
+from typing import Iterable
+
+import pybullet_data
+
+
+DEFAULT_ASSETS = ("plane.urdf", "franka_panda/panda.urdf", "cube_small.urdf")
+
+_MESH_RE = re.compile(r'filename\s*=\s*"([^"]+)"')
+
+
+@functools.lru_cache(maxsize=None)
+def resolve(name: str) -> str:
+    if os.path.isabs(name) and os.path.exists(name):
+        return name
+    path = os.path.join(pybullet_data.getDataPath(), name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(name)
+    return path
+
+
+@functools.lru_cache(maxsize=None)
+def referenced_files(urdf: str) -> tuple:
+    """The URDF plus every existing mesh/texture file it references."""
+    path = resolve(urdf)
+    base = os.path.dirname(path)
+    with open(path, "r", errors="ignore") as f:
+        text = f.read()
+    files = [path]
+    for ref in _MESH_RE.findall(text):
+        ref = ref.replace("package://", "")
+        candidate = ref if os.path.isabs(ref) else os.path.join(base, ref)
+        if os.path.exists(candidate):
+            files.append(candidate)
+            mtl = os.path.splitext(candidate)[0] + ".mtl"
+            if os.path.exists(mtl):
+                files.append(mtl)
+    return tuple(dict.fromkeys(files))
+
+
+def warm(names: Iterable[str] = DEFAULT_ASSETS) -> dict:
+    t0 = time.perf_counter()
+    nbytes = 0
+    nfiles = 0
+    for name in names:
+        for path in referenced_files(name):
+            with open(path, "rb") as f:
+                while True:
+                    chunk = f.read(1 << 20)
+                    if not chunk:
+                        break
+                    nbytes += len(chunk)
+            nfiles += 1
+    return {"files": nfiles, "bytes": nbytes, "ms": (time.perf_counter() - t0) * 1000.0}
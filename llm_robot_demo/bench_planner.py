@@ -0,0 +1,46 @@
+import sys
+import time
+
+import numpy as np
+
+from panda_sim import PandaSim
+from planner import MotionPlanner
+
+
+# Same waypoints as the pick/place scripts
+HOME = [0, -0.4, 0, -2.0, 0, 1.7, 0.8]
+PRE = [0.0, -0.6, 0.0, -1.8, 0.0, 1.7, 0.6]
+LIFT = [0.0, -0.5, 0.0, -1.6, 0.0, 1.5, 0.6]
+PLACE = [0.3, -0.5, 0.0, -1.7, 0.0, 1.6, 0.7]
+QUERIES = [("home->pre", HOME, PRE), ("pre->place", PRE, PLACE), ("place->home", PLACE, HOME)]
+
+
+def main():
+    trials = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    sim = PandaSim(gui=False, realtime=False)
+    sim.spawn_cube([0.55, 0.0, 0.025])
+    t0 = time.perf_counter()
+    planner = MotionPlanner(sim)
+    print(f"planner setup {1000 * (time.perf_counter() - t0):.1f} ms")
+
+    for name, a, b in QUERIES:
+        ms, waypoints = [], []
+        for k in range(trials):
+            sim.teleport(a, sim.get_finger_positions(), None if sim.cube_id is None else
+                         dict(zip(("pos", "orn_xyzw"), sim.get_cube_pose())))
+            res = planner.plan(sim, b, seed=k)
+            if res["ok"]:
+                ms.append(res["total_ms"])
+                waypoints.append(len(res["path"]))
+        ms = np.array(ms)
+        if len(ms) == 0:
+            print(f"{name:12s} no solution in {trials} trials")
+            continue
+        print(f"{name:12s} ok {len(ms)}/{trials}  p50 {np.percentile(ms, 50):7.2f} ms  "
+              f"p95 {np.percentile(ms, 95):7.2f} ms  first {ms[0]:7.2f} ms  "
+              f"waypoints {np.mean(waypoints):.1f}")
+    print("collision cache:", planner.checker.stats())
+
+
+if __name__ == "__main__":
+    main()
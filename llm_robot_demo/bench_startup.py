@@ -0,0 +1,64 @@
+"""Cold-start timings for server.py, each run in a fresh interpreter.
+
+    python bench_startup.py [runs] [--out analysis/startup.jsonl]
+
+Reports the time to import the module (the app is created at import), to answer the
+first request (which creates the simulator) and a second one, plus the server's own
+/startup breakdown. Each run is appended as one JSON line so regressions can be tracked.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+_CHILD = r"""
+import json, time
+t0 = time.perf_counter()
+import server
+t1 = time.perf_counter()
+client = server.app.test_client()
+client.get("/state")
+t2 = time.perf_counter()
+client.get("/state")
+t3 = time.perf_counter()
+print(json.dumps({"import_server_ms": (t1 - t0) * 1e3, "first_request_ms": (t2 - t1) * 1e3,
+                  "warm_request_ms": (t3 - t2) * 1e3, "server": client.get("/startup").get_json()}))
+"""
+
+
+def run_once() -> dict:
+    env = dict(os.environ, PYBULLET_GUI="0", SIM_EAGER="0")
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", _CHILD], cwd=os.path.dirname(os.path.abspath(__file__)),
+                         env=env, capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - t0) * 1e3
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("runs", type=int, nargs="?", default=5)
+    ap.add_argument("--out", default=os.path.join("analysis", "startup.jsonl"))
+    args = ap.parse_args()
+
+    results = [run_once() for _ in range(args.runs)]
+    for key in ("import_server_ms", "first_request_ms", "warm_request_ms", "process_ms"):
+        ms = np.array([r[key] for r in results])
+        print(f"{key:18s} p50 {np.percentile(ms, 50):8.1f} ms  min {ms.min():8.1f} ms")
+    print("server breakdown (last run):", results[-1]["server"])
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "a") as f:
+            for r in results:
+                f.write(json.dumps({"time": time.time(), **r}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import requests
+
+from uds_client import UDSClient
+
+
+BASE = "http://127.0.0.1:5001"
+
+
+def timeit(fn, n: int):
+    fn()  # warm-up
+    out = []
+    for _ in range(n):
+        t = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t) * 1000.0)
+    return np.array(out)
+
+
+def summary(ms: np.ndarray) -> str:
+    return f"p50 {np.percentile(ms, 50):7.2f} ms  p95 {np.percentile(ms, 95):7.2f} ms"
+
+
+def main():
+    # Both transports run the same sim operation per row: raw finger move (no latching),
+    # and a real render + PNG write + manifest record per snapshot (render cache off)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    s = requests.Session()
+    H = {"Content-Type": "application/json"}
+    q = s.get(f"{BASE}/state").json()["joints"]
+    snap = os.path.join(tempfile.gettempdir(), "bench_snapshot.png")
+
+    rest = {
+        "state": lambda: s.get(f"{BASE}/state").json(),
+        "movej": lambda: s.post(f"{BASE}/movej", headers=H, data=json.dumps({"targets": q, "duration": 0.01})).json(),
+        "gripper": lambda: s.post(f"{BASE}/gripper_raw", headers=H, data=json.dumps({"width": 0.08})).json(),
+        "snapshot": lambda: s.post(f"{BASE}/snapshot", headers=H,
+                                   data=json.dumps({"path": snap})).json(),
+    }
+    cache = s.get(f"{BASE}/render_cache").json()["enabled"]
+    s.post(f"{BASE}/render_cache", json={"enabled": False}).raise_for_status()
+    try:
+        with UDSClient() as c:
+            uds = {
+                "state": c.state,
+                "movej": lambda: c.movej(q, 0.01),
+                "gripper": lambda: c.gripper_raw(0.08),
+                "snapshot": lambda: c.snapshot(snap),
+            }
+            for op in rest:
+                # snapshots dominate with rendering; fewer iterations keep the run short
+                k = max(10, n // 10) if op == "snapshot" else n
+                r = timeit(rest[op], k)
+                u = timeit(uds[op], k)
+                print(f"{op:9s} REST {summary(r)} | UDS {summary(u)} | speedup x{np.median(r) / np.median(u):.1f}")
+    finally:
+        s.post(f"{BASE}/render_cache", json={"enabled": cache})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+import json
+import math
+import os
+import shutil
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pybullet as p
+
+
+class Camera:
+    """A fixed virtual camera with its view/projection matrices computed once."""
+
+    def __init__(
+        self,
+        name: str,
+        target: List[float],
+        distance: float,
+        yaw: float,
+        pitch: float,
+        roll: float = 0.0,
+        fov: float = 60.0,
+        near: float = 0.01,
+        far: float = 3.0,
+        width: int = 640,
+        height: int = 480,
+    ):
+        self.name = name
+        self.target = list(target)
+        self.distance = distance
+        self.yaw = yaw
+        self.pitch = pitch
+        self.roll = roll
+        self.fov = fov
+        self.near = near
+        self.far = far
+        self.width = width
+        self.height = height
+        self.view_matrix = p.computeViewMatrixFromYawPitchRoll(
+            cameraTargetPosition=self.target,
+            distance=distance,
+            yaw=yaw,
+            pitch=pitch,
+            roll=roll,
+            upAxisIndex=2,
+        )
+        self.proj_matrix = p.computeProjectionMatrixFOV(
+            fov=fov, aspect=width / height, nearVal=near, farVal=far
+        )
+
+    def intrinsics(self) -> np.ndarray:
+        # Pinhole K for the OpenGL projection; `fov` is the vertical field of view
+        fy = 0.5 * self.height / math.tan(math.radians(self.fov) * 0.5)
+        return np.array([
+            [fy, 0.0, 0.5 * self.width],
+            [0.0, fy, 0.5 * self.height],
+            [0.0, 0.0, 1.0],
+        ])
+
+    def extrinsics(self) -> np.ndarray:
+        # World -> camera (OpenGL convention: x right, y up, looking down -z)
+        return np.array(self.view_matrix, dtype=float).reshape(4, 4).T
+
+    def position(self) -> np.ndarray:
+        # Camera center in world coordinates
+        ext = self.extrinsics()
+        return -ext[:3, :3].T @ ext[:3, 3]
+
+    def projection(self) -> np.ndarray:
+        return np.array(self.proj_matrix, dtype=float).reshape(4, 4).T
+
+    def linearize_depth(self, depth_buffer: np.ndarray) -> np.ndarray:
+        # OpenGL z-buffer [0, 1] -> metric distance along the optical axis
+        n, f = self.near, self.far
+        return (f * n / (f - (f - n) * depth_buffer)).astype(np.float32)
+
+    def meta(self) -> dict:
+        return {
+            "name": self.name,
+            "width": self.width,
+            "height": self.height,
+            "fov": self.fov,
+            "near": self.near,
+            "far": self.far,
+            "intrinsics": self.intrinsics().tolist(),
+            "extrinsics": self.extrinsics().tolist(),
+            "projection": self.projection().tolist(),
+        }
+
+
+CAMERAS: Dict[str, Camera] = {
+    "default": Camera("default", target=[0.4, 0.0, 0.2], distance=1.1, yaw=45, pitch=-30),
+    # Imaging-station views of the work area in front of the robot
+    "top": Camera("top", target=[0.55, 0.0, 0.0], distance=0.6, yaw=90, pitch=-89.9),
+    "side": Camera("side", target=[0.55, 0.0, 0.05], distance=0.7, yaw=0, pitch=-15),
+}
+
+
+def get_camera(name: str = "default") -> Camera:
+    if name not in CAMERAS:
+        raise KeyError(f"unknown camera '{name}' (known: {sorted(CAMERAS)})")
+    return CAMERAS[name]
+
+
+class Lighting:
+    """TinyRenderer light setup passed to getCameraImage; None fields keep PyBullet's defaults."""
+
+    def __init__(
+        self,
+        name: str,
+        direction: Optional[List[float]] = None,
+        color: Optional[List[float]] = None,
+        distance: Optional[float] = None,
+        ambient: Optional[float] = None,
+        diffuse: Optional[float] = None,
+        specular: Optional[float] = None,
+        shadows: bool = False,
+    ):
+        self.name = name
+        self.direction = direction
+        self.color = color
+        self.distance = distance
+        self.ambient = ambient
+        self.diffuse = diffuse
+        self.specular = specular
+        self.shadows = shadows
+
+    def kwargs(self) -> dict:
+        out = {"shadow": int(self.shadows)}
+        for key, val in (("lightDirection", self.direction), ("lightColor", self.color),
+                         ("lightDistance", self.distance), ("lightAmbientCoeff", self.ambient),
+                         ("lightDiffuseCoeff", self.diffuse), ("lightSpecularCoeff", self.specular)):
+            if val is not None:
+                out[key] = list(val) if isinstance(val, (list, tuple)) else float(val)
+        return out
+
+    def key(self) -> tuple:
+        # Render-cache key part: two setups with the same parameters share frames
+        return tuple((k, tuple(v) if isinstance(v, list) else v) for k, v in sorted(self.kwargs().items()))
+
+    def meta(self) -> dict:
+        return {"name": self.name, **self.kwargs()}
+
+
+# getCameraImage keyword -> Lighting field, to rebuild a setup from its meta()
+_LIGHT_FIELDS = {"lightDirection": "direction", "lightColor": "color", "lightDistance": "distance",
+                 "lightAmbientCoeff": "ambient", "lightDiffuseCoeff": "diffuse", "lightSpecularCoeff": "specular"}
+
+
+def lighting_from_meta(meta: dict) -> Lighting:
+    """The Lighting a capture record's `lighting` (Lighting.meta()) was rendered with."""
+    fields = {_LIGHT_FIELDS[k]: v for k, v in meta.items() if k in _LIGHT_FIELDS}
+    return Lighting(meta.get("name", "custom"), shadows=bool(meta.get("shadow", 0)), **fields)
+
+
+LIGHTINGS: Dict[str, Lighting] = {
+    "default": Lighting("default"),
+    "white_top": Lighting("white_top", direction=[0, 0, 1], color=[1, 1, 1], ambient=0.4, diffuse=0.6,
+                          specular=0.2, shadows=True),
+    # Low-angle light: raised components and solder defects cast long shadows
+    "grazing": Lighting("grazing", direction=[1, 0, 0.15], color=[1, 1, 1], ambient=0.2, diffuse=0.8,
+                        specular=0.4, shadows=True),
+    "red": Lighting("red", direction=[0, 0, 1], color=[1, 0.1, 0.1], ambient=0.3, diffuse=0.7),
+    "green": Lighting("green", direction=[0, 0, 1], color=[0.1, 1, 0.1], ambient=0.3, diffuse=0.7),
+    "blue": Lighting("blue", direction=[0, 0, 1], color=[0.1, 0.1, 1], ambient=0.3, diffuse=0.7),
+}
+
+
+def get_lighting(spec) -> Lighting:
+    """A preset name, a Lighting, or a dict of Lighting fields (name optional)."""
+    if isinstance(spec, Lighting):
+        return spec
+    if isinstance(spec, str):
+        if spec not in LIGHTINGS:
+            raise KeyError(f"unknown lighting '{spec}' (known: {sorted(LIGHTINGS)})")
+        return LIGHTINGS[spec]
+    if isinstance(spec, dict):
+        spec = dict(spec)
+        return Lighting(spec.pop("name", "custom"), **spec)
+    raise TypeError(f"cannot make a lighting from {type(spec).__name__}")
+
+
+class Frame:
+    """All buffers of one getCameraImage call; arrays are materialized on first use."""
+
+    def __init__(self, camera: Camera, img):
+        self.camera = camera
+        self.width, self.height = img[0], img[1]
+        self._img = img
+        # Files this frame was already written to, so a cache hit can link instead of re-encode
+        self.written: Dict[tuple, tuple] = {}
+        self._rgb = None
+        self._depth = None
+        self._seg = None
+
+    @property
+    def rgb(self) -> np.ndarray:
+        if self._rgb is None:
+            rgba = np.asarray(self._img[2], dtype=np.uint8).reshape((self.height, self.width, 4))
+            self._rgb = np.ascontiguousarray(rgba[:, :, :3])
+        return self._rgb
+
+    @property
+    def depth_buffer(self) -> np.ndarray:
+        return np.asarray(self._img[3], dtype=np.float32).reshape((self.height, self.width))
+
+    @property
+    def depth(self) -> np.ndarray:
+        if self._depth is None:
+            self._depth = self.camera.linearize_depth(self.depth_buffer)
+        return self._depth
+
+    @property
+    def seg(self) -> np.ndarray:
+        # Body unique id per pixel, -1 for background
+        if self._seg is None:
+            self._seg = np.asarray(self._img[4], dtype=np.int32).reshape((self.height, self.width))
+        return self._seg
+
+
+class RenderCache:
+    """Last frame per camera, keyed by a scene fingerprint; a hit skips the render.
+
+    `hits`/`misses` count snapshot traffic; live-preview renders are counted apart so
+    they don't skew those numbers.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.preview_hits = 0
+        self.preview_misses = 0
+        self._entries: Dict[tuple, tuple] = {}
+
+    def get(self, key: tuple, fingerprint, preview: bool = False) -> Optional[Frame]:
+        entry = self._entries.get(key)
+        hit = self.enabled and entry is not None and entry[0] == fingerprint
+        if preview:
+            self.preview_hits += hit
+            self.preview_misses += not hit
+        else:
+            self.hits += hit
+            self.misses += not hit
+        return entry[1] if hit else None
+
+    def put(self, key: tuple, fingerprint, frame: Frame):
+        if self.enabled:
+            self._entries[key] = (fingerprint, frame)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "preview": {"hits": self.preview_hits, "misses": self.preview_misses},
+        }
+
+
+def _clear(dst: str):
+    # Never write through a hard link shared with an earlier frame
+    if os.path.lexists(dst):
+        os.unlink(dst)
+
+
+def _signature(path: str):
+    # Detects files replaced since we wrote them (e.g. by another camera's frame)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _reuse(frame: Frame, key: tuple, dst: str) -> bool:
+    """Hard-link (or copy) an identical file written earlier for this frame."""
+    entry = frame.written.get(key)
+    if entry is None or _signature(entry[0]) != entry[1]:
+        return False
+    src = entry[0]
+    if os.path.abspath(src) != os.path.abspath(dst):
+        _clear(dst)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+    return True
+
+
+DEPTH_PNG_SCALE = 0.001  # metres per unit in 16-bit depth PNGs
+
+
+def _write(frame: Frame, key: tuple, dst: str, write):
+    if not _reuse(frame, key, dst):
+        _clear(dst)
+        write(dst)
+    frame.written[key] = (dst, _signature(dst))
+
+
+def save_frame(frame: Frame, path: str, modalities: Iterable[str] = ("rgb",), depth_format: str = "npz") -> dict:
+    """Write the requested modalities of one render next to `path`; returns {kind: file}.
+
+    Files already written for the same frame (render-cache hits) are hard-linked.
+
+    depth_format "npz": depth (float32 metres) and/or seg (int32 ids) plus camera
+    intrinsics/extrinsics in one compressed `<stem>.npz`.
+    depth_format "png16": `<stem>_depth.png` (uint16 millimetres), `<stem>_seg.png`
+    (uint16 body id + 1, 0 = background) and `<stem>_camera.json`.
+    """
+    modalities = set(modalities)
+    unknown = modalities - {"rgb", "depth", "seg"}
+    if unknown:
+        raise ValueError(f"unknown modalities {sorted(unknown)}")
+    if depth_format not in ("npz", "png16"):
+        raise ValueError("depth_format must be 'npz' or 'png16'")
+    from PIL import Image  # deferred: only frame writers need it
+
+    stem = os.path.splitext(path)[0]
+    out = {}
+    if "rgb" in modalities:
+        _write(frame, ("rgb",), path, lambda dst: Image.fromarray(frame.rgb, mode="RGB").save(dst))
+        out["rgb"] = path
+    if not modalities & {"depth", "seg"}:
+        return out
+    meta = frame.camera.meta()
+    if depth_format == "npz":
+        arrays = {
+            "intrinsics": np.array(meta["intrinsics"]),
+            "extrinsics": np.array(meta["extrinsics"]),
+            "projection": np.array(meta["projection"]),
+            "near_far": np.array([meta["near"], meta["far"]]),
+        }
+        if "depth" in modalities:
+            arrays["depth"] = frame.depth
+        if "seg" in modalities:
+            arrays["seg"] = frame.seg
+        out["npz"] = stem + ".npz"
+        _write(frame, ("npz", tuple(sorted(arrays))), out["npz"], lambda dst: np.savez_compressed(dst, **arrays))
+    else:
+        if "depth" in modalities:
+            out["depth"] = stem + "_depth.png"
+            _write(frame, ("depth_png",), out["depth"], lambda dst: Image.fromarray(
+                np.clip(np.round(frame.depth / DEPTH_PNG_SCALE), 0, 65535).astype(np.uint16)).save(dst))
+        if "seg" in modalities:
+            out["seg"] = stem + "_seg.png"
+            _write(frame, ("seg_png",), out["seg"], lambda dst: Image.fromarray(
+                np.clip(frame.seg + 1, 0, 65535).astype(np.uint16)).save(dst))
+        meta["depth_scale"] = DEPTH_PNG_SCALE
+        out["camera"] = stem + "_camera.json"
+        with open(out["camera"], "w") as f:
+            json.dump(meta, f, indent=2)
+    return out
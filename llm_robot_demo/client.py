@@ -21,6 +21,21 @@ def movej(targets: List[float], duration: float = 2.0, base: str = "http://127.0
     return r.json()
 
 
+def servo(setpoints, base: str = "http://127.0.0.1:5001", delay: float = 0.05):
+    """Stream setpoints ({"t", "q"} or {"t", "pos", "orn"} dicts, any iterable, e.g. a
+    generator producing them live) over one chunked NDJSON request, then stop the servo."""
+    requests.post(f"{base}/servo/start", json={"delay": delay}).raise_for_status()
+    lines = (json.dumps(sp).encode() + b"\n" for sp in setpoints)
+    r = requests.post(f"{base}/servo/setpoints", data=lines, headers={"Content-Type": "application/x-ndjson"})
+    r.raise_for_status()
+    result = r.json()
+    # Let the queued tail play out before stopping
+    while requests.get(f"{base}/servo/status").json()["queued"]:
+        time.sleep(0.05)
+    result["stats"] = requests.post(f"{base}/servo/stop").json()
+    return result
+
+
 if __name__ == "__main__":
     print("Current joints:", get_state())
     demo_pose = [0.0, -0.3, 0.0, -1.8, 0.0, 1.6, 0.7]
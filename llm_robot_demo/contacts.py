@@ -0,0 +1,135 @@
+"""Contact-based grasp detection and a server-side event queue.
+
+ContactMonitor runs as a sim step hook. For every registered object it checks
+`p.getContactPoints` against each finger link and the object's support contacts,
+and emits timestamped events instead of clients polling `/poses` with distance
+thresholds:
+
+    contact_made / contact_lost   a finger link touches / stops touching the object
+    grasp_stable                  both fingers in contact for `stable_steps` (or rigidly attached)
+    object_dropped                held object lost all finger contact while unsupported
+    object_placed                 released object at rest on a support for `settle_steps`
+"""
+
+import threading
+from collections import deque
+from typing import Dict, List
+
+import numpy as np
+import pybullet as p
+
+
+class EventQueue:
+    """Bounded, sequence-numbered event log; clients fetch everything after a `seq`."""
+
+    def __init__(self, maxlen: int = 10000):
+        self._events = deque(maxlen=maxlen)
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def emit(self, kind: str, **fields) -> dict:
+        with self._cond:
+            self._seq += 1
+            event = {"seq": self._seq, "type": kind, **fields}
+            self._events.append(event)
+            self._cond.notify_all()
+        return event
+
+    def since(self, seq: int = 0, timeout: float = 0.0) -> List[dict]:
+        """Events with seq > `seq`, waiting up to `timeout` seconds for the first one."""
+        with self._cond:
+            if timeout > 0:
+                self._cond.wait_for(lambda: self._seq > seq, timeout=timeout)
+            return [e for e in self._events if e["seq"] > seq]
+
+
+class _Tracked:
+    def __init__(self, name: str):
+        self.name = name
+        self.fingers = set()
+        self.both_steps = 0
+        self.rest_steps = 0
+        self.state = "free"  # free -> held -> released/falling -> free
+
+
+class ContactMonitor:
+    def __init__(self, sim, events: EventQueue, stable_steps: int = 12, settle_steps: int = 48,
+                 rest_speed: float = 0.01):
+        self.sim = sim
+        self.events = events
+        self.stable_steps = stable_steps
+        self.settle_steps = settle_steps
+        self.rest_speed = rest_speed
+        self.objects: Dict[int, _Tracked] = {}
+
+    def register(self, body: int, name: str):
+        self.objects[body] = _Tracked(name)
+
+    def unregister(self, body: int):
+        self.objects.pop(body, None)
+
+    def fingers_touching(self, body: int) -> int:
+        tracked = self.objects.get(body)
+        return len(tracked.fingers) if tracked else 0
+
+    def is_held(self, body: int) -> bool:
+        tracked = self.objects.get(body)
+        return tracked is not None and tracked.state == "held"
+
+    def _emit(self, kind: str, body: int, tracked: _Tracked, **fields):
+        sim = self.sim
+        self.events.emit(kind, t=sim.now(), step=sim.step_count, sim_time=sim.sim_time(),
+                         object=tracked.name, body=body, **fields)
+
+    def on_step(self, sim):
+        panda = sim.panda
+        fingers = sim.finger_joint_indices
+        for body, tr in list(self.objects.items()):
+            touching = {f for f in fingers if p.getContactPoints(bodyA=panda, bodyB=body, linkIndexA=f)}
+            for f in touching - tr.fingers:
+                self._emit("contact_made", body, tr, finger=f)
+            for f in tr.fingers - touching:
+                self._emit("contact_lost", body, tr, finger=f)
+            tr.fingers = touching
+
+            attached = sim.attached_body() == body
+            tr.both_steps = tr.both_steps + 1 if fingers and len(touching) == len(fingers) else 0
+            gripped = attached or tr.both_steps >= self.stable_steps
+
+            if tr.state != "held":
+                if gripped:
+                    tr.state = "held"
+                    tr.rest_steps = 0
+                    self._emit("grasp_stable", body, tr, attached=attached)
+                elif tr.state in ("released", "falling"):
+                    self._track_rest(body, tr, panda)
+                continue
+
+            if touching or attached:
+                continue
+            if self._supports(body, panda):
+                tr.state = "released"
+            else:
+                tr.state = "falling"
+                self._emit("object_dropped", body, tr, pos=list(p.getBasePositionAndOrientation(body)[0]))
+
+    def _supports(self, body: int, panda: int) -> List[int]:
+        return sorted({c[2] for c in p.getContactPoints(bodyA=body) if c[2] != panda})
+
+    def _track_rest(self, body: int, tr: _Tracked, panda: int):
+        lin, ang = p.getBaseVelocity(body)
+        supports = self._supports(body, panda)
+        if supports and np.linalg.norm(lin) < self.rest_speed and np.linalg.norm(ang) < 10 * self.rest_speed:
+            tr.rest_steps += 1
+        else:
+            tr.rest_steps = 0
+        if tr.rest_steps >= self.settle_steps:
+            if tr.state == "released":
+                self._emit("object_placed", body, tr, pos=list(p.getBasePositionAndOrientation(body)[0]),
+                           support=supports)
+            tr.state = "free"
+            tr.rest_steps = 0
@@ -0,0 +1,250 @@
+"""Pack capture runs into sharded datasets and stream them back.
+
+    python dataset.py write frames/manifest.jsonl frames_grab --out datasets/pp --shard-size 500
+    python dataset.py read datasets/pp --limit 5
+
+Each shard is a plain tar of samples grouped by key (WebDataset layout), written by a
+pool of processes, one shard per task:
+
+    <key>.png          RGB frame, copied byte for byte (no re-encode)
+    <key>.json         state: joints, fingers, gripper width, EE/cube poses, tags, timing
+    <key>.depth.npy    float32 metres      (if the capture saved depth)
+    <key>.seg.npy      int32 body ids      (if the capture saved segmentation)
+
+`index.json` lists the shards with sample counts and sizes plus per-tag counts. Frames a
+manifest names but that are not on disk are counted and reported; a shard that ends up
+empty is an error.
+`ShardReader` streams shards sequentially (tarfile stream mode, never the whole set in
+memory), shuffles shard order per epoch and samples through a bounded shuffle buffer, and
+can split shards across data-loader workers/ranks.
+"""
+
+import argparse
+import glob
+import io
+import json
+import os
+import random
+import tarfile
+import time
+from collections import Counter
+from multiprocessing import Pool
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from manifest import read_manifest, resolve_path
+
+
+STATE_KEYS = ("t", "step", "sim_time", "joints", "fingers", "gripper_width", "grasped", "ee", "cube",
+              "tags", "camera", "lighting")
+
+
+def collect(sources: List[str]) -> List[dict]:
+    """Records from manifests, or bare frames (no state) from directories without one."""
+    records = []
+    for src in sources:
+        if os.path.isdir(src) and os.path.exists(os.path.join(src, "manifest.jsonl")):
+            src = os.path.join(src, "manifest.jsonl")
+        if os.path.isdir(src):
+            recs = [{"frame": f} for f in sorted(glob.glob(os.path.join(src, "*.png")))]
+        else:
+            recs = read_manifest(src)
+            for r in recs:
+                r["frame"] = resolve_path(r["frame"], src)
+                if "files" in r:
+                    r["files"] = {k: resolve_path(v, src) if isinstance(v, str) else v
+                                  for k, v in r["files"].items()}
+        for k, r in enumerate(recs):
+            r["key"] = f"{len(records) + k:08d}"
+            r["source"] = src
+        records.extend(recs)
+    return records
+
+
+def _add(tar: tarfile.TarFile, name: str, data: bytes):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    tar.addfile(info, io.BytesIO(data))
+
+
+def _npy_bytes(arr: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    np.save(buf, arr)
+    return buf.getvalue()
+
+
+def _write_shard(args) -> dict:
+    path, records, with_depth, with_seg = args
+    tags = Counter()
+    written = 0
+    missing = []
+    tmp = path + ".tmp"
+    with tarfile.open(tmp, "w") as tar:
+        for r in records:
+            if not os.path.exists(r["frame"]):
+                missing.append(r["frame"])
+                continue
+            key = r["key"]
+            with open(r["frame"], "rb") as f:
+                _add(tar, f"{key}.png", f.read())
+            state = {k: r[k] for k in STATE_KEYS if k in r}
+            state["frame"] = os.path.basename(r["frame"])
+            _add(tar, f"{key}.json", json.dumps(state, separators=(",", ":")).encode())
+            npz = r.get("files", {}).get("npz")
+            if npz and os.path.exists(npz) and (with_depth or with_seg):
+                with np.load(npz) as z:
+                    if with_depth and "depth" in z.files:
+                        _add(tar, f"{key}.depth.npy", _npy_bytes(z["depth"]))
+                    if with_seg and "seg" in z.files:
+                        _add(tar, f"{key}.seg.npy", _npy_bytes(z["seg"]))
+            tags.update(state.get("tags", []))
+            written += 1
+    os.replace(tmp, path)
+    return {"name": os.path.basename(path), "samples": written, "bytes": os.path.getsize(path), "tags": tags,
+            "missing": missing}
+
+
+def write_dataset(sources: List[str], out_dir: str, shard_size: int = 500, workers: Optional[int] = None,
+                  with_depth: bool = True, with_seg: bool = True) -> dict:
+    records = collect(sources)
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = [(os.path.join(out_dir, f"shard-{i // shard_size:05d}.tar"), records[i:i + shard_size],
+              with_depth, with_seg) for i in range(0, len(records), shard_size)]
+    with Pool(processes=workers or os.cpu_count()) as pool:
+        shards = pool.map(_write_shard, tasks)
+    tags = Counter()
+    missing = []
+    for s in shards:
+        tags.update(s.pop("tags"))
+        lost = s.pop("missing")
+        s["missing"] = len(lost)
+        missing.extend(lost)
+    empty = [s["name"] for s in shards if not s["samples"]]
+    if empty:
+        raise RuntimeError(f"{len(empty)} shard(s) have no samples ({', '.join(empty[:3])}); "
+                           f"{len(missing)} frame(s) not found, e.g. {missing[:3]}")
+    index = {
+        "version": 1,
+        "created": time.time(),
+        "sources": [os.path.abspath(s) for s in sources],
+        "shard_size": shard_size,
+        "samples": sum(s["samples"] for s in shards),
+        "missing": len(missing),
+        "bytes": sum(s["bytes"] for s in shards),
+        "tags": dict(tags),
+        "shards": shards,
+    }
+    with open(os.path.join(out_dir, "index.json"), "w") as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+def _decode(name: str, data: bytes):
+    if name.endswith(".json"):
+        return json.loads(data)
+    if name.endswith(".npy"):
+        return np.load(io.BytesIO(data))
+    if name.endswith(".png"):
+        from PIL import Image
+        return np.asarray(Image.open(io.BytesIO(data)).convert("RGB"))
+    return data
+
+
+class ShardReader:
+    """Iterates samples {"key", "state", "rgb", ["depth"], ["seg"]} from a written dataset."""
+
+    def __init__(self, path: str, shuffle: bool = True, buffer: int = 256, seed: int = 0,
+                 rank: int = 0, world: int = 1, decode: bool = True):
+        self.path = path
+        with open(os.path.join(path, "index.json")) as f:
+            self.index = json.load(f)
+        self.shards = [s["name"] for s in self.index["shards"]][rank::world]
+        self.shuffle = shuffle
+        self.buffer = buffer
+        self.decode = decode
+        self.epoch = 0
+        self.seed = seed
+
+    def __len__(self) -> int:
+        names = set(self.shards)
+        return sum(s["samples"] for s in self.index["shards"] if s["name"] in names)
+
+    def _samples(self, shards: List[str]) -> Iterator[dict]:
+        for name in shards:
+            sample, key = {}, None
+            with tarfile.open(os.path.join(self.path, name), "r|") as tar:
+                for member in tar:
+                    k, field = member.name.split(".", 1)
+                    if k != key and sample:
+                        yield sample
+                        sample = {}
+                    key = k
+                    data = tar.extractfile(member).read()
+                    field = {"png": "rgb", "json": "state", "depth.npy": "depth", "seg.npy": "seg"}.get(field, field)
+                    sample["key"] = k
+                    sample[field] = _decode(member.name, data) if self.decode else data
+            if sample:
+                yield sample
+
+    def __iter__(self) -> Iterator[dict]:
+        rng = random.Random(self.seed + self.epoch)
+        self.epoch += 1
+        shards = list(self.shards)
+        if not self.shuffle:
+            yield from self._samples(shards)
+            return
+        rng.shuffle(shards)
+        # Bounded shuffle buffer: memory stays at `buffer` samples however large the dataset
+        buf = []
+        for sample in self._samples(shards):
+            if len(buf) < self.buffer:
+                buf.append(sample)
+                continue
+            i = rng.randrange(len(buf))
+            yield buf[i]
+            buf[i] = sample
+        rng.shuffle(buf)
+        yield from buf
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Write or read sharded capture datasets")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    w = sub.add_parser("write")
+    w.add_argument("sources", nargs="+", help="manifest.jsonl files or frame directories")
+    w.add_argument("--out", required=True)
+    w.add_argument("--shard-size", type=int, default=500)
+    w.add_argument("--workers", type=int, default=None)
+    w.add_argument("--no-depth", action="store_true")
+    w.add_argument("--no-seg", action="store_true")
+    r = sub.add_parser("read")
+    r.add_argument("path")
+    r.add_argument("--limit", type=int, default=10)
+    r.add_argument("--no-shuffle", action="store_true")
+    args = ap.parse_args()
+
+    if args.cmd == "write":
+        t0 = time.perf_counter()
+        index = write_dataset(args.sources, args.out, args.shard_size, args.workers,
+                              not args.no_depth, not args.no_seg)
+        print(f"wrote {index['samples']} samples in {len(index['shards'])} shards "
+              f"({index['bytes'] / 1e6:.1f} MB) to {os.path.abspath(args.out)} "
+              f"in {time.perf_counter() - t0:.1f}s; tags {index['tags']}")
+        if index["missing"]:
+            print(f"warning: {index['missing']} frame(s) listed in the manifest were not found")
+        return
+    reader = ShardReader(args.path, shuffle=not args.no_shuffle)
+    t0 = time.perf_counter()
+    n = 0
+    for sample in reader:
+        if n < args.limit:
+            state = sample.get("state", {})
+            print(sample["key"], sample["rgb"].shape, state.get("frame"), state.get("tags", []))
+        n += 1
+    print(f"read {n}/{len(reader)} samples in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""Shared-memory ring of rendered frames for local consumers.
+
+The sim publishes RGB (and optionally depth) into a `multiprocessing.shared_memory`
+segment; other processes on the same machine attach by name and read the buffers as
+NumPy views, with no encoding, copying or files in between.
+
+Layout (little endian), one fixed-size slot per frame:
+
+    ring header   64 B   magic, version, slots, height, width, has_depth, published count
+    slot header   64 B   seq, frame index, step, sim_time, height, width
+    rgb                  u8  [height, width, 3]
+    depth                f32 [height, width]          (only if has_depth)
+
+Overwrite policy: the writer never waits. Frame n goes to slot n % slots, so a reader
+more than `slots - 1` frames behind loses the oldest ones. Each slot carries a sequence
+lock (odd while being written, 2n + 2 once frame n is complete); readers check it before
+and after touching the buffers, and `FrameView.valid()` tells whether a zero-copy view was
+overwritten while in use. `RingReader.next()` skips ahead and counts what it missed.
+"""
+
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+from typing import Iterator, Optional
+
+import numpy as np
+
+
+MAGIC = 0x46524E47  # "FRNG"
+VERSION = 1
+HEADER = struct.Struct("<IIIIIIQ")  # magic, version, slots, height, width, has_depth, published
+HEADER_SIZE = 64
+SLOT = struct.Struct("<QQdII")  # index, step, sim_time, height, width (after the u64 seq)
+SLOT_HEADER_SIZE = 64
+
+
+def _slot_bytes(height: int, width: int, has_depth: bool) -> int:
+    n = SLOT_HEADER_SIZE + height * width * 3 + (height * width * 4 if has_depth else 0)
+    return (n + 63) // 64 * 64
+
+
+class _Ring:
+    def __init__(self, shm: shared_memory.SharedMemory):
+        self.shm = shm
+        self.buf = shm.buf
+        magic, version, self.slots, self.height, self.width, has_depth, _ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{shm.name} is not a frame ring (v{VERSION})")
+        self.has_depth = bool(has_depth)
+        self.slot_bytes = _slot_bytes(self.height, self.width, self.has_depth)
+        self._seq = []
+        self._rgb = []
+        self._depth = []
+        hw = self.height * self.width
+        for k in range(self.slots):
+            off = HEADER_SIZE + k * self.slot_bytes
+            self._seq.append(np.ndarray((1,), np.uint64, self.buf, off))
+            self._rgb.append(np.ndarray((self.height, self.width, 3), np.uint8, self.buf, off + SLOT_HEADER_SIZE))
+            if self.has_depth:
+                self._depth.append(np.ndarray((self.height, self.width), np.float32, self.buf,
+                                              off + SLOT_HEADER_SIZE + hw * 3))
+        self._published = np.ndarray((1,), np.uint64, self.buf, HEADER.size - 8)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def published(self) -> int:
+        return int(self._published[0])
+
+    def close(self):
+        # Views must go before the mapping can be closed
+        self._seq = self._rgb = self._depth = []
+        self._published = None
+        self.buf = None
+        self.shm.close()
+
+
+# Rings created by a writer in this process; their tracker registration belongs to the writer
+_owned = set()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # Attach without leaving the segment registered with this process's resource tracker,
+    # which would unlink it when we exit (bpo-39959); for readers and probes of a live ring
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if shm.name not in _owned:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _looks_live(shm: shared_memory.SharedMemory, wait: float) -> bool:
+    # A ring whose published count moves is being written by another process right now
+    if shm.size < HEADER.size:
+        return False
+    magic, *_, published = HEADER.unpack_from(shm.buf, 0)
+    if magic != MAGIC:
+        return False
+    time.sleep(wait)
+    return HEADER.unpack_from(shm.buf, 0)[-1] != published
+
+
+class RingWriter(_Ring):
+    """Creates the segment; owned by the simulator process.
+
+    If a segment with `name` already exists, it is left alone (FileExistsError) unless
+    `replace=True`, and even then if its published count advances within `live_wait`
+    seconds: a second writer is still using it and its readers would silently keep
+    reading the unlinked segment.
+    """
+
+    def __init__(self, name: str, height: int, width: int, slots: int = 8, depth: bool = True,
+                 replace: bool = False, live_wait: float = 0.25):
+        size = HEADER_SIZE + slots * _slot_bytes(height, width, depth)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            old = _attach(name)
+            try:
+                if _looks_live(old, live_wait):
+                    raise FileExistsError(f"frame ring {name!r} is being written by another process")
+                if not replace:
+                    raise FileExistsError(f"shared memory {name!r} already exists; pass replace=True "
+                                          f"if it is left over from a crashed run")
+            finally:
+                old.close()
+            # Left over from a crashed run: a tracked attach, whose unlink() also unregisters it
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        HEADER.pack_into(shm.buf, 0, MAGIC, VERSION, slots, height, width, int(depth), 0)
+        _owned.add(shm.name)
+        super().__init__(shm)
+
+    def publish(self, index: int, step: int, sim_time: float, rgb: np.ndarray,
+                depth: Optional[np.ndarray] = None) -> int:
+        """Write one frame; returns its ring sequence number (0-based)."""
+        n = self.published
+        k = n % self.slots
+        seq = self._seq[k]
+        seq[0] = 2 * n + 1  # odd: slot being rewritten
+        off = HEADER_SIZE + k * self.slot_bytes
+        SLOT.pack_into(self.buf, off + 8, index, step, sim_time, self.height, self.width)
+        self._rgb[k][...] = rgb[..., :3]
+        if self.has_depth and depth is not None:
+            self._depth[k][...] = depth
+        seq[0] = 2 * n + 2
+        self._published[0] = n + 1
+        return n
+
+    def unlink(self):
+        self.close()
+        _owned.discard(self.shm.name)
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass  # already removed, e.g. by hand or a replacing writer
+
+
+class FrameView:
+    """Zero-copy view of one ring slot; call `valid()` after using the arrays."""
+
+    def __init__(self, ring: _Ring, n: int, index: int, step: int, sim_time: float):
+        k = n % ring.slots
+        self.ring = ring
+        self.n = n
+        self.index = index
+        self.step = step
+        self.sim_time = sim_time
+        self.rgb = ring._rgb[k]
+        self.depth = ring._depth[k] if ring.has_depth else None
+
+    def valid(self) -> bool:
+        return int(self.ring._seq[self.n % self.ring.slots][0]) == 2 * self.n + 2
+
+    def copy(self) -> Optional[dict]:
+        """Owned copies of the buffers, or None if the slot was overwritten meanwhile."""
+        out = {"n": self.n, "index": self.index, "step": self.step, "sim_time": self.sim_time,
+               "rgb": self.rgb.copy(), "depth": None if self.depth is None else self.depth.copy()}
+        return out if self.valid() else None
+
+
+class RingReader(_Ring):
+    """Attaches to an existing ring by name; any number of readers per ring."""
+
+    def __init__(self, name: str):
+        super().__init__(_attach(name))
+        self.cursor = self.published
+        self.dropped = 0
+
+    def get(self, n: int) -> Optional[FrameView]:
+        """Frame `n`, or None if it is not published yet or was already overwritten."""
+        k = n % self.slots
+        if int(self._seq[k][0]) != 2 * n + 2:
+            return None
+        index, step, sim_time, _, _ = SLOT.unpack_from(self.buf, HEADER_SIZE + k * self.slot_bytes + 8)
+        view = FrameView(self, n, index, step, sim_time)
+        return view if view.valid() else None
+
+    def latest(self) -> Optional[FrameView]:
+        n = self.published
+        return self.get(n - 1) if n else None
+
+    def next(self, timeout: float = 1.0, poll: float = 0.001) -> Optional[FrameView]:
+        """The next unread frame, skipping (and counting) any that were overwritten."""
+        t_end = time.monotonic() + timeout
+        while True:
+            published = self.published
+            if published > self.cursor:
+                oldest = max(self.cursor, published - self.slots + 1)
+                self.dropped += oldest - self.cursor
+                self.cursor = oldest
+                view = self.get(oldest)
+                self.cursor += 1
+                if view is not None:
+                    return view
+                self.dropped += 1
+                continue
+            if time.monotonic() >= t_end:
+                return None
+            time.sleep(poll)
+
+    def frames(self, timeout: float = 1.0) -> Iterator[FrameView]:
+        while True:
+            view = self.next(timeout)
+            if view is None:
+                return
+            yield view
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Follow a frame ring and report throughput/drops")
+    ap.add_argument("name", nargs="?", default="panda_frames")
+    ap.add_argument("--timeout", type=float, default=5.0)
+    args = ap.parse_args()
+
+    reader = RingReader(args.name)
+    print(f"{args.name}: {reader.slots} slots of {reader.height}x{reader.width}, depth={reader.has_depth}")
+    t0, count = time.monotonic(), 0
+    for view in reader.frames(args.timeout):
+        count += 1
+        mean = float(view.rgb.mean())
+        if not view.valid():
+            reader.dropped += 1
+            continue
+        if count % 50 == 0:
+            dt = time.monotonic() - t0
+            print(f"frame {view.index} step {view.step} t={view.sim_time:.3f}s  mean {mean:.1f}  "
+                  f"{count / dt:.1f} fps  dropped {reader.dropped}")
+    print(f"read {count} frames, dropped {reader.dropped}")
+    reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 import os
 import json
 import time
-import math
 from typing import List
 
 import requests
@@ -24,13 +23,14 @@ def post(path: str, payload: dict):
     return r.json()
 
 
-def ee_cube_distance() -> float:
-    d = get("/poses")
-    ee = d["ee"]["pos"]
-    cb = d["cube"]["pos"]
-    if ee is None or cb is None:
-        return float("inf")
-    return math.sqrt(sum((a - b) ** 2 for a, b in zip(ee, cb)))
+def event_seq() -> int:
+    return get("/events?since=0")["next"]
+
+
+def grasp_detected(since: int, wait: float = 0.5) -> bool:
+    # Server-side contact monitor reports a stable two-finger grasp
+    evs = get(f"/events?since={since}&wait={wait}")["events"]
+    return any(e["type"] == "grasp_stable" and e["object"] == "cube" for e in evs)
 
 
 def snapshot(folder: str, idx: int):
@@ -70,11 +70,12 @@ def main():
     frames.append(snapshot(frames_dir, idx)); idx += 1
 
     # Close gripper without auto-attach
+    seq = event_seq()
     post("/gripper_raw", {"width": 0.0})
     frames.append(snapshot(frames_dir, idx)); idx += 1
 
-    # If very close, attach rigidly; else leave as is (no snapping)
-    if ee_cube_distance() < 0.02:
+    # If both fingers hold the cube, attach rigidly; else leave as is (no snapping)
+    if grasp_detected(seq):
         post("/force_grasp", {})
     frames.append(snapshot(frames_dir, idx)); idx += 1
 
@@ -0,0 +1,267 @@
+"""Parallel, resumable grasp-trial sweeps.
+
+    python grasp_sweep.py --set pre_dx=-0.04,-0.03,-0.02 --set approach_dz=0.0,0.01,0.02 \\
+        --set cube_y=-0.1,0,0.1 --out sweeps/offsets.jsonl --workers 8
+
+Every combination of the grid is one trial, run in a worker process on a fresh DIRECT
+PandaSim created for that trial and disconnected after it (no GUI, no realtime sleeps), so
+results do not depend on what the worker ran before: spawn the cube, go to the pre-grasp pose,
+approach, close the gripper with `force` (no snapping constraint), lift and hold. A trial
+succeeds when the contact monitor reported a stable grasp (`grasp_steps` steps with both
+fingers touching) and the cube followed the lift with a small EE-cube error.
+
+Results are appended, one JSON line per trial, to `--out` and flushed as they arrive; on
+restart trials whose id (hash of the parameters) already has a result are skipped; trials
+that raised, or whose worker died or hung past `--trial-timeout`, are logged and retried.
+Early stopping: `--target-successes` ends the sweep, and `--prune-after N` drops the
+remaining spawn poses of a gripper setting after N failures with no success.
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import queue
+import time
+from multiprocessing import Pool
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+
+HOME = [0, -0.4, 0, -2.0, 0, 1.7, 0.8]
+
+DEFAULT_GRID = {
+    # Cube spawn pose
+    "cube_x": [0.55],
+    "cube_y": [0.0],
+    "cube_yaw": [0.0],
+    # Pre-grasp and approach offsets relative to the cube center (as in grab_object_ik.py)
+    "pre_dx": [-0.03],
+    "pre_dz": [0.05],
+    "approach_dx": [-0.01],
+    "approach_dz": [0.01],
+    # Finger motor force (N) and contact steps for a stable grasp
+    "force": [20.0],
+    "grasp_steps": [12],
+    "lift": [0.1],
+}
+
+SPAWN_KEYS = ("cube_x", "cube_y", "cube_yaw")
+
+
+def trial_id(params: dict) -> str:
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def setting_of(params: dict) -> str:
+    # Gripper/offset setting a trial belongs to, independent of where the cube spawned
+    return trial_id({k: v for k, v in params.items() if k not in SPAWN_KEYS})
+
+
+def expand(grid: Dict[str, List]) -> List[dict]:
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def run_trial(params: dict) -> dict:
+    from panda_sim import PandaSim
+
+    t0 = time.perf_counter()
+    sim = PandaSim(gui=False, realtime=False)
+    try:
+        return _trial(sim, params, t0)
+    finally:
+        sim.close()
+
+
+def _trial(sim, params: dict, t0: float) -> dict:
+    import pybullet as p
+
+    sim.render_cache.enabled = False
+    s0 = sim.step_count
+    sim.movej(HOME, 0.05)
+    sim.gripper_force = float(params["force"])
+    sim.contacts.stable_steps = int(params["grasp_steps"])
+    pos = [params["cube_x"], params["cube_y"], 0.025]
+    sim.spawn_cube(pos)
+    p.resetBasePositionAndOrientation(sim.cube_id, pos, p.getQuaternionFromEuler([0, 0, params["cube_yaw"]]))
+    for _ in range(24):
+        sim.step()
+
+    cube = sim.get_cube_pose()[0]
+    sim.move_ik([cube[0] + params["pre_dx"], cube[1], cube[2] + params["pre_dz"]], None, 0.6)
+    sim.move_ik([cube[0] + params["approach_dx"], cube[1], cube[2] + params["approach_dz"]], None, 0.5)
+    seq = sim.events.last_seq
+    sim.set_gripper_width(0.0, settle=True)
+    grasped = any(e["type"] == "grasp_stable" for e in sim.events.since(seq))
+
+    z0 = sim.get_cube_pose()[0][2]
+    ee = sim.get_ee_pose()[0]
+    sim.move_ik([ee[0], ee[1], ee[2] + params["lift"]], None, 0.6)
+    for _ in range(48):
+        sim.step()
+    cube_end = np.array(sim.get_cube_pose()[0])
+    ee_end = np.array(sim.get_ee_pose()[0])
+    lifted = float(cube_end[2] - z0)
+    err = float(np.linalg.norm(ee_end - cube_end))
+    dropped = any(e["type"] == "object_dropped" for e in sim.events.since(seq))
+    return {
+        "success": bool(grasped and not dropped and lifted >= 0.8 * params["lift"] and err < 0.03),
+        "grasped": grasped,
+        "dropped": dropped,
+        "lifted": lifted,
+        "ee_cube_error": err,
+        "steps": sim.step_count - s0,
+        "wall_s": time.perf_counter() - t0,
+    }
+
+
+def _run(params: dict) -> tuple:
+    try:
+        return params, run_trial(params), None
+    except Exception as e:  # a failing trial must not take the sweep down
+        return params, None, f"{type(e).__name__}: {e}"
+
+
+def load_done(path: str) -> Dict[str, dict]:
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line from an interrupted run
+                if "result" in rec:  # errors are retried
+                    done[rec["id"]] = rec
+    return done
+
+
+def sweep(trials: Iterable[dict], out: str, workers: int = None, target_successes: int = 0,
+          prune_after: int = 0, window: int = None, trial_timeout: float = 300.0) -> dict:
+    done = load_done(out)
+    todo = [t for t in trials if trial_id(t) not in done]
+    successes = sum(1 for r in done.values() if r.get("result", {}).get("success"))
+    fails: Dict[str, int] = {}
+    wins: Dict[str, int] = {}
+    for r in done.values():
+        key = setting_of(r["params"])
+        if r.get("result", {}).get("success"):
+            wins[key] = wins.get(key, 0) + 1
+        else:
+            fails[key] = fails.get(key, 0) + 1
+    stats = {"skipped_done": len(done), "ran": 0, "pruned": 0, "errors": 0, "stopped_early": False}
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    workers = workers or os.cpu_count()
+    window = window or 2 * workers
+    results = queue.Queue()
+    with Pool(processes=workers) as pool, open(out, "a") as f:
+        pending = list(reversed(todo))
+        inflight: Dict[str, tuple] = {}  # trial id -> (params, submit time)
+        while pending or inflight:
+            # Submit lazily so pruning and early stopping take effect on trials not yet started
+            while pending and len(inflight) < window and not stats["stopped_early"]:
+                params = pending.pop()
+                key = setting_of(params)
+                if prune_after and fails.get(key, 0) >= prune_after and not wins.get(key):
+                    stats["pruned"] += 1
+                    continue
+                pool.apply_async(_run, (params,), callback=results.put,
+                                 error_callback=lambda e, params=params: results.put((params, None, repr(e))))
+                inflight[trial_id(params)] = (params, time.monotonic())
+            if not inflight:
+                break
+            try:
+                params, result, error = results.get(timeout=1.0)
+            except queue.Empty:
+                # A worker that dies takes its task with it and Pool never reports it
+                now = time.monotonic()
+                expired = [v for v in inflight.values() if now - v[1] > trial_timeout]
+                if not expired:
+                    continue
+                params, result, error = expired[0][0], None, f"timeout after {trial_timeout:.0f}s"
+            if inflight.pop(trial_id(params), None) is None:
+                continue  # finished after it was written off
+            rec = {"id": trial_id(params), "params": params, "t": time.time()}
+            if error:
+                rec["error"] = error
+                stats["errors"] += 1
+            else:
+                rec["result"] = result
+            f.write(json.dumps(rec) + "\n")
+            f.flush()
+            stats["ran"] += 1
+            key = setting_of(params)
+            if result and result["success"]:
+                successes += 1
+                wins[key] = wins.get(key, 0) + 1
+            elif result:  # errors say nothing about the setting
+                fails[key] = fails.get(key, 0) + 1
+            if target_successes and successes >= target_successes and not stats["stopped_early"]:
+                stats["stopped_early"] = True
+                pending = []
+    stats["successes"] = successes
+    return stats
+
+
+def summarize(path: str, top: int = 10) -> List[dict]:
+    """Success rate per gripper/offset setting, best first."""
+    groups: Dict[str, dict] = {}
+    for rec in load_done(path).values():
+        key = setting_of(rec["params"])
+        g = groups.setdefault(key, {"params": {k: v for k, v in rec["params"].items() if k not in SPAWN_KEYS},
+                                    "trials": 0, "successes": 0, "errors": []})
+        g["trials"] += 1
+        res = rec.get("result")
+        if res:
+            g["successes"] += int(res["success"])
+            g["errors"].append(res["ee_cube_error"])
+    rows = []
+    for g in groups.values():
+        rows.append({**g["params"], "trials": g["trials"], "success_rate": g["successes"] / g["trials"],
+                     "mean_ee_cube_error": float(np.mean(g["errors"])) if g["errors"] else None})
+    rows.sort(key=lambda r: (-r["success_rate"], r["mean_ee_cube_error"] or 1e9))
+    return rows[:top]
+
+
+def parse_grid(args) -> Dict[str, List]:
+    grid = {k: list(v) for k, v in DEFAULT_GRID.items()}
+    if args.grid:
+        with open(args.grid) as f:
+            grid.update(json.load(f))
+    for spec in args.set or []:
+        key, _, values = spec.partition("=")
+        if key not in DEFAULT_GRID:
+            raise SystemExit(f"unknown parameter {key!r} (known: {sorted(DEFAULT_GRID)})")
+        grid[key] = [type(DEFAULT_GRID[key][0])(float(v)) for v in values.split(",")]
+    return grid
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Parallel, resumable grasp parameter sweep")
+    ap.add_argument("--grid", help="JSON file {param: [values]}")
+    ap.add_argument("--set", action="append", help="param=v1,v2,... (repeatable)")
+    ap.add_argument("--out", default=os.path.join("sweeps", "grasp.jsonl"))
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--target-successes", type=int, default=0, help="stop after this many successes")
+    ap.add_argument("--prune-after", type=int, default=0, help="skip a setting after N failures, no success")
+    ap.add_argument("--trial-timeout", type=float, default=300.0, help="seconds before a trial is written off")
+    ap.add_argument("--summary", action="store_true", help="only summarize --out")
+    args = ap.parse_args()
+
+    if not args.summary:
+        trials = expand(parse_grid(args))
+        t0 = time.perf_counter()
+        stats = sweep(trials, args.out, args.workers, args.target_successes, args.prune_after,
+                      trial_timeout=args.trial_timeout)
+        print(f"{len(trials)} trials in grid: {stats['skipped_done']} already done, ran {stats['ran']} "
+              f"({stats['errors']} errors), pruned {stats['pruned']}"
+              f"{', stopped early' if stats['stopped_early'] else ''} in {time.perf_counter() - t0:.1f}s")
+    for row in summarize(args.out):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
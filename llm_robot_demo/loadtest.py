@@ -0,0 +1,186 @@
+"""Concurrent load test for the REST server.
+
+    python loadtest.py --start --clients 1,4,16 --duration 20 --mix mixed
+
+Runs one stage per client count: each client is a thread with its own HTTP session
+that picks routes from the traffic mix (weighted, seeded) back to back. Per stage it
+reports throughput, p50/p95/p99 latency and error rate per route, plus the server's
+step rate from /stats: simulated steps per wall second and physics steps per second
+of step() time, relative to the first stage. `--start` launches a headless server on
+a free port for the run; results are saved as JSON (default analysis/loadtest_<ts>.json).
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+import requests
+
+
+HOME = [0, -0.4, 0, -2.0, 0, 1.7, 0.8]
+
+# route -> weight; monitors poll state, capture scripts move and snapshot
+MIXES = {
+    "mixed": {"state": 30, "poses": 25, "movej": 15, "move_ik": 10, "snapshot": 10, "gripper": 10},
+    "monitor": {"state": 50, "poses": 50},
+    "capture": {"movej": 45, "snapshot": 45, "poses": 10},
+    "motion": {"movej": 40, "move_ik": 40, "gripper": 20},
+}
+
+
+def _request(session: requests.Session, base: str, route: str, rng: random.Random, snap_dir: str):
+    if route == "state":
+        return session.get(f"{base}/state")
+    if route == "poses":
+        return session.get(f"{base}/poses")
+    if route == "movej":
+        q = [v + rng.uniform(-0.1, 0.1) for v in HOME]
+        return session.post(f"{base}/movej", json={"targets": q, "duration": 0.05})
+    if route == "move_ik":
+        pos = [0.5 + rng.uniform(-0.05, 0.05), rng.uniform(-0.1, 0.1), 0.3 + rng.uniform(-0.05, 0.05)]
+        return session.post(f"{base}/move_ik", json={"pos": pos, "duration": 0.05, "check_reach": False})
+    if route == "snapshot":
+        path = os.path.join(snap_dir, f"lt_{threading.get_ident()}.png")
+        return session.post(f"{base}/snapshot", json={"path": path, "manifest": False})
+    if route == "gripper":
+        return session.post(f"{base}/gripper", json={"width": rng.uniform(0.02, 0.08)})
+    raise ValueError(route)
+
+
+def _client(base: str, mix: Dict[str, int], seed: int, t_end: float, snap_dir: str, out: List[tuple]):
+    rng = random.Random(seed)
+    routes, weights = list(mix), list(mix.values())
+    session = requests.Session()
+    while time.monotonic() < t_end:
+        route = rng.choices(routes, weights)[0]
+        t0 = time.perf_counter()
+        try:
+            status = _request(session, base, route, rng, snap_dir).status_code
+        except requests.RequestException:
+            status = 0
+        out.append((route, (time.perf_counter() - t0) * 1000.0, status))
+
+
+def run_stage(base: str, clients: int, duration: float, mix: Dict[str, int], seed: int = 0) -> dict:
+    results: List[List[tuple]] = [[] for _ in range(clients)]
+    s0 = requests.get(f"{base}/stats").json()
+    with tempfile.TemporaryDirectory(prefix="loadtest_") as snap_dir:
+        t0 = time.monotonic()
+        t_end = t0 + duration
+        threads = [threading.Thread(target=_client, args=(base, mix, seed * 1000 + k, t_end, snap_dir, results[k]))
+                   for k in range(clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.monotonic() - t0
+    s1 = requests.get(f"{base}/stats").json()
+
+    rows = [r for res in results for r in res]
+    routes = {}
+    for route in mix:
+        ms = np.array([r[1] for r in rows if r[0] == route])
+        errors = sum(1 for r in rows if r[0] == route and not 200 <= r[2] < 300)
+        if not len(ms):
+            continue
+        routes[route] = {
+            "count": int(len(ms)),
+            "rps": len(ms) / wall,
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p95_ms": float(np.percentile(ms, 95)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "error_rate": errors / len(ms),
+        }
+    steps = s1["step_count"] - s0["step_count"]
+    step_time = s1["step_time_s"] - s0["step_time_s"]
+    all_ms = np.array([r[1] for r in rows]) if rows else np.zeros(1)
+    return {
+        "clients": clients,
+        "duration_s": wall,
+        "requests": len(rows),
+        "rps": len(rows) / wall,
+        "p50_ms": float(np.percentile(all_ms, 50)),
+        "p99_ms": float(np.percentile(all_ms, 99)),
+        "error_rate": sum(1 for r in rows if not 200 <= r[2] < 300) / max(1, len(rows)),
+        "sim_steps": steps,
+        "sim_steps_per_wall_s": steps / wall,
+        "physics_steps_per_s": steps / step_time if step_time else 0.0,
+        "routes": routes,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(timeout: float = 60.0):
+    port = _free_port()
+    env = dict(os.environ, PORT=str(port), PYBULLET_GUI="0", SIM_EAGER="1")
+    proc = subprocess.Popen([sys.executable, "server.py"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    t_end = time.monotonic() + timeout
+    while time.monotonic() < t_end:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        try:
+            requests.get(f"{base}/stats", timeout=1.0).raise_for_status()
+            return proc, base
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not come up")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Concurrent REST load test")
+    ap.add_argument("--base", default="http://127.0.0.1:5001")
+    ap.add_argument("--start", action="store_true", help="start a local headless server for the run")
+    ap.add_argument("--clients", default="1,4,16", help="comma list, one stage each")
+    ap.add_argument("--duration", type=float, default=20.0, help="seconds per stage")
+    ap.add_argument("--mix", default="mixed", choices=sorted(MIXES))
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args()
+
+    proc, base = start_server() if args.start else (None, args.base)
+    stages = []
+    try:
+        requests.post(f"{base}/spawn_cube", json={}).raise_for_status()
+        for n in (int(c) for c in args.clients.split(",")):
+            stage = run_stage(base, n, args.duration, MIXES[args.mix], args.seed)
+            if stages and stages[0]["sim_steps_per_wall_s"]:
+                stage["step_rate_vs_first"] = stage["sim_steps_per_wall_s"] / stages[0]["sim_steps_per_wall_s"]
+            stages.append(stage)
+            print(f"{n:3d} clients  {stage['rps']:7.1f} req/s  p50 {stage['p50_ms']:7.1f} ms  "
+                  f"p99 {stage['p99_ms']:7.1f} ms  errors {100 * stage['error_rate']:.1f}%  "
+                  f"sim {stage['sim_steps_per_wall_s']:7.0f} steps/s  physics {stage['physics_steps_per_s']:7.0f} steps/s")
+            for route, r in sorted(stage["routes"].items()):
+                print(f"      {route:9s} {r['count']:6d}  {r['rps']:7.1f}/s  p50 {r['p50_ms']:7.1f}  "
+                      f"p95 {r['p95_ms']:7.1f}  p99 {r['p99_ms']:7.1f} ms  err {100 * r['error_rate']:.1f}%")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    out = args.out or os.path.join("analysis", f"loadtest_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({"mix": args.mix, "weights": MIXES[args.mix], "duration": args.duration, "stages": stages}, f,
+                  indent=2)
+    print("wrote", os.path.abspath(out))
+
+
+if __name__ == "__main__":
+    main()
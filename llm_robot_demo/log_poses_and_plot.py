@@ -1,86 +1,187 @@
+import argparse
+import io
 import os
-import csv
 import time
-import json
+from typing import Dict, List
+
+import numpy as np
 import requests
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+
+from manifest import event_times, read_manifest
 
 
 BASE = "http://127.0.0.1:5001"
 
 
-def get(path):
-    r = requests.get(f"{BASE}{path}")
+def fetch_log(base: str = BASE, every: int = 1) -> Dict[str, np.ndarray]:
+    """The server's whole pose log as NumPy columns, in one request."""
+    r = requests.get(f"{base}/pose_log_dump", params={"format": "npz", "every": every})
     r.raise_for_status()
-    return r.json()
-
-
-def main():
-    os.makedirs("analysis", exist_ok=True)
-    csv_path = os.path.join("analysis", "poses.csv")
-
-    # reset server-side log and then sample
-    requests.post(f"{BASE}/pose_log_reset")
-    rows = [("t", "ee_x", "ee_y", "ee_z", "cube_x", "cube_y", "cube_z")]
-    # sample at ~10Hz for ~10s
-    for _ in range(100):
-        d = get("/poses")
-        ee = d["ee"]["pos"] if d["ee"]["pos"] is not None else [None, None, None]
-        cb = d["cube"]["pos"] if d["cube"]["pos"] is not None else [None, None, None]
-        rows.append((d["t"], ee[0], ee[1], ee[2], cb[0], cb[1], cb[2]))
-        time.sleep(0.1)
-
-    # write CSV
-    with open(csv_path, "w", newline="") as f:
-        w = csv.writer(f)
-        w.writerows(rows)
-
-    # plot z over time (and x/y in subplots)
-    ts = [r[0] for r in rows[1:]]
-    ee_x = [r[1] for r in rows[1:]]
-    ee_y = [r[2] for r in rows[1:]]
-    ee_z = [r[3] for r in rows[1:]]
-    cb_x = [r[4] for r in rows[1:]]
-    cb_y = [r[5] for r in rows[1:]]
-    cb_z = [r[6] for r in rows[1:]]
-
-    fig, axs = plt.subplots(3, 1, figsize=(8, 8), constrained_layout=True)
-    axs[0].plot(ts, ee_x, label="ee_x")
-    axs[0].plot(ts, cb_x, label="cube_x")
-    axs[0].set_ylabel("x (m)")
-    axs[0].legend()
-
-    axs[1].plot(ts, ee_y, label="ee_y")
-    axs[1].plot(ts, cb_y, label="cube_y")
-    axs[1].set_ylabel("y (m)")
-    axs[1].legend()
-
-    axs[2].plot(ts, ee_z, label="ee_z")
-    axs[2].plot(ts, cb_z, label="cube_z")
-    axs[2].set_ylabel("z (m)")
-    axs[2].set_xlabel("time (s)")
-    axs[2].legend()
-
-    # Add GRIP/RELEASE markers for readability (approximate times)
-    grip_t = 5.6
-    rel_t = 12.0
-    for ax in axs:
-        ax.axvline(grip_t, color="#2ca02c", linestyle="--", linewidth=1.2, label="GRIP")
-        ax.axvline(rel_t, color="#d62728", linestyle="--", linewidth=1.2, label="RELEASE")
+    with np.load(io.BytesIO(r.content)) as z:
+        return {k: z[k] for k in z.files}
+
+
+def load_log(path: str) -> Dict[str, np.ndarray]:
+    with np.load(path) as z:
+        return {k: z[k] for k in z.files}
+
+
+def write_csv(path: str, cols: Dict[str, np.ndarray]):
+    table = np.column_stack([cols["t"], cols["ee"][:, :3], cols["cube"][:, :3], cols["width"], cols["held"]])
+    np.savetxt(path, table, delimiter=",", fmt="%.6f", comments="",
+               header="t,ee_x,ee_y,ee_z,cube_x,cube_y,cube_z,width,held")
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of `n_out` points chosen by Largest-Triangle-Three-Buckets.
+
+    Keeps the first and last samples and, per bucket, the point forming the largest
+    triangle with the previously kept point and the next bucket's mean, so peaks and
+    steps survive the downsampling. NaN samples are skipped.
+    """
+    valid = np.flatnonzero(np.isfinite(y))
+    n = len(valid)
+    if n_out >= n or n_out < 3:
+        return valid
+    xv, yv = x[valid], y[valid]
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Mean of each bucket is the third vertex for the bucket before it; the last point closes
+    counts = np.diff(edges)
+    mean_x = np.append(np.add.reduceat(xv[1:n - 1], edges[:-1] - 1) / counts, xv[-1])
+    mean_y = np.append(np.add.reduceat(yv[1:n - 1], edges[:-1] - 1) / counts, yv[-1])
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        cx, cy = mean_x[b + 1], mean_y[b + 1]
+        area = np.abs((xv[a] - cx) * (yv[lo:hi] - yv[a]) - (xv[a] - xv[lo:hi]) * (cy - yv[a]))
+        a = lo + int(np.argmax(area))
+        out[b + 1] = a
+    return valid[out]
+
+
+def log_records(records: List[dict], cols: Dict[str, np.ndarray], eps: float = 1e-3) -> List[dict]:
+    """Manifest records captured during this pose log.
+
+    The manifest is append-only and step counts restart with the server, so a record
+    belongs to the log only if the log has a sample at its step and the record's time
+    falls between that sample and the next one.
+    """
+    steps, t = cols["step"], cols["t"]
+    out = []
+    for r in records:
+        i = int(np.searchsorted(steps, r["step"]))
+        if i == len(steps) or steps[i] != r["step"]:
+            continue
+        t_next = t[i + 1] if i + 1 < len(t) else np.inf
+        if t[i] - eps <= r["t"] <= t_next + eps:
+            out.append(r)
+    return out
+
+
+def derived_metrics(cols: Dict[str, np.ndarray]) -> dict:
+    t, held = cols["t"], cols["held"]
+    ee = cols["ee"][:, :3].astype(np.float64)
+    dt = np.diff(t)
+    ok = dt > 0
+    speed = np.zeros(len(t))
+    speed[1:][ok] = np.linalg.norm(np.diff(ee, axis=0)[ok], axis=1) / dt[ok]
+    # Lift relative to the cube's first logged height (its resting height after a spawn)
+    z = cols["cube"][:, 2].astype(np.float64)
+    has_cube = np.isfinite(z)
+    lift = z - (z[has_cube][0] if has_cube.any() else np.nan)
+    # Grasp intervals from rising/falling edges of the `held` column
+    edges = np.diff(np.concatenate([[0], held.astype(np.int8), [0]]))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+    durations = t[ends] - t[starts]
+    return {
+        "samples": int(len(t)),
+        "duration_s": float(t[-1] - t[0]) if len(t) else 0.0,
+        "ee_speed": speed,
+        "cube_lift": lift,
+        "ee_speed_max": float(speed.max()) if len(t) else 0.0,
+        "ee_path_length": float(np.sum(speed[1:][ok] * dt[ok])),
+        "cube_lift_max": float(np.nanmax(lift)) if has_cube.any() else float("nan"),
+        "grasps": [{"start": float(t[s]), "end": float(t[e]), "duration": float(d)}
+                   for s, e, d in zip(starts, ends, durations)],
+        "grasp_time_total": float(durations.sum()),
+    }
+
+
+def plot(cols: Dict[str, np.ndarray], metrics: dict, png_path: str, points: int, events: dict):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    t = cols["t"]
+    panels = [
+        ("x (m)", [("ee_x", cols["ee"][:, 0]), ("cube_x", cols["cube"][:, 0])]),
+        ("y (m)", [("ee_y", cols["ee"][:, 1]), ("cube_y", cols["cube"][:, 1])]),
+        ("z (m)", [("ee_z", cols["ee"][:, 2]), ("cube_z", cols["cube"][:, 2])]),
+        ("speed (m/s)", [("ee_speed", metrics["ee_speed"])]),
+    ]
+    fig, axs = plt.subplots(len(panels), 1, figsize=(8, 10), sharex=True, constrained_layout=True)
+    for ax, (ylabel, lines) in zip(axs, panels):
+        for label, y in lines:
+            idx = lttb(t, y.astype(np.float64), points)
+            ax.plot(t[idx], y[idx], label=label)
+        ax.set_ylabel(ylabel)
+        # Shaded grasp intervals, plus GRIP/RELEASE at the times recorded in the capture manifest
+        for g in metrics["grasps"]:
+            ax.axvspan(g["start"], g["end"], color="#2ca02c", alpha=0.08)
+        if "grip" in events:
+            ax.axvline(events["grip"], color="#2ca02c", linestyle="--", linewidth=1.2, label="GRIP")
+        if "release" in events:
+            ax.axvline(events["release"], color="#d62728", linestyle="--", linewidth=1.2, label="RELEASE")
         handles, labels = ax.get_legend_handles_labels()
         dedup = dict(zip(labels, handles))
         ax.legend(dedup.values(), dedup.keys())
+    axs[-1].set_xlabel("time (s)")
+    fig.suptitle(f"End-effector and Cube Poses vs Time ({metrics['samples']} samples)")
+    fig.savefig(png_path, dpi=150)
+    plt.close(fig)
 
+
+def main():
+    ap = argparse.ArgumentParser(description="Fetch, summarize and plot the server's pose log")
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds to record after a log reset")
+    ap.add_argument("--no-reset", action="store_true", help="analyze the log already on the server")
+    ap.add_argument("--input", help="analyze a saved poses.npz instead of fetching")
+    ap.add_argument("--every", type=int, default=1, help="server-side decimation")
+    ap.add_argument("--points", type=int, default=2000, help="LTTB points per plotted series")
+    ap.add_argument("--csv", action="store_true", help="also write analysis/poses.csv")
+    ap.add_argument("--manifest", default=os.path.join("frames", "manifest.jsonl"))
+    args = ap.parse_args()
+
+    os.makedirs("analysis", exist_ok=True)
+    if args.input:
+        cols = load_log(args.input)
+    else:
+        if not args.no_reset:
+            requests.post(f"{BASE}/pose_log_reset").raise_for_status()
+            time.sleep(args.duration)
+        cols = fetch_log(every=args.every)
+        npz_path = os.path.join("analysis", "poses.npz")
+        np.savez_compressed(npz_path, **cols)
+        print("wrote", os.path.abspath(npz_path))
+
+    metrics = derived_metrics(cols)
+    if args.csv:
+        csv_path = os.path.join("analysis", "poses.csv")
+        write_csv(csv_path, cols)
+        print("wrote", os.path.abspath(csv_path))
+
+    records = read_manifest(args.manifest) if os.path.exists(args.manifest) else []
+    events = event_times(log_records(records, cols)) if len(cols["step"]) else {}
     png_path = os.path.join("analysis", "poses.png")
-    fig.suptitle("End-effector and Cube Poses vs Time")
-    fig.savefig(png_path, dpi=150)
-    print("wrote", os.path.abspath(csv_path))
+    plot(cols, metrics, png_path, args.points, events)
     print("wrote", os.path.abspath(png_path))
+    print(f"{metrics['samples']} samples over {metrics['duration_s']:.1f}s; "
+          f"EE max speed {metrics['ee_speed_max']:.3f} m/s, path {metrics['ee_path_length']:.3f} m; "
+          f"cube max lift {metrics['cube_lift_max']:.3f} m; "
+          f"{len(metrics['grasps'])} grasp(s), {metrics['grasp_time_total']:.2f}s held")
 
 
 if __name__ == "__main__":
     main()
-
-
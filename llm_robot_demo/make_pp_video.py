@@ -1,6 +1,7 @@
 import os
 import glob
-import imageio.v2 as imageio
+
+from video_encode import encode_video
 
 
 def main():
@@ -8,9 +9,8 @@ def main():
     if not frames:
         print("No pick-and-place frames found under frames/pp_*.png")
         return
-    imgs = [imageio.imread(fn) for fn in frames]
     out = "pick_place.mp4"
-    imageio.mimsave(out, imgs, fps=5, codec="libx264")
+    encode_video(frames, out, fps=5)
     print("wrote", os.path.abspath(out))
 
 
@@ -1,9 +1,16 @@
 import os
+import sys
 import glob
-import imageio.v2 as imageio
+from functools import partial
 from PIL import Image, ImageDraw, ImageFont
 import numpy as np
 
+from manifest import frame_tags, latest_records, read_manifest
+from video_encode import encode_video
+
+
+BASE_CAPTION = "LLM: pick the cube, move right, place, home"
+
 
 def overlay_text(img, text: str, position: str = "bottom"):
     if not isinstance(img, Image.Image):
@@ -38,27 +45,45 @@ def overlay_text(img, text: str, position: str = "bottom"):
     return img
 
 
-def main():
-    frames = sorted(glob.glob(os.path.join("frames", "pp_*.png")))
-    if not frames:
-        print("No pick-and-place frames found under frames/pp_*.png")
-        return
+def caption_frame(tags: dict, caption: str, fn: str, img):
+    # Runs in the encoder worker processes
+    img = Image.fromarray(img).convert("RGB")
+    img = overlay_text(img, caption, position="bottom")
+    frame_tags = tags.get(os.path.abspath(fn), [])
+    if "grip" in frame_tags:
+        img = overlay_text(img, "GRIP", position="topleft")
+    if "release" in frame_tags:
+        img = overlay_text(img, "RELEASE", position="topleft")
+    return np.array(img)
 
-    base_caption = "LLM: pick the cube, move right, place, home"
 
-    imgs = []
+def legacy_tags(frames):
+    # Older captures without a manifest: infer events from the filename
+    tags = {}
     for fn in frames:
-        img = Image.open(fn).convert("RGB")
-        img = overlay_text(img, base_caption, position="bottom")
         name = os.path.basename(fn)
-        if "_grip_" in name:
-            img = overlay_text(img, "GRIP", position="topleft")
-        if "_release_" in name:
-            img = overlay_text(img, "RELEASE", position="topleft")
-        imgs.append(np.array(img))
+        tags[os.path.abspath(fn)] = [t for t in ("grip", "release") if f"_{t}_" in name]
+    return tags
+
+
+def main():
+    # Optional instruction to caption with (e.g. the one sent to /command)
+    caption = f"LLM: {sys.argv[1]}" if len(sys.argv) > 1 else BASE_CAPTION
+    manifest_path = os.path.join("frames", "manifest.jsonl")
+    if os.path.exists(manifest_path):
+        # frames/ is shared with other capture scripts and the manifest is append-only
+        records = latest_records(read_manifest(manifest_path), "pp_*.png")
+        frames = [r["frame"] for r in records]
+        tags = frame_tags(records)
+    else:
+        frames = sorted(glob.glob(os.path.join("frames", "pp_*.png")))
+        tags = legacy_tags(frames)
+    if not frames:
+        print("No pick-and-place frames found under frames/")
+        return
 
     out = "pick_place_captioned.mp4"
-    imageio.mimsave(out, imgs, fps=8, codec="libx264")
+    encode_video(frames, out, fps=8, transform=partial(caption_frame, tags, caption))
     print("wrote", os.path.abspath(out))
 
 
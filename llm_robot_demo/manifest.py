@@ -0,0 +1,98 @@
+"""Capture manifest: one JSON line per snapshot, written by the server at capture time.
+
+Each record carries the frame path, timing (wall `t` on the pose-log clock, `step`,
+`sim_time`), arm/finger joint state, EE and cube poses and event tags ("grip",
+"release", or anything the client passes), so downstream tools never have to glob
+directories or guess events from filenames.
+"""
+
+import fnmatch
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+
+class ManifestWriter:
+    def __init__(self, path: str):
+        self.path = path
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        self._f = open(path, "a", buffering=1)
+        self._lock = threading.Lock()
+
+    def append(self, record: dict):
+        line = json.dumps(record, separators=(",", ":"))
+        with self._lock:
+            self._f.write(line + "\n")
+
+    def truncate(self):
+        with self._lock:
+            self._f.seek(0)
+            self._f.truncate()
+
+    def close(self):
+        self._f.close()
+
+
+def default_manifest_path(frame_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(frame_path)), "manifest.jsonl")
+
+
+def absolute_files(files: dict) -> dict:
+    """Copy of a save_frame() result with file paths made absolute (other entries as is)."""
+    return {k: os.path.abspath(v) if isinstance(v, str) else v for k, v in files.items()}
+
+
+def resolve_path(path: str, manifest_path: str) -> str:
+    """Absolute path of a file named in a manifest. Older manifests stored paths relative
+    to the server's cwd; try the manifest's directory, then the cwd."""
+    if os.path.isabs(path):
+        return path
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    for cand in (os.path.join(base, path), os.path.join(base, os.path.basename(path)), path):
+        if os.path.exists(cand):
+            return os.path.abspath(cand)
+    return os.path.abspath(path)
+
+
+def read_manifest(path: str) -> List[dict]:
+    records = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+
+def latest_records(records: List[dict], pattern: str = "*") -> List[dict]:
+    """Records whose frame filename matches `pattern`, one per frame path (the last one
+    written: manifests are append-only, so a rerun capture appends the same frames again)."""
+    out: Dict[str, dict] = {}
+    for r in records:
+        path = os.path.abspath(r["frame"])
+        if fnmatch.fnmatch(os.path.basename(path), pattern):
+            out.pop(path, None)
+            out[path] = r
+    return list(out.values())
+
+
+def event_times(records: List[dict], key: str = "t") -> Dict[str, float]:
+    """Time of the first frame carrying each tag."""
+    out: Dict[str, float] = {}
+    for r in records:
+        for tag in r.get("tags", []):
+            out.setdefault(tag, r[key])
+    return out
+
+
+def frame_tags(records: List[dict], base_dir: Optional[str] = None) -> Dict[str, List[str]]:
+    """{absolute frame path: tags} for per-frame lookups (e.g. caption overlays)."""
+    out = {}
+    for r in records:
+        path = r["frame"]
+        if base_dir and not os.path.isabs(path):
+            path = os.path.join(base_dir, path)
+        out[os.path.abspath(path)] = r.get("tags", [])
+    return out
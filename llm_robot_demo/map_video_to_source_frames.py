@@ -2,22 +2,31 @@ import os
 import csv
 import glob
 
+from manifest import latest_records, read_manifest
+
 
 def main():
     project_root = os.path.dirname(os.path.abspath(__file__))
     src_dir = os.path.join(project_root, "frames")
     vid_dir = os.path.join(project_root, "video_frames")
     out_csv = os.path.join(vid_dir, "video_frame_map.csv")
-
-    src_frames = sorted(glob.glob(os.path.join(src_dir, "pp_*.png")))
-    vid_frames = sorted(glob.glob(os.path.join(vid_dir, "frame_*.png")))
-
-    if not src_frames or not vid_frames:
+    manifest_path = os.path.join(src_dir, "manifest.jsonl")
+
+    if not os.path.exists(manifest_path):
+        raise SystemExit("No capture manifest found. Ensure frames/manifest.jsonl exists (written by /snapshot).")
+    # Same selection as make_pp_video_with_caption.py: the latest record of each pp_* frame
+    records = latest_records(read_manifest(manifest_path), "pp_*.png")
+    # Extracted video frames are numbered like the encoder output; fall back to a scan only if not
+    vid_frames = [os.path.join(vid_dir, f"frame_{i + 1:04d}.png") for i in range(len(records))]
+    if not records or not os.path.exists(vid_frames[0]):
+        vid_frames = sorted(glob.glob(os.path.join(vid_dir, "frame_*.png")))
+
+    if not records or not vid_frames:
         raise SystemExit("No frames found to map. Ensure frames/ and video_frames/ exist.")
 
     # FPS used in captioned MP4 encoder
     fps = 8.0
-    L = min(len(src_frames), len(vid_frames))
+    L = min(len(records), len(vid_frames))
 
     with open(out_csv, "w", newline="") as f:
         w = csv.writer(f)
@@ -27,17 +36,18 @@ def main():
             "video_time_sec",
             "source_index_1based",
             "source_frame",
+            "source_time_sec",
             "event",
         ])
         for i in range(L):
             v_idx = i + 1
             s_idx = i + 1
+            rec = records[i]
             v_path = os.path.relpath(vid_frames[i], project_root)
-            s_path = os.path.relpath(src_frames[i], project_root)
+            s_path = os.path.relpath(os.path.abspath(rec["frame"]), project_root)
             t_sec = (v_idx - 1) / fps
-            name = os.path.basename(s_path)
-            event = "grip" if "_grip_" in name else ("release" if "_release_" in name else "")
-            w.writerow([v_idx, v_path, f"{t_sec:.3f}", s_idx, s_path, event])
+            event = "|".join(rec.get("tags", []))
+            w.writerow([v_idx, v_path, f"{t_sec:.3f}", s_idx, s_path, f"{rec['t']:.3f}", event])
 
     print("wrote", out_csv)
     print("mapped_pairs", L)
@@ -45,5 +55,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
-
@@ -0,0 +1,388 @@
+"""Import OBJ/STL meshes as manipulable URDF objects, with a persistent cache.
+
+`import_mesh("pcb.stl", scale=0.001)` returns the path of a generated URDF whose visual
+is the (OBJ-converted) mesh and whose collision geometry is a V-HACD convex decomposition
+(`p.vhacd`). Everything is stored under `ASSET_CACHE` (default `.asset_cache/`) in a
+directory keyed by the SHA-256 of the mesh bytes (and of an OBJ's material/texture files)
+plus the import parameters, so a model is decomposed once; later imports (any process)
+are a hash and a directory lookup (`cached_mesh`, which never builds).
+
+    <cache>/<key>/visual.obj   mesh, converted from STL if needed
+    <cache>/<key>/*.mtl, ...    an OBJ's material libraries and textures, same relative paths
+    <cache>/<key>/collision.obj convex hulls (one object per hull)
+    <cache>/<key>/model.urdf    wrapper: visual + collision + mass/inertia
+    <cache>/<key>/meta.json     source, params, triangle/hull counts, build time
+
+`MeshWarmer` builds entries in a worker process, so a server never parses or decomposes
+a large mesh on the request path (nor, since V-HACD holds the GIL, on any of its threads).
+
+CLI: `python mesh_assets.py model.stl --scale 0.001` pre-builds a cache entry.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+CACHE_VERSION = 2  # 2: materials and textures copied with OBJ meshes
+DEFAULT_CACHE = os.environ.get("ASSET_CACHE", ".asset_cache")
+DEFAULT_RGBA = (0.2, 0.5, 0.3, 1.0)  # for meshes without materials
+
+# p.vhacd keyword arguments; resolution trades import time for collision fidelity
+VHACD_DEFAULTS = {"resolution": 100000, "concavity": 0.0025, "maxNumVerticesPerCH": 64, "depth": 20}
+
+
+_hashes = {}
+
+
+def _scan_file(path: str) -> Tuple[str, Tuple[str, ...]]:
+    """(SHA-256, material libraries) of a file; the libraries are an OBJ's `mtllib` names.
+
+    Memoized per (path, size, mtime) so repeated spawns in one process skip re-reading the mesh.
+    """
+    st = os.stat(path)
+    sig = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if sig not in _hashes:
+        h = hashlib.sha256()
+        libs = []
+        with open(path, "rb") as f:
+            if path.lower().endswith(".obj"):
+                # Same pass as the hash: mtllib lines can appear anywhere in the file
+                for line in f:
+                    h.update(line)
+                    if line.startswith(b"mtllib"):
+                        libs.extend(line.decode("utf-8", errors="ignore").split()[1:])
+            else:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        _hashes[sig] = (h.hexdigest(), tuple(dict.fromkeys(libs)))
+    return _hashes[sig]
+
+
+def _hash_file(path: str) -> str:
+    return _scan_file(path)[0]
+
+
+# .mtl statements whose last token is a texture file
+_MTL_MAPS = ("map_", "bump", "disp", "decal", "refl", "norm")
+
+
+def sidecar_files(mesh: str) -> List[str]:
+    """Material libraries and textures an OBJ references, relative to its directory.
+
+    References that are absolute or point outside the mesh directory are left out: they
+    resolve from the cache entry as they are, or cannot be copied next to it.
+    """
+    if not mesh.lower().endswith(".obj"):
+        return []
+    base = os.path.dirname(os.path.abspath(mesh))
+    out = []
+
+    def _add(rel: str) -> bool:
+        rel = os.path.normpath(rel.replace("\\", "/"))
+        if os.path.isabs(rel) or rel.startswith(".."):
+            return False
+        if os.path.exists(os.path.join(base, rel)) and rel not in out:
+            out.append(rel)
+            return True
+        return False
+
+    for lib in _scan_file(mesh)[1]:
+        if not _add(lib):
+            continue
+        lib_dir = os.path.dirname(lib)
+        with open(os.path.join(base, lib), "r", errors="ignore") as f:
+            for line in f:
+                tokens = line.split()
+                if len(tokens) > 1 and tokens[0].lower().startswith(_MTL_MAPS):
+                    # Textures are relative to the .mtl
+                    _add(os.path.join(lib_dir, tokens[-1]))
+    return out
+
+
+def read_stl(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(vertices [V, 3], faces [F, 3]) with shared vertices merged; binary or ASCII STL."""
+    with open(path, "rb") as f:
+        data = f.read()
+    n = struct.unpack_from("<I", data, 80)[0] if len(data) >= 84 else 0
+    if len(data) == 84 + 50 * n:
+        rec = np.dtype([("normal", "<f4", 3), ("v", "<f4", (3, 3)), ("attr", "<u2")])
+        tris = np.frombuffer(data, dtype=rec, count=n, offset=84)["v"]
+    else:
+        tokens = data.decode("ascii", errors="ignore").split()
+        idx = [i for i, t in enumerate(tokens) if t == "vertex"]
+        tris = np.array([tokens[i + 1:i + 4] for i in idx], dtype=np.float32).reshape(-1, 3, 3)
+    verts, inverse = np.unique(tris.reshape(-1, 3), axis=0, return_inverse=True)
+    return verts, inverse.reshape(-1, 3)
+
+
+def read_obj(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Vertices and triangulated faces of an OBJ (positions only)."""
+    verts, faces = [], []
+    with open(path, "r", errors="ignore") as f:
+        for line in f:
+            if line.startswith("v "):
+                verts.append(line.split()[1:4])
+            elif line.startswith("f "):
+                idx = [int(tok.split("/")[0]) for tok in line.split()[1:]]
+                idx = [i - 1 if i > 0 else len(verts) + i for i in idx]
+                faces.extend([idx[0], idx[k], idx[k + 1]] for k in range(1, len(idx) - 1))
+    return np.array(verts, dtype=np.float64), np.array(faces, dtype=np.int64).reshape(-1, 3)
+
+
+def write_obj(path: str, verts: np.ndarray, faces: np.ndarray):
+    with open(path, "w") as f:
+        f.write("".join(f"v {x:.6g} {y:.6g} {z:.6g}\n" for x, y, z in verts.tolist()))
+        f.write("".join(f"f {a} {b} {c}\n" for a, b, c in (faces + 1).tolist()))
+
+
+def mass_properties(verts: np.ndarray, faces: np.ndarray, mass: float) -> dict:
+    """Center of mass from signed tetrahedron volumes, inertia of the bounding box."""
+    tri = verts[faces]
+    vol = np.einsum("ij,ij->i", tri[:, 0], np.cross(tri[:, 1], tri[:, 2])) / 6.0
+    total = vol.sum()
+    if abs(total) > 1e-12:
+        com = (vol[:, None] * tri.sum(axis=1) / 4.0).sum(axis=0) / total
+    else:  # open or flat mesh
+        com = (verts.min(axis=0) + verts.max(axis=0)) / 2.0
+    ext = verts.max(axis=0) - verts.min(axis=0)
+    ixx, iyy, izz = (mass / 12.0 * (ext[[1, 0, 0]] ** 2 + ext[[2, 2, 1]] ** 2)).tolist()
+    return {"com": com.tolist(), "extent": ext.tolist(), "volume": float(abs(total)),
+            "inertia": [ixx, iyy, izz]}
+
+
+_URDF = """<?xml version="1.0"?>
+<robot name="{name}">
+  <link name="base">
+    <contact>
+      <lateral_friction value="{friction}"/>
+    </contact>
+    <inertial>
+      <origin xyz="{cx} {cy} {cz}" rpy="0 0 0"/>
+      <mass value="{mass}"/>
+      <inertia ixx="{ixx}" ixy="0" ixz="0" iyy="{iyy}" iyz="0" izz="{izz}"/>
+    </inertial>
+    <visual>
+      <geometry><mesh filename="visual.obj" scale="{s} {s} {s}"/></geometry>{material}
+    </visual>
+    <collision>
+      <geometry><mesh filename="collision.obj" scale="{s} {s} {s}"/></geometry>
+    </collision>
+  </link>
+</robot>
+"""
+
+
+@contextlib.contextmanager
+def _quiet_stdout():
+    # p.vhacd prints its progress from C++ straight to fd 1 (the log file gets it as well)
+    sys.stdout.flush()
+    saved = os.dup(1)
+    try:
+        with open(os.devnull, "w") as devnull:
+            os.dup2(devnull.fileno(), 1)
+        yield
+    finally:
+        os.dup2(saved, 1)
+        os.close(saved)
+
+
+def cache_key(mesh: str, params: dict) -> str:
+    h = hashlib.sha256(_hash_file(mesh).encode())
+    base = os.path.dirname(os.path.abspath(mesh))
+    for rel in sidecar_files(mesh):
+        # Edited materials/textures make a new entry too
+        h.update(rel.encode() + _hash_file(os.path.join(base, rel)).encode())
+    h.update(json.dumps({"v": CACHE_VERSION, **params}, sort_keys=True).encode())
+    return h.hexdigest()[:24]
+
+
+def _params(mesh: str, scale: float, mass: float, friction: float, rgba, vhacd: Optional[dict]) -> dict:
+    ext = os.path.splitext(mesh)[1].lower()
+    if ext not in (".obj", ".stl"):
+        raise ValueError(f"unsupported mesh format {ext!r} (obj, stl)")
+    vhacd = {**VHACD_DEFAULTS, **(vhacd or {})}
+    # rgba None keeps an OBJ's own materials (a URDF color would override them)
+    return {"scale": scale, "mass": mass, "friction": friction,
+            "rgba": None if rgba is None else list(rgba), "vhacd": vhacd}
+
+
+def cached_mesh(mesh: str, scale: float = 1.0, mass: float = 0.1, friction: float = 1.0, rgba=None,
+                vhacd: Optional[dict] = None, cache_dir: str = DEFAULT_CACHE) -> Optional[dict]:
+    """The cache entry's meta dict incl. "urdf", or None if it is not built yet (never builds)."""
+    t0 = time.perf_counter()
+    params = _params(mesh, scale, mass, friction, rgba, vhacd)
+    entry = os.path.join(cache_dir, cache_key(mesh, params))
+    meta_path = os.path.join(entry, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta.update(urdf=os.path.abspath(os.path.join(entry, "model.urdf")), cached=True,
+                import_ms=(time.perf_counter() - t0) * 1000.0)
+    return meta
+
+
+def import_mesh(mesh: str, scale: float = 1.0, mass: float = 0.1, friction: float = 1.0, rgba=None,
+                vhacd: Optional[dict] = None, cache_dir: str = DEFAULT_CACHE) -> dict:
+    """Build (or reuse) the cache entry for `mesh`; returns its meta dict incl. "urdf"."""
+    meta = cached_mesh(mesh, scale, mass, friction, rgba, vhacd, cache_dir)
+    if meta is not None:
+        return meta
+
+    import pybullet as p
+
+    t0 = time.perf_counter()
+    ext = os.path.splitext(mesh)[1].lower()
+    params = _params(mesh, scale, mass, friction, rgba, vhacd)
+    vhacd = params["vhacd"]
+    key = cache_key(mesh, params)
+    entry = os.path.join(cache_dir, key)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Build in a scratch dir and rename into place, so concurrent importers never see a partial entry
+    tmp = tempfile.mkdtemp(prefix=key + ".", dir=cache_dir)
+    try:
+        verts, faces = read_stl(mesh) if ext == ".stl" else read_obj(mesh)
+        visual = os.path.join(tmp, "visual.obj")
+        sidecars = sidecar_files(mesh)
+        if ext == ".obj":
+            shutil.copyfile(mesh, visual)
+            # mtllib/map_* paths are relative, so they resolve the same next to visual.obj
+            for rel in sidecars:
+                dst = os.path.join(tmp, rel)
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                shutil.copyfile(os.path.join(os.path.dirname(os.path.abspath(mesh)), rel), dst)
+        else:
+            write_obj(visual, verts, faces)
+        t_vhacd = time.perf_counter()
+        with _quiet_stdout():
+            p.vhacd(visual, os.path.join(tmp, "collision.obj"), os.path.join(tmp, "vhacd.log"), **vhacd)
+        t_vhacd = time.perf_counter() - t_vhacd
+        with open(os.path.join(tmp, "collision.obj")) as f:
+            hulls = sum(1 for line in f if line.startswith("o "))
+        props = mass_properties(verts * scale, faces, mass)
+        cx, cy, cz = props["com"]
+        ixx, iyy, izz = props["inertia"]
+        name = os.path.splitext(os.path.basename(mesh))[0]
+        if rgba is None and not sidecars:
+            rgba = DEFAULT_RGBA
+        material = ("" if rgba is None else
+                    '\n      <material name="mat"><color rgba="%s"/></material>' % " ".join(str(c) for c in rgba))
+        with open(os.path.join(tmp, "model.urdf"), "w") as f:
+            f.write(_URDF.format(name=name, friction=friction, cx=cx, cy=cy, cz=cz, mass=mass, ixx=ixx,
+                                 iyy=iyy, izz=izz, s=scale, material=material))
+        meta = {
+            "source": os.path.abspath(mesh),
+            "key": key,
+            "params": params,
+            "sidecars": sidecars,
+            "triangles": int(len(faces)),
+            "vertices": int(len(verts)),
+            "hulls": hulls,
+            "vhacd_s": t_vhacd,
+            **props,
+        }
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            # Another process finished the same entry first; use theirs
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    meta.update(urdf=os.path.abspath(os.path.join(entry, "model.urdf")), cached=False,
+                import_ms=(time.perf_counter() - t0) * 1000.0)
+    return meta
+
+
+class MeshWarmer:
+    """Builds cache entries one at a time in a worker process.
+
+    V-HACD holds the GIL for the whole decomposition, so building on a thread would stall
+    every other thread of the server; the worker process does the parsing, decomposition
+    and cache fill, and this side only looks entries up. `request()` returns the entry's
+    meta if it is cached; otherwise it queues a build (once per mesh and parameters) and
+    returns None. A failed build is reported by the next `request()` for it, as the
+    exception, and then forgotten so a retry rebuilds.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._pending: Dict[tuple, Optional[BaseException]] = {}  # build -> error (None: queued)
+        self._pool = None
+
+    def request(self, mesh: str, **kwargs) -> Optional[dict]:
+        job = (os.path.abspath(mesh), json.dumps(kwargs, sort_keys=True))
+        with self._lock:
+            if job in self._pending:
+                error = self._pending[job]
+                if error is None:
+                    return None
+                del self._pending[job]
+                raise error
+        meta = cached_mesh(mesh, cache_dir=self.cache_dir, **kwargs)
+        if meta is not None:
+            return meta
+        with self._lock:
+            if job not in self._pending:
+                if self._pool is None:
+                    # spawn: never fork a process that holds a physics connection
+                    self._pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+                self._pending[job] = None
+                future = self._pool.submit(import_mesh, mesh, cache_dir=self.cache_dir, **kwargs)
+                future.add_done_callback(lambda f, job=job: self._done(job, f))
+        return None
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(1 for error in self._pending.values() if error is None)
+
+    def _done(self, job: tuple, future):
+        error = future.exception()
+        with self._lock:
+            if isinstance(error, BrokenProcessPool):
+                self._pool = None  # the worker died (e.g. V-HACD crashed); start a new one next time
+            if error is None:
+                self._pending.pop(job, None)
+            else:
+                self._pending[job] = error
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Import a mesh into the asset cache")
+    ap.add_argument("mesh")
+    ap.add_argument("--scale", type=float, default=1.0, help="e.g. 0.001 for CAD models in mm")
+    ap.add_argument("--mass", type=float, default=0.1)
+    ap.add_argument("--resolution", type=int, default=VHACD_DEFAULTS["resolution"])
+    ap.add_argument("--cache", default=DEFAULT_CACHE)
+    args = ap.parse_args()
+    meta = import_mesh(args.mesh, args.scale, args.mass, vhacd={"resolution": args.resolution},
+                       cache_dir=args.cache)
+    print(f"{meta['urdf']}: {meta['triangles']} triangles -> {meta['hulls']} hulls, "
+          f"{'cached' if meta['cached'] else 'built'} in {meta['import_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
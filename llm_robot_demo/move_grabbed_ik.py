@@ -1,6 +1,5 @@
 import os
 import json
-import math
 from typing import List
 
 import requests
@@ -23,13 +22,14 @@ def post(path: str, payload: dict):
     return r.json()
 
 
-def ee_cube_distance() -> float:
-    d = get("/poses")
-    ee = d["ee"]["pos"]
-    cb = d["cube"]["pos"]
-    if ee is None or cb is None:
-        return float("inf")
-    return math.sqrt(sum((a - b) ** 2 for a, b in zip(ee, cb)))
+def event_seq() -> int:
+    return get("/events?since=0")["next"]
+
+
+def grasp_detected(since: int, wait: float = 0.5) -> bool:
+    # Server-side contact monitor reports a stable two-finger grasp
+    evs = get(f"/events?since={since}&wait={wait}")["events"]
+    return any(e["type"] == "grasp_stable" and e["object"] == "cube" for e in evs)
 
 
 def save_frame(folder: str, idx: int) -> str:
@@ -66,9 +66,10 @@ def main():
     post("/move_ik", {"pos": approach, "duration": 1.0})
     frames.append(save_frame(frames_dir, idx)); idx += 1
 
-    # Close gripper (no auto attach), then attach if very close
+    # Close gripper (no auto attach), then attach if both fingers hold the cube
+    seq = event_seq()
     post("/gripper_raw", {"width": 0.0})
-    if ee_cube_distance() < 0.02:
+    if grasp_detected(seq):
         post("/force_grasp", {})
     frames.append(save_frame(frames_dir, idx)); idx += 1
 
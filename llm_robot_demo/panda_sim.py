@@ -0,0 +1,679 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import pybullet as p
+import pybullet_data
+import numpy as np
+
+from assets import resolve
+from camera import Frame, RenderCache, get_camera, get_lighting, save_frame
+from contacts import ContactMonitor, EventQueue
+from manifest import ManifestWriter, absolute_files, default_manifest_path
+from pose_log import PoseLog
+from recorder import recorded
+
+
+class PandaSim:
+    def __init__(self, gui: bool = True, realtime: bool = True):
+        self.gui = gui
+        # realtime=False drops the pacing sleeps (headless replay / batch jobs)
+        self.realtime = realtime
+        self.physics = p.connect(p.GUI if gui else p.DIRECT)
+        p.resetSimulation()
+        p.setAdditionalSearchPath(pybullet_data.getDataPath())
+        p.setGravity(0, 0, -9.81)
+        self.plane_id = p.loadURDF(resolve("plane.urdf"))
+        self.panda = p.loadURDF(
+            fileName=resolve("franka_panda/panda.urdf"),
+            basePosition=[0, 0, 0],
+            useFixedBase=True,
+        )
+        arm_idxs = []
+        finger_idxs = []
+        self.ee_index = 11
+        for i in range(p.getNumJoints(self.panda)):
+            info = p.getJointInfo(self.panda, i)
+            jtype = info[2]
+            jname = info[1].decode("utf-8", errors="ignore")
+            if jtype == p.JOINT_REVOLUTE:
+                arm_idxs.append(i)
+            if "finger" in jname:
+                finger_idxs.append(i)
+        self.arm_joint_indices: List[int] = arm_idxs
+        self.finger_joint_indices: List[int] = finger_idxs
+        self.cube_id: Optional[int] = None
+        # Spawned bodies -> URDF they were loaded from (mirrored by the motion planner)
+        self.objects: Dict[int, str] = {}
+        # Imported mesh objects by name (see spawn_mesh), and which of them have a fixed base
+        self.meshes: Dict[str, int] = {}
+        self.fixed_bodies = set()
+        # Last position command per joint: (target, force); see _command and capture_state
+        self.motor_targets: Dict[int, tuple] = {}
+        self.grasp_cid: Optional[int] = None
+        # Body held by grasp_cid (the cube unless a skill grasped something else) and the
+        # constraint's frame relative to the EE link
+        self.grasp_body: Optional[int] = None
+        self.grasp_frame: Optional[tuple] = None
+        self.gripper_force = 20.0  # N per finger motor
+        self.pose_log = PoseLog(int(os.environ.get("POSE_LOG_CAPACITY", 240 * 3600)))
+        self.t0 = time.time()
+        self.t_start = self.t0
+        # Serializes access from the REST handlers and the UDS transport
+        self.lock = threading.RLock()
+        # Callables run after every physics step (with the lock held), e.g. the preview stream
+        self.step_hooks: List = []
+        self.render_cache = RenderCache(enabled=os.environ.get("RENDER_CACHE", "1") == "1")
+        self.dt = 1.0 / 240.0  # PyBullet default fixed step
+        self.step_count = 0
+        # Wall time spent inside step() (physics + pose log + hooks), for throughput stats
+        self.step_time = 0.0
+        # Event tags ("grip", "release") waiting to be attached to the next manifest record
+        self.pending_tags: List[str] = []
+        self.manifests: dict = {}
+        # Optional CommandRecorder; see recorder.py
+        self.recorder = None
+        # Optional reachability.ReachabilityIndex for IK seeds / early rejection
+        self.reach_index = None
+        # Optional frame_ring.RingWriter that snapshot(publish=True) copies frames into
+        self.frame_ring = None
+        # Optional servo.ServoController streaming setpoints from a background thread
+        self.servo = None
+        self.snapshot_count = 0
+        # Frame of the latest snapshot(), for transports that send pixels back
+        self.last_frame: Optional[Frame] = None
+        self.events = EventQueue()
+        self.contacts = ContactMonitor(self, self.events)
+        self.step_hooks.append(self.contacts.on_step)
+        self.reset()
+
+    def close(self):
+        if self.frame_ring is not None:
+            self.frame_ring.unlink()
+            self.frame_ring = None
+        p.disconnect(self.physics)
+
+    def now(self) -> float:
+        return time.time() - self.t0
+
+    def log_pose(self):
+        ee_p, ee_q = self.get_ee_pose()
+        cb_p, cb_q = self.get_cube_pose()
+        cube = None if cb_p is None else list(cb_p) + list(cb_q)
+        held = self.cube_id is not None and self.contacts.is_held(self.cube_id)
+        self.pose_log.append(self.now(), self.step_count, list(ee_p) + list(ee_q), cube,
+                             sum(self.get_finger_positions()), held)
+
+    def sim_time(self) -> float:
+        return self.step_count * self.dt
+
+    def step(self):
+        t0 = time.perf_counter()
+        p.stepSimulation()
+        self.step_count += 1
+        self.log_pose()
+        for hook in self.step_hooks:
+            hook(self)
+        self.step_time += time.perf_counter() - t0
+
+    def reset(self):
+        target = [0, -0.4, 0, -2.0, 0, 1.7, 0.8]
+        for j, v in zip(self.arm_joint_indices, target):
+            p.resetJointState(self.panda, j, v)
+        self.set_gripper_width(0.08)
+        p.stepSimulation()
+        self.pose_log.clear()
+        self.t0 = time.time()
+        self.log_pose()
+
+    def remove_cube(self):
+        self.release_constraint()
+        if self.cube_id is not None:
+            self.contacts.unregister(self.cube_id)
+            self.objects.pop(self.cube_id, None)
+            p.removeBody(self.cube_id)
+            self.cube_id = None
+
+    def _body_state(self, body: int) -> dict:
+        pos, orn = p.getBasePositionAndOrientation(body)
+        vel, ang = p.getBaseVelocity(body)
+        return {"body": body, "pos": list(pos), "orn_xyzw": list(orn), "vel": list(vel), "ang_vel": list(ang)}
+
+    def capture_state(self) -> dict:
+        """Everything a fresh sim needs to continue exactly where this one is: joint states,
+        the motor commands in force, every spawned body with its velocity, and the grasp."""
+        n = p.getNumJoints(self.panda)
+        held = self.attached_body()
+        names = {b: name for name, b in self.named_bodies().items()}
+        return {
+            "step": self.step_count,
+            "q": [s[0] for s in p.getJointStates(self.panda, range(n))],
+            "qd": [s[1] for s in p.getJointStates(self.panda, range(n))],
+            "motors": {str(j): list(cmd) for j, cmd in sorted(self.motor_targets.items())},
+            "gripper_force": self.gripper_force,
+            "cube": None if self.cube_id is None else self._body_state(self.cube_id),
+            "meshes": {name: {"urdf": self.objects[b], "fixed": b in self.fixed_bodies, **self._body_state(b)}
+                       for name, b in self.meshes.items()},
+            "grasped": held is not None,
+            "grasp": None if held is None else {"object": names.get(held), "pos": list(self.grasp_frame[0]),
+                                                "orn_xyzw": list(self.grasp_frame[1])},
+        }
+
+    def apply_state(self, state: dict):
+        """Restore a capture_state() snapshot, without stepping or adding motor commands."""
+        self.remove_cube()
+        for name in list(self.meshes):
+            self.remove_object(name)
+        for j, (q, qd) in enumerate(zip(state["q"], state["qd"])):
+            p.resetJointState(self.panda, j, q, qd)
+        self.gripper_force = state.get("gripper_force", self.gripper_force)
+        if "motors" in state:
+            for j, (target, force) in state["motors"].items():
+                self._command([int(j)], [target], force)
+        else:
+            # Recordings from before motor commands were captured: hold the restored pose
+            self._command(self.arm_joint_indices, [state["q"][j] for j in self.arm_joint_indices], 87.0)
+            self._command(self.finger_joint_indices, [state["q"][j] for j in self.finger_joint_indices],
+                          self.gripper_force)
+        # Re-create bodies in their original order, so the solver sees them in the same order
+        bodies = [(m["body"], name, m) for name, m in state.get("meshes", {}).items()]
+        if state.get("cube"):
+            bodies.append((state["cube"].get("body", -1), "cube", state["cube"]))
+        for _, name, st in sorted(bodies, key=lambda b: b[0]):
+            if name == "cube" and "urdf" not in st:
+                body = self.spawn_cube(st["pos"])
+            else:
+                body = self.spawn_mesh(st["urdf"], name, st["pos"], st["orn_xyzw"], st.get("fixed", False))
+            p.resetBasePositionAndOrientation(body, st["pos"], st["orn_xyzw"])
+            p.resetBaseVelocity(body, st.get("vel", [0, 0, 0]), st.get("ang_vel", [0, 0, 0]))
+        grasp = state.get("grasp")
+        if grasp and grasp.get("object") in self.named_bodies():
+            self._latch(self.named_bodies()[grasp["object"]], grasp["pos"], grasp["orn_xyzw"])
+        elif state.get("grasped") and self.cube_id is not None:
+            self.force_grasp()  # older recordings: the cube at the default offset
+        self.step_count = state.get("step", 0)
+        self.pending_tags = []
+
+    def teleport(self, joints: List[float], fingers: List[float], cube: Optional[dict] = None,
+                 objects: Optional[dict] = None):
+        """Pose the scene kinematically (no stepping), e.g. for offline rendering of a state stream.
+
+        `objects` is a capture record's {name: {urdf, pos, orn_xyzw}} of mesh objects; meshes
+        not in it are removed, missing ones spawned from their URDF.
+        """
+        for j, q in zip(self.arm_joint_indices, joints):
+            p.resetJointState(self.panda, j, q)
+        for j, q in zip(self.finger_joint_indices, fingers):
+            p.resetJointState(self.panda, j, q)
+        objects = objects or {}
+        for name in [n for n in self.meshes if n not in objects]:
+            self.remove_object(name)
+        for name, obj in objects.items():
+            body = self.meshes.get(name)
+            if body is None or self.objects.get(body) != obj["urdf"]:
+                body = self.spawn_mesh(obj["urdf"], name, obj["pos"], obj["orn_xyzw"])
+            p.resetBasePositionAndOrientation(body, obj["pos"], obj["orn_xyzw"])
+        if cube is None or cube.get("pos") is None:
+            if self.cube_id is not None:
+                self.remove_cube()
+            return
+        if self.cube_id is None:
+            self.spawn_cube(cube["pos"])
+        p.resetBasePositionAndOrientation(self.cube_id, cube["pos"], cube["orn_xyzw"])
+
+    def named_bodies(self) -> dict:
+        bodies = {"plane": self.plane_id, "panda": self.panda}
+        if self.cube_id is not None:
+            bodies["cube"] = self.cube_id
+        bodies.update(self.meshes)
+        return bodies
+
+    def body_pose(self, body: int) -> Tuple[List[float], List[float]]:
+        pos, orn = p.getBasePositionAndOrientation(body)
+        return list(pos), list(orn)
+
+    def body_aabb(self, body: int) -> Tuple[List[float], List[float]]:
+        lo, hi = p.getAABB(body)
+        return list(lo), list(hi)
+
+    def get_joint_positions(self) -> List[float]:
+        return [p.getJointState(self.panda, j)[0] for j in self.arm_joint_indices]
+
+    def get_finger_positions(self) -> List[float]:
+        return [p.getJointState(self.panda, j)[0] for j in self.finger_joint_indices]
+
+    def get_ee_pose(self) -> Tuple[List[float], List[float]]:
+        pos, orn = p.getLinkState(self.panda, self.ee_index, computeForwardKinematics=True)[:2]
+        return list(pos), list(orn)
+
+    def get_cube_pose(self):
+        if self.cube_id is None:
+            return None, None
+        pos, orn = p.getBasePositionAndOrientation(self.cube_id)
+        return list(pos), list(orn)
+
+    def _settle(self, joints: List[int], targets: List[float], force: float, pos_tol: float, vel_tol: float,
+                max_steps: int, pace: float, stall_steps: int = 0) -> int:
+        """Drive `joints` to `targets` until position error and velocity are within tolerance.
+
+        With `stall_steps`, also stop once the joints have been still that many steps
+        without reaching the target (e.g. fingers closed on an object). Returns steps used.
+        """
+        self._command(joints, targets, force)
+        still = 0
+        for k in range(max_steps):
+            self.step()
+            if self.realtime:
+                time.sleep(pace)
+            states = p.getJointStates(self.panda, joints)
+            if all(abs(s[1]) < vel_tol for s in states):
+                if all(abs(s[0] - t) < pos_tol for s, t in zip(states, targets)):
+                    return k + 1
+                still += 1
+                if stall_steps and still >= stall_steps:
+                    return k + 1
+            else:
+                still = 0
+        return max_steps
+
+    def _command(self, joints: List[int], targets: List[float], force: float):
+        # Every position command goes through here, so capture_state knows the motors in force
+        p.setJointMotorControlArray(
+            self.panda,
+            joints,
+            p.POSITION_CONTROL,
+            targetPositions=list(targets),
+            forces=[force] * len(joints),
+        )
+        for j, t in zip(joints, targets):
+            self.motor_targets[j] = (float(t), float(force))
+
+    def command_joints(self, targets: List[float], force: float = 87.0):
+        # Arm position targets for the next steps; does not step
+        self._command(self.arm_joint_indices, targets, force)
+
+    @recorded
+    def servo_step(self, targets: List[float], force: float = 87.0):
+        # One servo tick (see servo.py); recorded so servoed motion replays like any command
+        self.command_joints(targets, force)
+        self.step()
+
+    def arm_busy(self) -> bool:
+        # Servo mode owns the arm; blocking moves would fight its queued targets
+        return self.servo is not None and self.servo.running
+
+    @recorded
+    def movej(self, targets: List[float], duration: float = 2.0, settle: bool = False,
+              pos_tol: float = 1e-3, vel_tol: float = 1e-2, max_steps: int = 1000):
+        # settle=True: command the goal directly and stop as soon as the arm has converged
+        if settle:
+            self._settle(self.arm_joint_indices, targets, 87.0, pos_tol, vel_tol, max_steps, 0.01)
+            return
+        start = np.array(self.get_joint_positions(), dtype=float)
+        goal = np.array(targets, dtype=float)
+        steps = max(1, int(duration / 0.01))
+        for k in range(steps):
+            alpha = (k + 1) / steps
+            q = (1 - alpha) * start + alpha * goal
+            self.command_joints(q.tolist())
+            self.step()
+            if self.realtime:
+                time.sleep(0.01)
+
+    def solve_ik(self, pos: List[float], orn: Optional[List[float]] = None) -> List[float]:
+        if orn is None:
+            _, orn_cur = self.get_ee_pose()
+            orn = orn_cur
+        kwargs = {}
+        cell = self.reach_index.query(pos, orn) if self.reach_index is not None else None
+        if cell is not None and cell["reachable"]:
+            # Warm start from the precomputed seed instead of the current configuration
+            kwargs["currentPositions"] = cell["seed"] + self.get_finger_positions()
+        ik_all = p.calculateInverseKinematics(
+            self.panda,
+            self.ee_index,
+            targetPosition=pos,
+            targetOrientation=orn,
+            **kwargs,
+        )
+        # Map IK solution to our arm joint indices by index
+        return [ik_all[j] for j in self.arm_joint_indices]
+
+    def reachable(self, pos: List[float], orn: Optional[List[float]] = None) -> Optional[bool]:
+        """From the reachability index; None if there is no index or pos is outside it."""
+        if self.reach_index is None:
+            return None
+        if orn is None:
+            orn = self.get_ee_pose()[1]
+        cell = self.reach_index.query(pos, orn)
+        return None if cell is None else cell["reachable"]
+
+    @recorded
+    def move_ik(self, pos: List[float], orn: Optional[List[float]] = None, duration: float = 1.5, **settle_opts):
+        self.movej(self.solve_ik(pos, orn), duration, **settle_opts)
+
+    @recorded
+    def follow_path(self, path: List[List[float]], duration: float = 2.0):
+        # Time along the path proportional to each segment's largest joint change
+        pts = np.asarray(path, dtype=float)
+        seg = np.abs(np.diff(pts, axis=0)).max(axis=1)
+        total = float(seg.sum())
+        for q, d in zip(pts[1:], seg):
+            self.movej(q.tolist(), duration * d / total if total > 0 else duration / len(seg))
+
+    @recorded
+    def set_gripper_width(self, width: float, settle: bool = False, pos_tol: float = 5e-4,
+                          vel_tol: float = 1e-3, max_steps: int = 240):
+        width = float(max(0.0, min(0.08, width)))
+        target = width * 0.5
+        if settle and self.finger_joint_indices:
+            targets = [target] * len(self.finger_joint_indices)
+            self._settle(self.finger_joint_indices, targets, self.gripper_force, pos_tol, vel_tol, max_steps, 0.005, stall_steps=5)
+        elif self.finger_joint_indices:
+            self._command(self.finger_joint_indices, [target] * len(self.finger_joint_indices), self.gripper_force)
+            for _ in range(30):
+                self.step()
+                if self.realtime:
+                    time.sleep(0.005)
+
+    @recorded
+    def gripper(self, width: float, **settle_opts) -> bool:
+        # Close/open fingers; when closing, latch the cube (snapping it under the EE if needed)
+        self.set_gripper_width(width, **settle_opts)
+        grasped = False
+        if width <= 0.01:
+            grasped = self.try_grasp_constraint()
+            if not grasped:
+                self.align_cube_to_ee([0, 0, -0.06])
+                grasped = self.force_grasp()
+        return grasped
+
+    @recorded
+    def spawn_cube(self, pos=None):
+        if pos is None:
+            pos = [0.5, 0.0, 0.025]
+        if self.cube_id is not None:
+            self.contacts.unregister(self.cube_id)
+            self.objects.pop(self.cube_id, None)
+            try:
+                p.removeBody(self.cube_id)
+            except Exception:
+                pass
+            self.cube_id = None
+        urdf = resolve("cube_small.urdf")
+        self.cube_id = p.loadURDF(
+            urdf,
+            pos,
+            globalScaling=1.0,
+            useFixedBase=False,
+        )
+        p.changeDynamics(self.cube_id, -1, lateralFriction=1.2, rollingFriction=0.002, spinningFriction=0.002, linearDamping=0.02, angularDamping=0.02)
+        self.contacts.register(self.cube_id, "cube")
+        self.objects[self.cube_id] = urdf
+        self.log_pose()
+        return self.cube_id
+
+    @recorded
+    def spawn_mesh(self, urdf: str, name: str, pos=(0.5, 0.0, 0.05), orn=(0, 0, 0, 1), fixed: bool = False) -> int:
+        # `urdf` from mesh_assets.import_mesh; replaces an earlier object of the same name
+        self.remove_object(name)
+        body = p.loadURDF(urdf, pos, orn, useFixedBase=fixed, flags=p.URDF_ENABLE_CACHED_GRAPHICS_SHAPES)
+        self.meshes[name] = body
+        self.objects[body] = urdf
+        if fixed:
+            self.fixed_bodies.add(body)
+        self.contacts.register(body, name)
+        return body
+
+    @recorded
+    def remove_object(self, name: str) -> bool:
+        body = self.meshes.pop(name, None)
+        if body is None:
+            return False
+        if self.attached_body() == body:
+            self.release_constraint()
+        self.contacts.unregister(body)
+        self.objects.pop(body, None)
+        self.fixed_bodies.discard(body)
+        p.removeBody(body)
+        return True
+
+    def try_grasp_constraint(self, body: Optional[int] = None):
+        # Latch only if both finger links are actually touching the body (default: the cube)
+        body = self.cube_id if body is None else body
+        if body is None:
+            return False
+        if self.contacts.fingers_touching(body) == len(self.finger_joint_indices):
+            return self.force_grasp(body)
+        return False
+
+    def attached_body(self) -> Optional[int]:
+        return self.grasp_body if self.grasp_cid is not None else None
+
+    @recorded
+    def force_grasp(self, body: Optional[int] = None):
+        # Without `body`: latch the cube at a fixed offset under the EE. With `body`: latch it
+        # where it currently is relative to the EE (after a contact-checked close).
+        if body is None and self.cube_id is None:
+            return False
+        if self.grasp_cid is not None:
+            try:
+                p.removeConstraint(self.grasp_cid)
+            except Exception:
+                pass
+            self.grasp_cid = None
+        if body is None:
+            body, parent_pos, parent_orn = self.cube_id, [0, 0, 0.035], [0, 0, 0, 1]
+        else:
+            # Constraint frames are relative to the link's center of mass frame
+            ee_pos, ee_orn = p.getLinkState(self.panda, self.ee_index, computeForwardKinematics=True)[:2]
+            inv_pos, inv_orn = p.invertTransform(ee_pos, ee_orn)
+            parent_pos, parent_orn = p.multiplyTransforms(inv_pos, inv_orn, *p.getBasePositionAndOrientation(body))
+        self._latch(body, parent_pos, parent_orn)
+        self.pending_tags.append("grip")
+        self.step()
+        return True
+
+    def _latch(self, body: int, parent_pos, parent_orn):
+        # Fixed constraint holding `body` at (parent_pos, parent_orn) in the EE link frame
+        self.grasp_cid = p.createConstraint(
+            parentBodyUniqueId=self.panda,
+            parentLinkIndex=self.ee_index,
+            childBodyUniqueId=body,
+            childLinkIndex=-1,
+            jointType=p.JOINT_FIXED,
+            jointAxis=[0, 0, 0],
+            parentFramePosition=parent_pos,
+            childFramePosition=[0, 0, 0],
+            parentFrameOrientation=parent_orn,
+        )
+        self.grasp_body = body
+        self.grasp_frame = (list(parent_pos), list(parent_orn))
+
+    @recorded
+    def align_cube_to_ee(self, offset=None):
+        if self.cube_id is None:
+            return False
+        if offset is None:
+            offset = [0, 0, -0.06]
+        ee_pos, ee_orn = p.getLinkState(self.panda, self.ee_index, computeForwardKinematics=True)[:2]
+        target_pos = (np.array(ee_pos) + np.array(offset)).tolist()
+        p.resetBasePositionAndOrientation(self.cube_id, target_pos, ee_orn)
+        self.step()
+        return True
+
+    @recorded
+    def release_constraint(self):
+        if self.grasp_cid is not None:
+            try:
+                p.removeConstraint(self.grasp_cid)
+            except Exception:
+                pass
+            self.grasp_cid = None
+            self.grasp_body = None
+            self.grasp_frame = None
+            self.pending_tags.append("release")
+        self.log_pose()
+
+    @recorded
+    def release(self, **settle_opts):
+        self.release_constraint()
+        self.set_gripper_width(0.05, **settle_opts)
+
+    def scene_fingerprint(self, quantum: float = 1e-4) -> tuple:
+        # Quantized base poses and joint positions of every body; cheap next to a render
+        vals = []
+        for i in range(p.getNumBodies()):
+            b = p.getBodyUniqueId(i)
+            pos, orn = p.getBasePositionAndOrientation(b)
+            vals.append(b)
+            vals.extend(pos)
+            vals.extend(orn)
+            n = p.getNumJoints(b)
+            if n:
+                vals.extend(s[0] for s in p.getJointStates(b, range(n)))
+        return tuple(int(round(v / quantum)) for v in vals)
+
+    def render(self, camera: str = "default", lighting=None, fingerprint=None, preview: bool = False) -> Frame:
+        # One render yields RGB, depth and segmentation together; identical scenes reuse it.
+        # `fingerprint` lets batch captures hash the scene once for many renders.
+        # `preview` counts the cache lookup apart from snapshot traffic.
+        cam = get_camera(camera)
+        light = get_lighting(lighting) if lighting is not None else None
+        key = (cam.name, cam.width, cam.height, light.key() if light else None)
+        fp = None
+        if self.render_cache.enabled:
+            fp = fingerprint if fingerprint is not None else self.scene_fingerprint()
+        frame = self.render_cache.get(key, fp, preview)
+        if frame is not None:
+            return frame
+        img = p.getCameraImage(
+            cam.width,
+            cam.height,
+            viewMatrix=cam.view_matrix,
+            projectionMatrix=cam.proj_matrix,
+            renderer=p.ER_TINY_RENDERER,
+            **(light.kwargs() if light else {}),
+        )
+        frame = Frame(cam, img)
+        self.render_cache.put(key, fp, frame)
+        return frame
+
+    @recorded
+    def capture_grid(self, out_dir: Optional[str], cameras=("default",), lightings=("default",),
+                     modalities=("rgb",), layout: str = "files", prefix: str = "grid", tags=(),
+                     manifest: Optional[str] = "") -> dict:
+        """Every camera x lighting combination of the current scene in one call.
+
+        layout "files": `<out_dir>/<prefix>_<camera>_<lighting>.png` (+ depth/seg per
+        save_frame), each with a manifest record carrying its lighting. layout "stack":
+        arrays rgb [C, L, H, W, 3] (+ depth/seg [C, H, W], which do not depend on the light),
+        saved to `<out_dir>/<prefix>.npz` if out_dir is given and returned under "arrays".
+        """
+        if layout not in ("files", "stack"):
+            raise ValueError("layout must be 'files' or 'stack'")
+        cams = [get_camera(c) for c in cameras]
+        lights = [get_lighting(l) for l in lightings]
+        if layout == "files" and not out_dir:
+            raise ValueError("layout 'files' needs out_dir")
+        if layout == "stack" and len({(c.height, c.width) for c in cams}) > 1:
+            raise ValueError("layout 'stack' needs cameras of one resolution")
+        # The scene does not change between renders: hash it once
+        fp = self.scene_fingerprint() if self.render_cache.enabled else None
+        frames = [[self.render(c.name, l, fp) for l in lights] for c in cams]
+        out = {"cameras": [c.name for c in cams], "lightings": [l.meta() for l in lights]}
+        if layout == "stack":
+            arrays = {"rgb": np.stack([np.stack([f.rgb for f in row]) for row in frames])}
+            if "depth" in modalities:
+                arrays["depth"] = np.stack([row[0].depth for row in frames])
+            if "seg" in modalities:
+                arrays["seg"] = np.stack([row[0].seg for row in frames])
+            if out_dir:
+                os.makedirs(out_dir, exist_ok=True)
+                out["path"] = os.path.join(out_dir, f"{prefix}.npz")
+                np.savez_compressed(out["path"], cameras=np.array(out["cameras"]),
+                                    lightings=np.array([l.name for l in lights]), **arrays)
+            out["arrays"] = arrays
+            return out
+        os.makedirs(out_dir, exist_ok=True)
+        grid = []
+        for cam, row in zip(cams, frames):
+            grid.append([])
+            for light, frame in zip(lights, row):
+                path = os.path.join(out_dir, f"{prefix}_{cam.name}_{light.name}.png")
+                files = save_frame(frame, path, modalities)
+                grid[-1].append(files)
+                if manifest is not None:
+                    record = self.capture_record(path, list(tags) + [f"light:{light.name}"])
+                    record.update(camera=cam.name, lighting=light.meta(), files=absolute_files(files))
+                    self.manifest_for(manifest or default_manifest_path(path)).append(record)
+        out["files"] = grid
+        return out
+
+    def open_frame_ring(self, name: str = "panda_frames", slots: int = 8, camera: str = "default",
+                        depth: bool = True, replace: bool = False):
+        from frame_ring import RingWriter
+
+        cam = get_camera(camera)
+        if self.frame_ring is not None:
+            self.frame_ring.unlink()
+            self.frame_ring = None
+        self.frame_ring = RingWriter(name, cam.height, cam.width, slots=slots, depth=depth, replace=replace)
+        return self.frame_ring
+
+    def publish_frame(self, frame: Frame) -> Optional[int]:
+        ring = self.frame_ring
+        if ring is None or (frame.camera.height, frame.camera.width) != (ring.height, ring.width):
+            return None
+        return ring.publish(self.snapshot_count, self.step_count, self.sim_time(), frame.rgb,
+                            frame.depth if ring.has_depth else None)
+
+    def manifest_for(self, path: str) -> ManifestWriter:
+        path = os.path.abspath(path)
+        if path not in self.manifests:
+            self.manifests[path] = ManifestWriter(path)
+        return self.manifests[path]
+
+    def capture_record(self, frame_path: str, tags=()) -> dict:
+        ee_p, ee_q = self.get_ee_pose()
+        cb_p, cb_q = self.get_cube_pose()
+        fingers = self.get_finger_positions()
+        merged = list(dict.fromkeys(self.pending_tags + list(tags)))
+        self.pending_tags = []
+        return {
+            # Absolute: the server's cwd is not the consumer's
+            "frame": os.path.abspath(frame_path),
+            "t": self.now(),
+            "step": self.step_count,
+            "sim_time": self.sim_time(),
+            "joints": self.get_joint_positions(),
+            "fingers": fingers,
+            "gripper_width": sum(fingers),
+            "grasped": self.grasp_cid is not None,
+            "ee": {"pos": ee_p, "orn_xyzw": ee_q},
+            "cube": {"pos": cb_p, "orn_xyzw": cb_q},
+            # Mesh objects with their URDFs, so offline rendering can rebuild the scene
+            "objects": {name: dict(zip(("pos", "orn_xyzw"), self.body_pose(body)), urdf=self.objects[body])
+                        for name, body in self.meshes.items()},
+            "tags": merged,
+        }
+
+    @recorded
+    def snapshot(self, path: Optional[str], modalities=("rgb",), camera: str = "default", depth_format: str = "npz",
+                 tags=(), manifest: Optional[str] = "", publish: bool = False) -> dict:
+        # manifest: "" -> <frame dir>/manifest.jsonl, None -> don't record
+        # publish: also copy RGB/depth into the shared-memory frame ring; path=None skips files
+        frame = self.render(camera)
+        self.last_frame = frame
+        self.snapshot_count += 1
+        files = save_frame(frame, path, modalities, depth_format) if path else {}
+        ring_seq = self.publish_frame(frame) if publish else None
+        if ring_seq is not None:
+            files["ring"] = {"name": self.frame_ring.name, "seq": ring_seq}
+        if path and manifest is not None:
+            record = self.capture_record(path, tags)
+            record["camera"] = camera
+            record["files"] = absolute_files(files)
+            self.manifest_for(manifest or default_manifest_path(path)).append(record)
+        return files
@@ -30,11 +30,13 @@ def lerp(a, b, t):
 def capture_frame(idx: int, tag: str = ""):
     name = f"pp_{idx:04d}.png" if not tag else f"pp_{tag}_{idx:04d}.png"
     out = os.path.join("frames", name)
-    post("/snapshot", {"path": out})
+    post("/snapshot", {"path": out, "tags": [tag] if tag else []})
 
 
 def main():
     os.makedirs("frames", exist_ok=True)
+    # Rows append to the shared frames/manifest.jsonl; the video scripts keep the latest
+    # record per pp_*.png, so earlier runs and other captures need no reset
 
     # Prep: open gripper, spawn cube, go home
     post("/gripper", {"width": 0.08})
@@ -0,0 +1,205 @@
+"""Natural-language instruction -> typed skill plan (skills.py), with a plan cache.
+
+    compiler = PlanCompiler(RuleBackend())
+    plan, cached = compiler.compile("pick the cube, move right, place, home", scene)
+
+Backends turn an instruction plus a scene description into a list of steps; the result
+is validated against skills.SKILLS and cached by (backend, normalized instruction, scene
+signature), so a repeated command in the same scene skips the model call entirely.
+
+    RuleBackend   local keyword grammar (no model; deterministic, used by default)
+    ChatBackend   any OpenAI-compatible /chat/completions endpoint (PLAN_MODEL_URL)
+
+CLI: `python plan_compiler.py "pick the cube, move right, place, home" [--execute]`.
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from skills import DIRECTIONS, SKILLS, PlanError, validate_plan
+
+
+def normalize(instruction: str) -> str:
+    text = instruction.lower().replace("&", " and ")
+    text = re.sub(r"[^a-z0-9.,;\s-]", " ", text)
+    text = re.sub(r"\s*([,;])\s*", r"\1 ", text)
+    return re.sub(r"\s+", " ", text).strip(" ,;.")
+
+
+def scene_signature(scene: dict, quantum: float = 0.05) -> tuple:
+    # Object names and coarse positions: plans only change when the layout does
+    return tuple(sorted((name, tuple(round(v / quantum) for v in pos))
+                        for name, pos in scene.get("objects", {}).items()))
+
+
+# A unit is required: in "move right 5 more times" the 5 is not a distance
+_NUM = r"(\d+(?:\.\d+)?)\s*(cm|mm|m)\b"
+MAX_DISTANCE = 1.0  # m; about the arm's reach
+
+
+def _distance(text: str) -> Optional[float]:
+    m = re.search(_NUM, text)
+    if not m:
+        return None
+    dist = float(m.group(1)) * {"cm": 0.01, "mm": 0.001, "m": 1.0}[m.group(2)]
+    if dist > MAX_DISTANCE:
+        raise PlanError(f"distance {m.group(0)!r} is outside the workspace (max {MAX_DISTANCE} m)")
+    return dist
+
+
+class RuleBackend:
+    """Keyword grammar over comma/"then"/"and"-separated clauses. Distances need a unit (m, cm, mm)."""
+
+    name = "rule"
+
+    def compile(self, instruction: str, scene: dict) -> List[dict]:
+        objects = list(scene.get("objects", {})) or ["cube"]
+        plan = []
+        for clause in re.split(r"[,;]|\bthen\b|\band\b", instruction):
+            clause = clause.strip()
+            if not clause:
+                continue
+            words = set(clause.split())
+            obj = next((o for o in objects if o in words), objects[0])
+            dist = _distance(clause)
+            direction = next((d for d in DIRECTIONS if d in words), None)
+            if words & {"pick", "grab", "grasp", "take"}:
+                plan += [{"skill": "approach", "args": {"object": obj}},
+                         {"skill": "grasp", "args": {"object": obj}},
+                         {"skill": "lift"}]
+            elif "approach" in words:
+                plan.append({"skill": "approach", "args": {"object": obj}})
+            elif words & {"home", "reset"}:
+                plan.append({"skill": "home"})
+            elif words & {"place", "put", "set"}:
+                plan.append({"skill": "place"})
+            elif words & {"release", "drop", "open"} or "let go" in clause:
+                plan.append({"skill": "release"})
+            elif words & {"lift", "raise"}:
+                plan.append({"skill": "lift", "args": {"height": dist} if dist else {}})
+            elif direction:
+                args = {"direction": direction}
+                if dist:
+                    args["distance"] = dist
+                plan.append({"skill": "move", "args": args})
+            else:
+                raise PlanError(f"cannot interpret {clause!r}")
+        return plan
+
+
+class ChatBackend:
+    """Asks an OpenAI-compatible chat model for the plan as a JSON list."""
+
+    name = "chat"
+
+    def __init__(self, url: str, model: str, api_key: Optional[str] = None, timeout: float = 30.0):
+        self.url = url.rstrip("/") + "/chat/completions"
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+        self.name = f"chat:{model}"
+
+    def _prompt(self, scene: dict) -> str:
+        skills = {name: {k: (t.__name__, d) for k, (t, d) in args.items()} for name, args in SKILLS.items()}
+        return ("Translate the robot instruction into a JSON list of steps "
+                '[{"skill": name, "args": {...}}] using only these skills (arg: [type, default]): '
+                f"{json.dumps(skills)}. Directions: {sorted(DIRECTIONS)}. Distances in meters. "
+                f"Scene objects: {json.dumps(scene.get('objects', {}))}. Reply with the JSON list only.")
+
+    def compile(self, instruction: str, scene: dict) -> List[dict]:
+        import requests
+
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        try:
+            r = requests.post(self.url, headers=headers, timeout=self.timeout, json={
+                "model": self.model,
+                "temperature": 0,
+                "messages": [{"role": "system", "content": self._prompt(scene)},
+                             {"role": "user", "content": instruction}],
+            })
+            r.raise_for_status()
+            text = r.json()["choices"][0]["message"]["content"]
+        except requests.RequestException as e:
+            raise PlanError(f"plan model request failed: {e}")
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise PlanError(f"unexpected plan model response: {e!r}")
+        m = re.search(r"\[.*\]", text or "", re.S)
+        if not m:
+            raise PlanError(f"model reply is not a plan: {(text or '')[:200]!r}")
+        try:
+            return json.loads(m.group(0))
+        except json.JSONDecodeError as e:
+            raise PlanError(f"model reply is not valid JSON: {e}")
+
+
+def backend_from_env():
+    kind = os.environ.get("PLAN_BACKEND", "rule")
+    if kind == "chat":
+        return ChatBackend(os.environ["PLAN_MODEL_URL"], os.environ.get("PLAN_MODEL", "gpt-4o-mini"),
+                           os.environ.get("PLAN_API_KEY"))
+    return RuleBackend()
+
+
+class PlanCompiler:
+    def __init__(self, backend=None, cache_size: int = 256):
+        self.backend = backend or RuleBackend()
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[tuple, List[dict]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.model_ms = 0.0
+
+    def compile(self, instruction: str, scene: dict) -> Tuple[List[dict], bool]:
+        """(validated plan, came from cache)."""
+        text = normalize(instruction)
+        key = (self.backend.name, text, scene_signature(scene))
+        with self.lock:
+            plan = self.cache.get(key)
+            if plan is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return plan, True
+            self.misses += 1
+        # Model call outside the lock; a concurrent identical miss just compiles twice
+        t0 = time.perf_counter()
+        plan = validate_plan(self.backend.compile(text, scene))
+        self.model_ms += (time.perf_counter() - t0) * 1000.0
+        with self.lock:
+            self.cache[key] = plan
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return plan, False
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"backend": self.backend.name, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0, "size": len(self.cache),
+                "model_ms_total": self.model_ms}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compile an instruction into a skill plan")
+    ap.add_argument("instruction")
+    ap.add_argument("--execute", action="store_true", help="run it on the server via /command")
+    ap.add_argument("--base", default="http://127.0.0.1:5001")
+    args = ap.parse_args()
+
+    if args.execute:
+        import requests
+
+        r = requests.post(f"{args.base}/command", json={"instruction": args.instruction})
+        print(json.dumps(r.json(), indent=2))
+        return
+    plan, _ = PlanCompiler(backend_from_env()).compile(args.instruction, {"objects": {"cube": [0.55, 0.0, 0.025]}})
+    print(json.dumps(plan, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""Collision-aware joint-space planning (RRT-Connect + shortcut smoothing).
+
+Planning runs on a private DIRECT client that mirrors the live scene (plane, Panda,
+spawned objects), so it never disturbs the simulation being stepped. Collision checks
+are memoized on quantized configurations; the cache is dropped whenever the mirrored
+object poses change.
+"""
+
+import math
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pybullet as p
+import pybullet_data
+from pybullet_utils import bullet_client
+
+
+class CollisionChecker:
+    """Collision queries on a DIRECT mirror of the arm and scene objects.
+
+    `margin` is a safety clearance in metres: a configuration is in collision when any
+    checked pair is closer than `margin` (0 means only actual penetration counts). A held
+    object moves with the hand and gets the same clearance against the scene and the arm;
+    only its contact with the gripper is allowed, plus (see `check_start`) the contact it
+    already has with whatever it rests on, no deeper than at the start.
+    """
+
+    def __init__(self, sim, quantum: float = 0.01, margin: float = 0.0, cache_size: int = 200000):
+        self.quantum = quantum
+        self.margin = margin
+        self.cache_size = cache_size
+        self.cache: Dict[tuple, bool] = {}
+        self.hits = 0
+        self.checks = 0
+        self.bc = bullet_client.BulletClient(connection_mode=p.DIRECT)
+        self.bc.setAdditionalSearchPath(pybullet_data.getDataPath())
+        if margin > 0.02:
+            # Contact points are only reported for pairs closer than the breaking threshold
+            self.bc.setPhysicsEngineParameter(contactBreakingThreshold=margin)
+        self.plane = self.bc.loadURDF("plane.urdf")
+        self.robot = self.bc.loadURDF(
+            "franka_panda/panda.urdf",
+            useFixedBase=True,
+            flags=p.URDF_USE_SELF_COLLISION | p.URDF_USE_SELF_COLLISION_EXCLUDE_PARENT,
+        )
+        self.arm = list(sim.arm_joint_indices)
+        self.fingers = list(sim.finger_joint_indices)
+        self.ee_index = sim.ee_index
+        n = self.bc.getNumJoints(self.robot)
+        # Flange, hand, fingers and grasp frame: what a held object may touch
+        self.gripper_links = set(range(self.arm[-1] + 1, n))
+        info = [self.bc.getJointInfo(self.robot, j) for j in self.arm]
+        self.lower = np.array([i[8] for i in info])
+        self.upper = np.array([i[9] for i in info])
+        # Links two or fewer joints apart touch by construction (flange, hand, fingers)
+        self.ignore_self = {(a, b) for a in range(-1, n) for b in range(-1, n) if abs(a - b) <= 2}
+        self.ignore_self |= {(a, b) for a in self.fingers for b in self.fingers}
+        self.mirrored: Dict[int, int] = {}
+        self.attached: Optional[int] = None
+        # Held object's pose in the EE link frame, and the bodies it may keep touching
+        self.attach_offset = None
+        self.touching: Dict[int, float] = {}
+        self._scene_key = None
+
+    def sync(self, sim):
+        """Copy finger widths and object poses from the live sim (call with sim.lock held)."""
+        for j in self.fingers:
+            self.bc.resetJointState(self.robot, j, p.getJointState(sim.panda, j)[0])
+        for body in list(self.mirrored):
+            if body not in sim.objects:
+                self.bc.removeBody(self.mirrored.pop(body))
+        key = [tuple(np.round(sim.get_finger_positions(), 3))]
+        for body, urdf in sim.objects.items():
+            if body not in self.mirrored:
+                # Not fixed: Bullet skips pairs of static bodies, which would hide a held object
+                # going through the plane. Nothing is ever stepped here, so nothing falls.
+                self.mirrored[body] = self.bc.loadURDF(urdf)
+            pos, orn = p.getBasePositionAndOrientation(body)
+            self.bc.resetBasePositionAndOrientation(self.mirrored[body], pos, orn)
+            key.append((body, tuple(np.round(pos, 3)), tuple(np.round(orn, 3))))
+        attached = sim.attached_body()
+        self.attached = self.mirrored.get(attached) if attached is not None else None
+        self.attach_offset = None
+        if self.attached is not None:
+            ee_pos, ee_orn = p.getLinkState(sim.panda, self.ee_index, computeForwardKinematics=True)[:2]
+            inv_pos, inv_orn = p.invertTransform(ee_pos, ee_orn)
+            self.attach_offset = p.multiplyTransforms(inv_pos, inv_orn, *p.getBasePositionAndOrientation(attached))
+        key.append((self.attached, None if self.attach_offset is None else
+                    tuple(np.round(np.concatenate(self.attach_offset), 3))))
+        if key != self._scene_key:
+            self.cache.clear()
+            self._scene_key = key
+
+    def _pose(self, q: np.ndarray):
+        bc = self.bc
+        for j, v in zip(self.arm, q):
+            bc.resetJointState(self.robot, j, v)
+        if self.attached is not None:
+            ee_pos, ee_orn = bc.getLinkState(self.robot, self.ee_index, computeForwardKinematics=True)[:2]
+            bc.resetBasePositionAndOrientation(self.attached, *bc.multiplyTransforms(ee_pos, ee_orn,
+                                                                                     *self.attach_offset))
+        bc.performCollisionDetection()
+
+    def _in_collision(self, q: np.ndarray) -> bool:
+        self._pose(q)
+        for c in self.bc.getContactPoints(bodyA=self.robot):
+            if c[8] >= self.margin:
+                continue
+            other, la, lb = c[2], c[3], c[4]
+            if other == self.robot:
+                if (la, lb) not in self.ignore_self:
+                    return True
+            elif other == self.plane:
+                if la > 0:  # base link rests on the plane
+                    return True
+            elif other != self.attached:  # checked from the object's side below
+                return True
+        if self.attached is not None:
+            for c in self.bc.getContactPoints(bodyA=self.attached):
+                other, lb = c[2], c[4]
+                if other == self.robot and lb in self.gripper_links:
+                    continue
+                if c[8] < min(self.margin, self.touching.get(other, np.inf)):
+                    return True
+        return False
+
+    def check_start(self, q) -> Optional[str]:
+        """Why `q` cannot start a plan, or None. Call after sync().
+
+        The held object usually still rests on something when a plan starts (the table
+        it was picked from); that contact is allowed to stay, but not to get deeper.
+        """
+        q = np.asarray(q, dtype=float)
+        touching = {}
+        if self.attached is not None:
+            self._pose(q)
+            for c in self.bc.getContactPoints(bodyA=self.attached):
+                other = c[2]
+                if other != self.robot and c[8] < self.margin:
+                    # 1 mm for solver jitter in the resting contact
+                    touching[other] = min(touching.get(other, np.inf), c[8] - 1e-3)
+        if touching != self.touching:
+            self.touching = touching
+            self.cache.clear()
+        if self._in_collision(q):
+            return "start configuration is in collision"
+        return None
+
+    def is_free(self, q) -> bool:
+        key = tuple(np.round(np.asarray(q) / self.quantum).astype(np.int64))
+        hit = self.cache.get(key)
+        if hit is not None:
+            self.hits += 1
+            return hit
+        self.checks += 1
+        free = not self._in_collision(np.asarray(q, dtype=float))
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        self.cache[key] = free
+        return free
+
+    def segment_free(self, a, b, resolution: float = 0.04) -> bool:
+        a, b = np.asarray(a), np.asarray(b)
+        n = max(1, int(math.ceil(np.abs(b - a).max() / resolution)))
+        return all(self.is_free(a + (b - a) * (k / n)) for k in range(1, n + 1))
+
+    def stats(self) -> dict:
+        total = self.hits + self.checks
+        return {"checks": self.checks, "cache_hits": self.hits, "hit_rate": self.hits / total if total else 0.0,
+                "cache_size": len(self.cache)}
+
+
+class _Tree:
+    def __init__(self, root: np.ndarray, capacity: int):
+        self.q = np.empty((capacity, len(root)))
+        self.parent = np.full(capacity, -1, dtype=np.int64)
+        self.q[0] = root
+        self.n = 1
+
+    def nearest(self, q: np.ndarray) -> int:
+        return int(np.argmin(np.sum((self.q[:self.n] - q) ** 2, axis=1)))
+
+    def add(self, q: np.ndarray, parent: int) -> int:
+        self.q[self.n] = q
+        self.parent[self.n] = parent
+        self.n += 1
+        return self.n - 1
+
+    def path_to_root(self, i: int) -> List[np.ndarray]:
+        out = []
+        while i >= 0:
+            out.append(self.q[i].copy())
+            i = self.parent[i]
+        return out
+
+
+class RRTConnect:
+    def __init__(self, checker: CollisionChecker, step: float = 0.15, max_nodes: int = 20000):
+        self.checker = checker
+        self.step = step
+        self.max_nodes = max_nodes
+
+    def _extend(self, tree: _Tree, target: np.ndarray):
+        """One step from the nearest node toward `target`: (status, index)."""
+        i = tree.nearest(target)
+        q = tree.q[i]
+        d = target - q
+        dist = np.linalg.norm(d)
+        reached = dist <= self.step
+        q_new = target if reached else q + d * (self.step / dist)
+        if not self.checker.segment_free(q, q_new):
+            return "trapped", i
+        return ("reached" if reached else "advanced"), tree.add(q_new, i)
+
+    def _connect(self, tree: _Tree, target: np.ndarray):
+        while tree.n < self.max_nodes:
+            status, i = self._extend(tree, target)
+            if status != "advanced":
+                return status, i
+        return "trapped", -1
+
+    def plan(self, start: Sequence[float], goal: Sequence[float], timeout: float = 5.0,
+             seed: Optional[int] = None) -> Optional[List[np.ndarray]]:
+        rng = random.Random(seed)
+        ck = self.checker
+        start, goal = np.asarray(start, dtype=float), np.asarray(goal, dtype=float)
+        if not ck.is_free(goal):
+            return None
+        if ck.segment_free(start, goal):
+            return [start, goal]
+        ta, tb = _Tree(start, self.max_nodes), _Tree(goal, self.max_nodes)
+        t_end = time.perf_counter() + timeout
+        while time.perf_counter() < t_end and ta.n < self.max_nodes and tb.n < self.max_nodes:
+            q_rand = np.array([rng.uniform(lo, hi) for lo, hi in zip(ck.lower, ck.upper)])
+            status, i = self._extend(ta, q_rand)
+            if status != "trapped":
+                status, j = self._connect(tb, ta.q[i])
+                if status == "reached":
+                    a, b = ta.path_to_root(i)[::-1], tb.path_to_root(j)
+                    path = a + b[1:]
+                    if not np.allclose(path[0], start):
+                        path = path[::-1]
+                    return path
+            ta, tb = tb, ta
+        return None
+
+    def shortcut(self, path: List[np.ndarray], iters: int = 100, seed: Optional[int] = None) -> List[np.ndarray]:
+        rng = random.Random(seed)
+        path = list(path)
+        for _ in range(iters):
+            if len(path) <= 2:
+                break
+            i, j = sorted(rng.sample(range(len(path)), 2))
+            if j - i > 1 and self.checker.segment_free(path[i], path[j]):
+                path = path[:i + 1] + path[j:]
+        return path
+
+
+class MotionPlanner:
+    """Plans for a PandaSim on its own mirrored DIRECT client."""
+
+    def __init__(self, sim, **checker_kwargs):
+        # One query at a time: the mirror client and cache are not thread-safe
+        self.lock = threading.Lock()
+        self.checker = CollisionChecker(sim, **checker_kwargs)
+        self.rrt = RRTConnect(self.checker)
+
+    def plan(self, sim, goal: Sequence[float], timeout: float = 5.0, smooth_iters: int = 100,
+             seed: Optional[int] = None) -> dict:
+        with sim.lock:
+            self.checker.sync(sim)
+            start = sim.get_joint_positions()
+        t0 = time.perf_counter()
+        error = self.checker.check_start(start)
+        if error is not None:
+            return {"ok": False, "error": error, "path": None, "raw_waypoints": 0, "plan_ms": 0.0,
+                    "total_ms": (time.perf_counter() - t0) * 1000.0, **self.checker.stats()}
+        path = self.rrt.plan(start, goal, timeout=timeout, seed=seed)
+        t_plan = time.perf_counter() - t0
+        raw = 0 if path is None else len(path)
+        if path is not None:
+            path = self.rrt.shortcut(path, iters=smooth_iters, seed=seed)
+        return {
+            "ok": path is not None,
+            "path": None if path is None else [q.tolist() for q in path],
+            "raw_waypoints": raw,
+            "plan_ms": t_plan * 1000.0,
+            "total_ms": (time.perf_counter() - t0) * 1000.0,
+            **self.checker.stats(),
+        }
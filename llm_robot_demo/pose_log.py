@@ -0,0 +1,74 @@
+"""Columnar ring buffer of per-step poses.
+
+One preallocated NumPy array per column instead of a list of nested dicts, so hour-long
+logs stay compact and can be shipped in one `/pose_log_dump?format=npz` request:
+
+    t        float64 [N]     seconds since the last reset (PandaSim.now())
+    step     int64   [N]     physics step count
+    ee       float32 [N, 7]  end-effector position + orientation (xyzw)
+    cube     float32 [N, 7]  cube pose, NaN while no cube is spawned
+    width    float32 [N]     finger opening (sum of both finger joints)
+    held     uint8   [N]     1 while the contact monitor reports the cube as held
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+
+COLUMNS = {
+    "t": (np.float64, ()),
+    "step": (np.int64, ()),
+    "ee": (np.float32, (7,)),
+    "cube": (np.float32, (7,)),
+    "width": (np.float32, ()),
+    "held": (np.uint8, ()),
+}
+
+
+class PoseLog:
+    def __init__(self, capacity: int = 240 * 3600):
+        # np.empty only commits pages as rows are written, so a large capacity is cheap
+        self.capacity = capacity
+        self.cols = {name: np.empty((capacity,) + shape, dtype=dt) for name, (dt, shape) in COLUMNS.items()}
+        self.clear()
+
+    def clear(self):
+        self.head = 0  # next row to write
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, t: float, step: int, ee, cube, width: float, held: bool):
+        i = self.head
+        c = self.cols
+        c["t"][i] = t
+        c["step"][i] = step
+        c["ee"][i] = ee
+        c["cube"][i] = cube if cube is not None else np.nan
+        c["width"][i] = width
+        c["held"][i] = held
+        self.head = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def arrays(self, every: int = 1, last: int = None) -> Dict[str, np.ndarray]:
+        """Copies of all columns in time order, optionally keeping every `every`-th row
+        of the `last` rows."""
+        n = self.size if last is None else min(last, self.size)
+        start = (self.head - n) % self.capacity
+        idx = (start + np.arange(0, n, max(1, every))) % self.capacity
+        return {name: col[idx] for name, col in self.cols.items()}
+
+    def records(self, last: int = 5000) -> List[dict]:
+        """Legacy JSON layout of the `last` rows: [{"t", "ee": {"pos", "orn_xyzw"}, "cube": {...}}]."""
+        a = self.arrays(last=last)
+        out = []
+        for t, ee, cube in zip(a["t"].tolist(), a["ee"].tolist(), a["cube"].tolist()):
+            has_cube = cube[0] == cube[0]  # NaN check without numpy scalars
+            out.append({
+                "t": t,
+                "ee": {"pos": ee[:3], "orn_xyzw": ee[3:]},
+                "cube": {"pos": cube[:3] if has_cube else None, "orn_xyzw": cube[3:] if has_cube else None},
+            })
+        return out
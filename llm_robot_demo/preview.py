@@ -0,0 +1,106 @@
+import io
+import threading
+import time
+
+
+class PreviewStream:
+    """Live MJPEG preview of the default camera.
+
+    Frames are rendered at most `fps` times per second from the sim loop (a step hook,
+    so the render sees a consistent scene) and once per tick no matter how many viewers
+    are connected. JPEG encoding runs on its own thread; if it falls behind, pending raw
+    frames are overwritten, and slow viewers simply skip to the newest JPEG. Physics is
+    never made to wait on a viewer.
+    """
+
+    def __init__(self, sim, fps: float = 5.0, quality: int = 80):
+        self.sim = sim
+        self.period = 1.0 / max(0.1, fps)
+        self.quality = quality
+        self.viewers = 0
+        self.rendered = 0
+        self.dropped = 0
+        self._started = False
+        self._last_render = 0.0
+        self._lock = threading.Lock()
+        self._raw = None
+        self._raw_cond = threading.Condition()
+        self._jpeg = None
+        self._seq = 0
+        self._jpeg_cond = threading.Condition()
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.sim.step_hooks.append(self.on_step)
+        threading.Thread(target=self._encode_loop, name="preview-encode", daemon=True).start()
+        threading.Thread(target=self._idle_loop, name="preview-idle", daemon=True).start()
+
+    def on_step(self, sim):
+        # Runs inside the sim loop with sim.lock held
+        if self.viewers and time.monotonic() - self._last_render >= self.period:
+            self._render()
+
+    def _render(self):
+        self._last_render = time.monotonic()
+        rgb = self.sim.render(preview=True).rgb
+        self.rendered += 1
+        with self._raw_cond:
+            if self._raw is not None:
+                self.dropped += 1
+            self._raw = rgb
+            self._raw_cond.notify()
+
+    def _idle_loop(self):
+        # Keeps the stream alive while no command is stepping the sim; never waits for the lock
+        while True:
+            time.sleep(self.period)
+            if not self.viewers or time.monotonic() - self._last_render < self.period:
+                continue
+            if self.sim.lock.acquire(blocking=False):
+                try:
+                    self._render()
+                finally:
+                    self.sim.lock.release()
+
+    def _encode_loop(self):
+        from PIL import Image
+
+        while True:
+            with self._raw_cond:
+                while self._raw is None:
+                    self._raw_cond.wait()
+                rgb, self._raw = self._raw, None
+            buf = io.BytesIO()
+            Image.fromarray(rgb, mode="RGB").save(buf, format="JPEG", quality=self.quality)
+            with self._jpeg_cond:
+                self._jpeg = buf.getvalue()
+                self._seq += 1
+                self._jpeg_cond.notify_all()
+
+    def frames(self):
+        """Multipart chunks for one viewer; always jumps to the newest frame."""
+        with self._lock:
+            self.viewers += 1
+        seq = 0
+        try:
+            while True:
+                with self._jpeg_cond:
+                    if not self._jpeg_cond.wait_for(lambda: self._seq != seq, timeout=5.0):
+                        continue
+                    seq, jpeg = self._seq, self._jpeg
+                yield (
+                    b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: "
+                    + str(len(jpeg)).encode("ascii")
+                    + b"\r\n\r\n"
+                    + jpeg
+                    + b"\r\n"
+                )
+        finally:
+            with self._lock:
+                self.viewers -= 1
+
+    def stats(self) -> dict:
+        return {"viewers": self.viewers, "rendered": self.rendered, "dropped": self.dropped, "fps_cap": 1.0 / self.period}
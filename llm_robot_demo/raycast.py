@@ -0,0 +1,87 @@
+"""Batched ray casting on the live scene (p.rayTestBatch).
+
+`cast_rays` takes N origin/target pairs as arrays, splits them into chunks of
+PyBullet's per-call limit (MAX_RAY_INTERSECTION_BATCH_SIZE) and returns columns:
+
+    body      int32   [N]     hit body id, -1 for a miss
+    link      int32   [N]     hit link index (-1 = base)
+    fraction  float32 [N]     hit fraction along the ray (1.0 for a miss)
+    pos       float32 [N, 3]  hit position in world coordinates
+    normal    float32 [N, 3]  hit normal in world coordinates
+
+PyBullet parallelizes each batch internally over `num_threads` (0 = all cores); the
+calls themselves must stay on the client's thread, so chunks are issued in sequence.
+`probe_scores` builds the probing-specific rays (camera line of sight, clearance above
+a point, approach from the end effector) on top of it.
+"""
+
+from typing import Dict, Iterable
+
+import numpy as np
+import pybullet as p
+
+
+BATCH = getattr(p, "MAX_RAY_INTERSECTION_BATCH_SIZE", 16384) - 1
+
+
+def cast_rays(origins: np.ndarray, targets: np.ndarray, num_threads: int = 0) -> Dict[str, np.ndarray]:
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+    targets = np.asarray(targets, dtype=np.float64).reshape(-1, 3)
+    if origins.shape != targets.shape:
+        raise ValueError("origins and targets must have the same shape [N, 3]")
+    n = len(origins)
+    out = np.empty((n, 9), dtype=np.float64)
+    for lo in range(0, n, BATCH):
+        hi = min(n, lo + BATCH)
+        res = p.rayTestBatch(origins[lo:hi].tolist(), targets[lo:hi].tolist(), numThreads=num_threads)
+        # (body, link, fraction, (x, y, z), (nx, ny, nz)) per ray -> one flat row each
+        out[lo:hi] = np.array([(r[0], r[1], r[2], *r[3], *r[4]) for r in res], dtype=np.float64)
+    return {
+        "body": out[:, 0].astype(np.int32),
+        "link": out[:, 1].astype(np.int32),
+        "fraction": out[:, 2].astype(np.float32),
+        "pos": out[:, 3:6].astype(np.float32),
+        "normal": out[:, 6:9].astype(np.float32),
+    }
+
+
+def probe_scores(sim, points: np.ndarray, cameras: Iterable = (), clearance: float = 0.05,
+                 standoff: float = 0.002, tol: float = 0.003, num_threads: int = 0) -> Dict[str, np.ndarray]:
+    """Per candidate probe point: visible from each camera, free `clearance` above it,
+    and reachable in a straight line from the current EE position.
+
+    A ray counts as reaching the point if its first hit lies within `tol` of it (the
+    point's own surface is usually what gets hit). All rays go out in one batched cast.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    n = len(pts)
+    up = np.array([0.0, 0.0, 1.0])
+    origins, targets = [], []
+    cams = list(cameras)
+    for cam in cams:
+        origins.append(np.broadcast_to(cam.position(), pts.shape))
+        targets.append(pts)
+    # Clearance: from just above the surface straight up
+    origins.append(pts + standoff * up)
+    targets.append(pts + clearance * up)
+    # Approach: from the grasp point, started 1 cm out so the open fingers are not hit
+    ee = np.asarray(sim.get_ee_pose()[0])
+    d = pts - ee
+    origins.append(ee + 0.01 * d / np.maximum(np.linalg.norm(d, axis=1, keepdims=True), 1e-9))
+    targets.append(pts)
+    hits = cast_rays(np.concatenate(origins), np.concatenate(targets), num_threads)
+
+    def reaches(k: int) -> np.ndarray:
+        sl = slice(k * n, (k + 1) * n)
+        miss = hits["body"][sl] < 0
+        near = np.linalg.norm(hits["pos"][sl] - pts, axis=1) <= tol
+        return miss | near
+
+    k = len(cams)
+    visible = np.stack([reaches(i) for i in range(k)], axis=1) if cams else np.zeros((n, 0), bool)
+    clear_above = hits["body"][k * n:(k + 1) * n] < 0
+    ee_line = reaches(k + 1)
+    score = clear_above.astype(np.float32) + ee_line
+    if cams:
+        score += visible.mean(axis=1)
+    return {"visible": visible, "clear_above": clear_above, "ee_line": ee_line, "score": score}
@@ -0,0 +1,52 @@
+"""Example run of /raycast and /probe_score against a spawned cube.
+
+Start `python server.py`, then `python raycast_probe.py`: spawns the cube, casts a grid
+of vertical rays over it (packed float32 and JSON bodies) and scores probe points on its
+top face. Exits non-zero if the rays over the cube miss it.
+"""
+
+import io
+import sys
+
+import numpy as np
+import requests
+
+
+BASE = "http://127.0.0.1:5001"
+CUBE = [0.5, 0.0, 0.025]
+
+
+def main() -> int:
+    r = requests.post(f"{BASE}/spawn_cube", json={"pos": CUBE})
+    r.raise_for_status()
+    cube_id = r.json()["cube_id"]
+
+    # 100 x 100 rays from 0.3 m down to below the table over a 10 cm square around the cube
+    xs, ys = np.meshgrid(np.linspace(-0.05, 0.05, 100), np.linspace(-0.05, 0.05, 100))
+    top = np.stack([CUBE[0] + xs.ravel(), CUBE[1] + ys.ravel(), np.full(xs.size, 0.3)], axis=1)
+    bottom = top * [1, 1, 0] - [0, 0, 0.01]
+    rays = np.hstack([top, bottom]).astype(np.float32)
+    r = requests.post(f"{BASE}/raycast", data=rays.tobytes(), headers={"Content-Type": "application/octet-stream"})
+    r.raise_for_status()
+    hits = np.load(io.BytesIO(r.content))
+    on_cube = hits["body"] == cube_id
+    print(f"{len(rays)} rays: {int(on_cube.sum())} hit the cube, {int((hits['body'] < 0).sum())} missed; "
+          f"top face at z={float(hits['pos'][on_cube, 2].mean()) if on_cube.any() else float('nan'):.4f}")
+
+    # Same cast over JSON for the center ray
+    r = requests.post(f"{BASE}/raycast?format=json",
+                      json={"origins": [[CUBE[0], CUBE[1], 0.3]], "targets": [[CUBE[0], CUBE[1], -0.01]]})
+    r.raise_for_status()
+    center = r.json()
+    print(f"center ray (json): body {center['body'][0]}, fraction {center['fraction'][0]:.3f}")
+
+    points = [[CUBE[0] + dx, CUBE[1], 0.05] for dx in (-0.01, 0.0, 0.01)]
+    r = requests.post(f"{BASE}/probe_score", json={"points": points, "cameras": ["default", "top"]})
+    r.raise_for_status()
+    print("probe scores:", np.round(r.json()["score"], 3).tolist())
+
+    return 0 if on_cube.any() and center["body"][0] == cube_id else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
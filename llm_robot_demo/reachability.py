@@ -0,0 +1,215 @@
+"""Precomputed Panda workspace reachability index.
+
+`python reachability.py build` samples the workspace on a 3D grid (optionally for a few
+gripper orientations), solves IK per cell from several seeds in DIRECT clients spread
+over a process pool, and stores per cell/orientation:
+
+    seeds.npy   float32 [nx, ny, nz, no, 7]  best IK solution (warm start for move_ik)
+    manip.npy   float32 [nx, ny, nz, no]     Yoshikawa manipulability sqrt(det(J J^T))
+    reach.npy   uint8   [nx, ny, nz, no]     1 if IK converged within tolerance and limits
+    meta.json   bounds, resolution, shape, orientations
+
+The server memory-maps the arrays on first use, so a query is an index computation.
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from multiprocessing import Pool
+from typing import List, Optional
+
+import numpy as np
+
+
+ORIENTATIONS = {
+    # Gripper pointing straight down (as in the pick/place scripts), and position-only IK
+    "down": [1.0, 0.0, 0.0, 0.0],
+    "any": None,
+}
+
+HOME = [0, -0.4, 0, -2.0, 0, 1.7, 0.8]
+
+
+class ReachabilityIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self._loaded = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        with open(os.path.join(self.path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.lo = np.array(self.meta["bounds"][:3])
+        self.res = float(self.meta["resolution"])
+        self.shape = tuple(self.meta["shape"])
+        self.orientations = self.meta["orientations"]
+        self.seeds = np.load(os.path.join(self.path, "seeds.npy"), mmap_mode="r")
+        self.manip = np.load(os.path.join(self.path, "manip.npy"), mmap_mode="r")
+        self.reach = np.load(os.path.join(self.path, "reach.npy"), mmap_mode="r")
+        self._loaded = True
+
+    def _orientation_slot(self, orn: Optional[List[float]], max_angle: Optional[float] = None) -> Optional[int]:
+        # Match only within the tolerance the cells were solved with
+        if max_angle is None:
+            max_angle = float(self.meta.get("orn_tol", 0.1))
+        best, best_angle, any_slot = None, max_angle, None
+        for k, q in enumerate(self.orientations):
+            if q is None:
+                any_slot = k
+            elif orn is not None:
+                angle = 2 * math.acos(min(1.0, abs(float(np.dot(q, orn)))))
+                if angle <= best_angle:
+                    best, best_angle = k, angle
+        return best if best is not None else any_slot
+
+    def query(self, pos: List[float], orn: Optional[List[float]] = None) -> Optional[dict]:
+        """Cell data for `pos`/`orn`, or None if outside the indexed workspace.
+
+        "reachable" was solved at the cell centre from a few seeds, so it is a hint: a
+        negative can be wrong near the workspace boundary.
+        """
+        self._load()
+        cell = np.floor((np.asarray(pos) - self.lo) / self.res).astype(int)
+        if np.any(cell < 0) or np.any(cell >= self.shape[:3]):
+            return None
+        k = self._orientation_slot(orn)
+        if k is None:
+            return None
+        i, j, l = cell
+        return {
+            "reachable": bool(self.reach[i, j, l, k]),
+            "manipulability": float(self.manip[i, j, l, k]),
+            "seed": self.seeds[i, j, l, k].tolist(),
+            "cell": [int(i), int(j), int(l)],
+            "orientation": k,
+        }
+
+
+_bc = None
+_robot = None
+_arm = None
+
+
+def _init_worker():
+    global _bc, _robot, _arm
+    import pybullet as p
+    import pybullet_data
+    from pybullet_utils import bullet_client
+
+    _bc = bullet_client.BulletClient(connection_mode=p.DIRECT)
+    _bc.setAdditionalSearchPath(pybullet_data.getDataPath())
+    _robot = _bc.loadURDF("franka_panda/panda.urdf", useFixedBase=True)
+    _arm = [j for j in range(_bc.getNumJoints(_robot)) if _bc.getJointInfo(_robot, j)[2] == p.JOINT_REVOLUTE]
+
+
+def _solve_cell(pos, orn, seeds, lower, upper, ee_index, pos_tol, orn_tol):
+    bc, robot = _bc, _robot
+    best = None
+    for seed in seeds:
+        for j, v in zip(_arm, seed):
+            bc.resetJointState(robot, j, v)
+        kwargs = {"targetOrientation": orn} if orn is not None else {}
+        sol = bc.calculateInverseKinematics(robot, ee_index, pos, maxNumIterations=100,
+                                            residualThreshold=1e-4, **kwargs)
+        q = np.array(sol[:len(_arm)])
+        if np.any(q < lower) or np.any(q > upper):
+            continue
+        for j, v in zip(_arm, q):
+            bc.resetJointState(robot, j, v)
+        ls = bc.getLinkState(robot, ee_index, computeForwardKinematics=True)
+        if np.linalg.norm(np.array(ls[4]) - pos) > pos_tol:
+            continue
+        if orn is not None and 2 * math.acos(min(1.0, abs(float(np.dot(ls[5], orn))))) > orn_tol:
+            continue
+        n_dof = len(sol)
+        lin, ang = bc.calculateJacobian(robot, ee_index, [0, 0, 0], list(sol), [0.0] * n_dof, [0.0] * n_dof)
+        J = np.vstack([np.array(lin), np.array(ang)])[:, :len(_arm)]
+        m = math.sqrt(max(0.0, np.linalg.det(J @ J.T)))
+        if best is None or m > best[1]:
+            best = (q, m)
+    return best
+
+
+def _build_slab(args):
+    """All cells with x index `i` (one task per slab keeps IPC small)."""
+    i, lo, res, shape, orientations, n_seeds, ee_index, pos_tol, orn_tol = args
+    rng = np.random.default_rng(i)
+    info = [_bc.getJointInfo(_robot, j) for j in _arm]
+    lower = np.array([x[8] for x in info])
+    upper = np.array([x[9] for x in info])
+    seeds = [np.array(HOME)] + [rng.uniform(lower, upper) for _ in range(n_seeds - 1)]
+    _, ny, nz, no = shape
+    out_seed = np.zeros((ny, nz, no, len(_arm)), dtype=np.float32)
+    out_manip = np.zeros((ny, nz, no), dtype=np.float32)
+    out_reach = np.zeros((ny, nz, no), dtype=np.uint8)
+    for j in range(ny):
+        for l in range(nz):
+            pos = lo + (np.array([i, j, l]) + 0.5) * res
+            for k, orn in enumerate(orientations):
+                best = _solve_cell(pos, orn, seeds, lower, upper, ee_index, pos_tol, orn_tol)
+                if best is not None:
+                    out_seed[j, l, k], out_manip[j, l, k], out_reach[j, l, k] = best[0], best[1], 1
+    return i, out_seed, out_manip, out_reach
+
+
+def build(out_dir: str, bounds: List[float], resolution: float, orientations: List[str], n_seeds: int = 4,
+          workers: Optional[int] = None, ee_index: int = 11, pos_tol: float = 0.01, orn_tol: float = 0.1):
+    lo, hi = np.array(bounds[:3]), np.array(bounds[3:])
+    dims = tuple(int(math.ceil(d)) for d in (hi - lo) / resolution)
+    quats = [ORIENTATIONS[name] for name in orientations]
+    shape = dims + (len(quats),)
+    os.makedirs(out_dir, exist_ok=True)
+    open_mm = np.lib.format.open_memmap
+    seeds = open_mm(os.path.join(out_dir, "seeds.npy"), mode="w+", dtype=np.float32, shape=shape + (7,))
+    manip = open_mm(os.path.join(out_dir, "manip.npy"), mode="w+", dtype=np.float32, shape=shape)
+    reach = open_mm(os.path.join(out_dir, "reach.npy"), mode="w+", dtype=np.uint8, shape=shape)
+    tasks = [(i, lo, resolution, shape, quats, n_seeds, ee_index, pos_tol, orn_tol) for i in range(dims[0])]
+    with Pool(processes=workers or os.cpu_count(), initializer=_init_worker) as pool:
+        for i, s, m, r in pool.imap_unordered(_build_slab, tasks):
+            seeds[i], manip[i], reach[i] = s, m, r
+    for arr in (seeds, manip, reach):
+        arr.flush()
+    meta = {
+        "bounds": [float(x) for x in bounds],
+        "resolution": resolution,
+        "shape": list(shape),
+        "orientation_names": orientations,
+        "orientations": quats,
+        "ee_index": ee_index,
+        "pos_tol": pos_tol,
+        "orn_tol": orn_tol,
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return float(reach.mean())
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build or query the Panda reachability index")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build")
+    b.add_argument("--out", default="reach_index")
+    b.add_argument("--bounds", default="-0.9,-0.9,0.0,0.9,0.9,1.1", help="xmin,ymin,zmin,xmax,ymax,zmax")
+    b.add_argument("--res", type=float, default=0.05)
+    b.add_argument("--orientations", default="down,any", help=f"comma list of {sorted(ORIENTATIONS)}")
+    b.add_argument("--seeds", type=int, default=4)
+    b.add_argument("--workers", type=int, default=None)
+    q = sub.add_parser("query")
+    q.add_argument("--index", default="reach_index")
+    q.add_argument("pos", type=float, nargs=3)
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        t0 = time.perf_counter()
+        bounds = [float(x) for x in args.bounds.split(",")]
+        frac = build(args.out, bounds, args.res, args.orientations.split(","), args.seeds, args.workers)
+        print(f"built {os.path.abspath(args.out)} in {time.perf_counter() - t0:.1f}s, {100 * frac:.1f}% reachable")
+    else:
+        print(ReachabilityIndex(args.index).query(args.pos))
+
+
+if __name__ == "__main__":
+    main()
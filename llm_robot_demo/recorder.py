@@ -0,0 +1,87 @@
+"""Record every state-changing PandaSim command for headless replay (see replay.py).
+
+The log is gzip'd JSON lines:
+    {"version": 1, "dt": ..., "state": {...}}        header: joint/cube/grasp state at start
+    {"step": n, "cmd": "movej", "args": {...}}       one per outermost command
+    {"end": true, "state": {...}}                   final state, used to verify a replay
+Nested calls (e.g. move_ik -> movej) are not logged twice; snapshots are logged too
+so replays regenerate the same frames.
+"""
+
+import functools
+import gzip
+import inspect
+import json
+
+import numpy as np
+
+
+def _json_default(o):
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if isinstance(o, (np.floating, np.integer)):
+        return o.item()
+    if isinstance(o, tuple):
+        return list(o)
+    raise TypeError(f"cannot record {type(o).__name__}")
+
+
+class CommandRecorder:
+    def __init__(self, path: str, sim):
+        self.path = path
+        self.count = 0
+        self.depth = 0
+        self._f = gzip.open(path, "wt", compresslevel=6)
+        self._write({"version": 1, "dt": sim.dt, "state": sim.capture_state()})
+
+    def _write(self, obj: dict):
+        self._f.write(json.dumps(obj, separators=(",", ":"), default=_json_default) + "\n")
+
+    def log(self, step: int, cmd: str, args: dict):
+        self._write({"step": step, "cmd": cmd, "args": args})
+        self.count += 1
+
+    def close(self, sim):
+        self._write({"end": True, "state": sim.capture_state()})
+        self._f.close()
+
+
+def recorded(fn):
+    """Log the outermost call of a PandaSim method to `self.recorder`, if one is attached."""
+    sig = inspect.signature(fn)
+    var_kw = [n for n, prm in sig.parameters.items() if prm.kind is inspect.Parameter.VAR_KEYWORD]
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        rec = self.recorder
+        if rec is None or rec.depth:
+            return fn(self, *args, **kwargs)
+        bound = sig.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        call_args = dict(bound.arguments)
+        call_args.pop("self")
+        for name in var_kw:
+            call_args.update(call_args.pop(name, {}))
+        rec.log(self.step_count, fn.__name__, call_args)
+        rec.depth += 1
+        try:
+            return fn(self, *args, **kwargs)
+        finally:
+            rec.depth -= 1
+
+    return wrapper
+
+
+def read_log(path: str):
+    """(header, commands, end) from a recording."""
+    header, commands, end = None, [], None
+    with gzip.open(path, "rt") as f:
+        for line in f:
+            rec = json.loads(line)
+            if header is None:
+                header = rec
+            elif rec.get("end"):
+                end = rec
+            else:
+                commands.append(rec)
+    return header, commands, end
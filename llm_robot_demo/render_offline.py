@@ -0,0 +1,77 @@
+"""Render frames offline from a recorded per-frame state stream (a capture manifest).
+
+Frames only depend on the recorded joint positions, finger widths and object poses,
+so they are independent: the stream is sharded across a process pool, each worker
+owns a DIRECT PyBullet client with the same URDFs, teleports to each state (cube and
+mesh objects included) and renders with the camera and lighting stored in the record
+and the same renderer as in-loop capture. `--camera` overrides the recorded camera.
+"""
+
+import argparse
+import os
+import time
+from multiprocessing import Pool
+from typing import Optional
+
+from manifest import read_manifest
+
+
+_sim = None
+_out_dir = None
+_camera = None
+
+
+def _init_worker(out_dir: str, camera: Optional[str]):
+    global _sim, _out_dir, _camera
+    from panda_sim import PandaSim
+
+    _sim = PandaSim(gui=False, realtime=False)
+    _sim.render_cache.enabled = False
+    _out_dir, _camera = out_dir, camera
+
+
+def _render_shard(records):
+    from camera import lighting_from_meta, save_frame
+
+    out = []
+    for rec in records:
+        _sim.teleport(rec["joints"], rec["fingers"], rec.get("cube"), rec.get("objects"))
+        lighting = rec.get("lighting")
+        frame = _sim.render(_camera or rec.get("camera") or "default",
+                            lighting_from_meta(lighting) if lighting else None)
+        path = os.path.join(_out_dir, os.path.basename(rec["frame"]))
+        save_frame(frame, path, ("rgb",))
+        out.append(path)
+    return out
+
+
+def render_manifest(manifest_path: str, out_dir: str, workers: int = None, camera: Optional[str] = None,
+                    shard: int = 32):
+    records = read_manifest(manifest_path)
+    os.makedirs(out_dir, exist_ok=True)
+    # Contiguous shards keep consecutive states (and the spawned cube/meshes) on one worker
+    shards = [records[i:i + shard] for i in range(0, len(records), shard)]
+    written = []
+    with Pool(processes=workers or os.cpu_count(), initializer=_init_worker, initargs=(out_dir, camera)) as pool:
+        for paths in pool.imap(_render_shard, shards):
+            written.extend(paths)
+    return written
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Render a capture manifest's states in parallel")
+    ap.add_argument("manifest", help="e.g. frames/manifest.jsonl")
+    ap.add_argument("--out", default="frames_offline")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--camera", default=None, help="render every state from this camera (default: the recorded one)")
+    ap.add_argument("--shard", type=int, default=32, help="states per task")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    written = render_manifest(args.manifest, args.out, args.workers, args.camera, args.shard)
+    dt = time.perf_counter() - t0
+    print(f"rendered {len(written)} frames to {os.path.abspath(args.out)} in {dt:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from panda_sim import PandaSim
+from recorder import read_log
+
+
+def replay(log_path: str, out_dir: str = None, render: bool = True) -> PandaSim:
+    """Re-execute a recorded session in DIRECT mode without real-time pacing."""
+    header, commands, end = read_log(log_path)
+    sim = PandaSim(gui=False, realtime=False)
+    sim.dt = header["dt"]
+    sim.apply_state(header["state"])
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    drift = 0
+    for rec in commands:
+        if rec["step"] != sim.step_count:
+            drift += 1
+        cmd, args = rec["cmd"], dict(rec["args"])
+        if cmd in ("snapshot", "capture_grid"):
+            if not render:
+                continue
+            if out_dir:
+                # Frames and manifest rows go to out_dir, never over the recorded ones
+                if cmd == "snapshot" and args.get("path"):
+                    args["path"] = os.path.join(out_dir, os.path.basename(args["path"]))
+                if cmd == "capture_grid" and args.get("out_dir"):
+                    args["out_dir"] = out_dir
+                if args.get("manifest") is not None:
+                    args["manifest"] = os.path.join(out_dir, "manifest.jsonl")
+        getattr(sim, cmd)(**args)
+
+    if drift:
+        print(f"warning: {drift} commands started at a different step than recorded")
+    if end is not None:
+        want, got = end["state"], sim.capture_state()
+        q_err = np.abs(np.array(want["q"]) - np.array(got["q"])).max()
+        bodies = [(want["cube"], got["cube"])] if want.get("cube") and got.get("cube") else []
+        bodies += [(m, got["meshes"][name]) for name, m in want.get("meshes", {}).items() if name in got["meshes"]]
+        pos_err = max((np.abs(np.array(a["pos"]) - np.array(b["pos"])).max() for a, b in bodies), default=0.0)
+        print(f"final error vs recording: joints {q_err:.2e} rad, objects {pos_err:.2e} m "
+              f"(steps {sim.step_count} vs {want['step']})")
+    return sim
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay a recorded session headlessly at full speed")
+    ap.add_argument("log", help="recording from /record/start ... /record/stop")
+    ap.add_argument("--out", default=None, help="write frames here (default: recorded paths)")
+    ap.add_argument("--no-frames", action="store_true", help="skip snapshots and capture grids, physics only")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    sim = replay(args.log, args.out, render=not args.no_frames)
+    wall = time.perf_counter() - t0
+    print(f"replayed {sim.sim_time():.1f}s of sim time in {wall:.2f}s wall")
+
+
+if __name__ == "__main__":
+    main()
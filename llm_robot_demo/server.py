@@ -1,354 +1,804 @@
+import io
+import json
 import os
+import threading
 import time
-from typing import List, Optional, Tuple
 
-from flask import Flask, request, jsonify
-import pybullet as p
-import pybullet_data
+_T_IMPORT = time.perf_counter()
+
 import numpy as np
-from PIL import Image
+from flask import Blueprint, Flask, Response, current_app, request, jsonify
+
+from recorder import CommandRecorder
+
+
+IMPORT_MS = (time.perf_counter() - _T_IMPORT) * 1000.0
 
+api = Blueprint("api", __name__)
 
-app = Flask(__name__)
 
+class SimContext:
+    """The simulator and its helpers for one app. Nothing touches PyBullet until the
+    first request (or `eager=True`), so importing/creating the app stays cheap."""
 
-class PandaSim:
-    def __init__(self, gui: bool = True):
+    def __init__(self, gui: bool = False, preview_fps: float = 5.0, reach_dir: str = "reach_index"):
         self.gui = gui
-        self.physics = p.connect(p.GUI if gui else p.DIRECT)
-        p.resetSimulation()
-        p.setAdditionalSearchPath(pybullet_data.getDataPath())
-        p.setGravity(0, 0, -9.81)
-        p.loadURDF("plane.urdf")
-        self.panda = p.loadURDF(
-            fileName=os.path.join(pybullet_data.getDataPath(), "franka_panda/panda.urdf"),
-            basePosition=[0, 0, 0],
-            useFixedBase=True,
-        )
-        arm_idxs = []
-        finger_idxs = []
-        self.ee_index = 11
-        for i in range(p.getNumJoints(self.panda)):
-            info = p.getJointInfo(self.panda, i)
-            jtype = info[2]
-            jname = info[1].decode("utf-8", errors="ignore")
-            if jtype == p.JOINT_REVOLUTE:
-                arm_idxs.append(i)
-            if "finger" in jname:
-                finger_idxs.append(i)
-        self.arm_joint_indices: List[int] = arm_idxs
-        self.finger_joint_indices: List[int] = finger_idxs
-        self.cube_id: Optional[int] = None
-        self.grasp_cid: Optional[int] = None
-        self.pose_log: List[dict] = []
-        self.t0 = time.time()
-        self.reset()
-
-    def now(self) -> float:
-        return time.time() - self.t0
-
-    def log_pose(self):
-        ee_p, ee_q = self.get_ee_pose()
-        cb_p, cb_q = self.get_cube_pose()
-        self.pose_log.append({
-            "t": self.now(),
-            "ee": {"pos": ee_p, "orn_xyzw": ee_q},
-            "cube": {"pos": cb_p, "orn_xyzw": cb_q},
-        })
-        if len(self.pose_log) > 5000:
-            self.pose_log = self.pose_log[-5000:]
-
-    def reset(self):
-        target = [0, -0.4, 0, -2.0, 0, 1.7, 0.8]
-        for j, v in zip(self.arm_joint_indices, target):
-            p.resetJointState(self.panda, j, v)
-        self.set_gripper_width(0.08)
-        p.stepSimulation()
-        self.pose_log = []
-        self.t0 = time.time()
-        self.log_pose()
-
-    def get_joint_positions(self) -> List[float]:
-        return [p.getJointState(self.panda, j)[0] for j in self.arm_joint_indices]
-
-    def get_ee_pose(self) -> Tuple[List[float], List[float]]:
-        pos, orn = p.getLinkState(self.panda, self.ee_index)[:2]
-        return list(pos), list(orn)
-
-    def get_cube_pose(self):
-        if self.cube_id is None:
-            return None, None
-        pos, orn = p.getBasePositionAndOrientation(self.cube_id)
-        return list(pos), list(orn)
-
-    def movej(self, targets: List[float], duration: float = 2.0):
-        start = np.array(self.get_joint_positions(), dtype=float)
-        goal = np.array(targets, dtype=float)
-        steps = max(1, int(duration / 0.01))
-        for k in range(steps):
-            alpha = (k + 1) / steps
-            q = (1 - alpha) * start + alpha * goal
-            p.setJointMotorControlArray(
-                self.panda,
-                self.arm_joint_indices,
-                p.POSITION_CONTROL,
-                targetPositions=q.tolist(),
-                forces=[87.0] * len(self.arm_joint_indices),
-            )
-            p.stepSimulation()
-            self.log_pose()
-            time.sleep(0.01)
-
-    def move_ik(self, pos: List[float], orn: Optional[List[float]] = None, duration: float = 1.5):
-        if orn is None:
-            _, orn_cur = self.get_ee_pose()
-            orn = orn_cur
-        ik_all = p.calculateInverseKinematics(
-            self.panda,
-            self.ee_index,
-            targetPosition=pos,
-            targetOrientation=orn,
-        )
-        # Map IK solution to our arm joint indices by index
-        targets = [ik_all[j] for j in self.arm_joint_indices]
-        self.movej(targets, duration)
-
-    def set_gripper_width(self, width: float):
-        width = float(max(0.0, min(0.08, width)))
-        target = width * 0.5
-        if self.finger_joint_indices:
-            p.setJointMotorControlArray(
-                self.panda,
-                self.finger_joint_indices,
-                p.POSITION_CONTROL,
-                targetPositions=[target] * len(self.finger_joint_indices),
-                forces=[20.0] * len(self.finger_joint_indices),
-            )
-            for _ in range(30):
-                p.stepSimulation()
-                self.log_pose()
-                time.sleep(0.005)
-
-    def spawn_cube(self, pos=None):
-        if pos is None:
-            pos = [0.5, 0.0, 0.025]
-        if self.cube_id is not None:
-            try:
-                p.removeBody(self.cube_id)
-            except Exception:
-                pass
-            self.cube_id = None
-        self.cube_id = p.loadURDF(
-            os.path.join(pybullet_data.getDataPath(), "cube_small.urdf"),
-            pos,
-            globalScaling=1.0,
-            useFixedBase=False,
-        )
-        p.changeDynamics(self.cube_id, -1, lateralFriction=1.2, rollingFriction=0.002, spinningFriction=0.002, linearDamping=0.02, angularDamping=0.02)
-        self.log_pose()
-        return self.cube_id
-
-    def try_grasp_constraint(self, threshold: float = 0.08):
-        if self.cube_id is None:
-            return False
-        ee = p.getLinkState(self.panda, self.ee_index)[0]
-        cube = p.getBasePositionAndOrientation(self.cube_id)[0]
-        dist = np.linalg.norm(np.array(ee) - np.array(cube))
-        if dist < threshold:
-            return self.force_grasp()
-        return False
-
-    def force_grasp(self):
-        if self.cube_id is None:
-            return False
-        if self.grasp_cid is not None:
-            try:
-                p.removeConstraint(self.grasp_cid)
-            except Exception:
-                pass
-            self.grasp_cid = None
-        self.grasp_cid = p.createConstraint(
-            parentBodyUniqueId=self.panda,
-            parentLinkIndex=self.ee_index,
-            childBodyUniqueId=self.cube_id,
-            childLinkIndex=-1,
-            jointType=p.JOINT_FIXED,
-            jointAxis=[0, 0, 0],
-            parentFramePosition=[0, 0, 0.035],
-            childFramePosition=[0, 0, 0],
-        )
-        p.stepSimulation()
-        self.log_pose()
-        return True
-
-    def align_cube_to_ee(self, offset=None):
-        if self.cube_id is None:
-            return False
-        if offset is None:
-            offset = [0, 0, -0.06]
-        ee_pos, ee_orn = p.getLinkState(self.panda, self.ee_index)[:2]
-        target_pos = (np.array(ee_pos) + np.array(offset)).tolist()
-        p.resetBasePositionAndOrientation(self.cube_id, target_pos, ee_orn)
-        p.stepSimulation()
-        self.log_pose()
-        return True
-
-    def release_constraint(self):
-        if self.grasp_cid is not None:
-            try:
-                p.removeConstraint(self.grasp_cid)
-            except Exception:
-                pass
-            self.grasp_cid = None
-        self.log_pose()
-
-    def snapshot(self, path: str) -> str:
-        width, height = 640, 480
-        view_matrix = p.computeViewMatrixFromYawPitchRoll(
-            cameraTargetPosition=[0.4, 0.0, 0.2],
-            distance=1.1,
-            yaw=45,
-            pitch=-30,
-            roll=0,
-            upAxisIndex=2,
-        )
-        proj_matrix = p.computeProjectionMatrixFOV(
-            fov=60, aspect=width / height, nearVal=0.01, farVal=3.0
-        )
-        img = p.getCameraImage(
-            width,
-            height,
-            viewMatrix=view_matrix,
-            projectionMatrix=proj_matrix,
-            renderer=p.ER_TINY_RENDERER,
-        )
-        rgba = np.array(img[2], dtype=np.uint8).reshape((height, width, 4))
-        rgb = rgba[:, :, :3]
-        im = Image.fromarray(rgb, mode="RGB")
-        im.save(path)
-        return path
-
-
-_use_gui = os.environ.get("PYBULLET_GUI", "0") == "1"
-sim = PandaSim(gui=_use_gui)
-
-
-@app.route("/state", methods=["GET"])
+        self.preview_fps = preview_fps
+        self.reach_dir = reach_dir
+        self.timings = {"import_ms": IMPORT_MS}
+        self._lock = threading.Lock()
+        self._sim = None
+        self._preview = None
+        self._planner = None
+        self._compiler = None
+        self._mesh_warmer = None
+        # Active profiler.SamplingProfiler while /admin/profile runs
+        self.profiler = None
+        self.profile_lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._sim is not None
+
+    def sim(self):
+        if self._sim is None:
+            with self._lock:
+                if self._sim is None:
+                    t0 = time.perf_counter()
+                    from panda_sim import PandaSim
+                    from reachability import ReachabilityIndex
+                    t1 = time.perf_counter()
+                    sim = PandaSim(gui=self.gui)
+                    if os.path.exists(os.path.join(self.reach_dir, "meta.json")):
+                        # Arrays are memory-mapped on the first query
+                        sim.reach_index = ReachabilityIndex(self.reach_dir)
+                    t2 = time.perf_counter()
+                    self.timings["sim_import_ms"] = (t1 - t0) * 1000.0
+                    self.timings["sim_create_ms"] = (t2 - t1) * 1000.0
+                    self._sim = sim
+        return self._sim
+
+    def preview(self):
+        if self._preview is None:
+            sim = self.sim()
+            with self._lock:
+                if self._preview is None:
+                    from preview import PreviewStream
+                    self._preview = PreviewStream(sim, fps=self.preview_fps)
+        return self._preview
+
+    def compiler(self):
+        if self._compiler is None:
+            with self._lock:
+                if self._compiler is None:
+                    from plan_compiler import PlanCompiler, backend_from_env
+                    self._compiler = PlanCompiler(backend_from_env())
+        return self._compiler
+
+    def mesh_warmer(self):
+        if self._mesh_warmer is None:
+            with self._lock:
+                if self._mesh_warmer is None:
+                    from mesh_assets import MeshWarmer
+                    self._mesh_warmer = MeshWarmer()
+        return self._mesh_warmer
+
+    def servo(self):
+        sim = self.sim()
+        if sim.servo is None:
+            with self._lock:
+                if sim.servo is None:
+                    from servo import ServoController
+                    sim.servo = ServoController(sim)
+        return sim.servo
+
+    def planner(self):
+        # Created on first use: it opens a second (DIRECT) physics client
+        if self._planner is None:
+            sim = self.sim()
+            with self._lock, sim.lock:
+                if self._planner is None:
+                    from planner import MotionPlanner
+                    self._planner = MotionPlanner(sim)
+        return self._planner
+
+
+def create_app(gui: bool = None, preview_fps: float = None, reach_dir: str = None, eager: bool = None,
+               warm_assets: bool = True) -> Flask:
+    """Build the Flask app; arguments default to the PYBULLET_GUI, PREVIEW_FPS, REACH_INDEX
+    and SIM_EAGER environment variables. With a GUI the sim is always created here, so call
+    this on the main thread."""
+    t0 = time.perf_counter()
+    env = os.environ
+    ctx = SimContext(
+        gui=env.get("PYBULLET_GUI", "0") == "1" if gui is None else gui,
+        preview_fps=float(env.get("PREVIEW_FPS", 5.0)) if preview_fps is None else preview_fps,
+        reach_dir=env.get("REACH_INDEX", "reach_index") if reach_dir is None else reach_dir,
+    )
+    app = Flask(__name__)
+    app.extensions["sim_context"] = ctx
+    app.register_blueprint(api)
+    if warm_assets:
+        # Pull the URDFs/meshes into the page cache while the first request is still pending
+        def _warm():
+            import assets
+            ctx.timings["asset_warm"] = assets.warm()
+        threading.Thread(target=_warm, name="asset-warm", daemon=True).start()
+    ctx.timings["create_app_ms"] = (time.perf_counter() - t0) * 1000.0
+    eager = (env.get("SIM_EAGER", "0") == "1") if eager is None else eager
+    # GUI connections must be opened on the main thread (macOS and some other backends),
+    # so only DIRECT sims are left to the first request's worker thread
+    if eager or ctx.gui:
+        ctx.sim()
+    return app
+
+
+def sim_context() -> SimContext:
+    return current_app.extensions["sim_context"]
+
+
+def current_sim():
+    return sim_context().sim()
+
+
+def settle_opts(body: dict) -> dict:
+    # Optional convergence-based termination: {"settle": true, "pos_tol", "vel_tol", "max_steps"}
+    if not body.get("settle"):
+        return {}
+    opts = {"settle": True}
+    for key, cast in (("pos_tol", float), ("vel_tol", float), ("max_steps", int)):
+        if key in body:
+            opts[key] = cast(body[key])
+    return opts
+
+
+def servo_conflict(sim):
+    """409 response if servo mode owns the arm, else None; call with sim.lock held."""
+    if sim.arm_busy():
+        return jsonify({"error": "servo mode is active; POST /servo/stop first"}), 409
+    return None
+
+
+def _npz_response(arrays: dict) -> Response:
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return Response(buf.getvalue(), mimetype="application/octet-stream")
+
+
+@api.route("/state", methods=["GET"])
 def state():
-    return jsonify({"joints": sim.get_joint_positions()})
+    sim = current_sim()
+    with sim.lock:
+        return jsonify({"joints": sim.get_joint_positions()})
 
 
-@app.route("/poses", methods=["GET"])
+@api.route("/poses", methods=["GET"])
 def poses():
-    ee_p, ee_q = sim.get_ee_pose()
-    cb_p, cb_q = sim.get_cube_pose()
+    sim = current_sim()
+    with sim.lock:
+        ee_p, ee_q = sim.get_ee_pose()
+        cb_p, cb_q = sim.get_cube_pose()
+        t = sim.now()
     return jsonify({
-        "t": sim.now(),
+        "t": t,
         "ee": {"pos": ee_p, "orn_xyzw": ee_q},
         "cube": {"pos": cb_p, "orn_xyzw": cb_q}
     })
 
 
-@app.route("/pose_log_reset", methods=["POST"])
+@api.route("/pose_log_reset", methods=["POST"])
 def pose_log_reset():
-    sim.pose_log = []
-    sim.t0 = time.time()
-    sim.log_pose()
+    sim = current_sim()
+    with sim.lock:
+        sim.pose_log.clear()
+        sim.t0 = time.time()
+        sim.log_pose()
     return jsonify({"ok": True})
 
 
-@app.route("/pose_log_dump", methods=["GET"])
+@api.route("/pose_log_dump", methods=["GET"])
 def pose_log_dump():
-    return jsonify({"log": sim.pose_log})
-
-
-@app.route("/movej", methods=["POST"])
+    # JSON: the `last` rows as dicts. format=npz: the whole log as NumPy columns (see
+    # pose_log.py) in one response; `every` decimates
+    sim = current_sim()
+    fmt = request.args.get("format", "json")
+    with sim.lock:
+        if fmt == "npz":
+            cols = sim.pose_log.arrays(int(request.args.get("every", 1)))
+        else:
+            log = sim.pose_log.records(int(request.args.get("last", 5000)))
+    if fmt != "npz":
+        return jsonify({"log": log})
+    return _npz_response(cols)
+
+
+@api.route("/events", methods=["GET"])
+def events():
+    # Contact/grasp events after `since`; `wait` long-polls up to that many seconds
+    sim = current_sim()
+    since = int(request.args.get("since", 0))
+    wait = min(30.0, float(request.args.get("wait", 0)))
+    evs = sim.events.since(since, timeout=wait)
+    return jsonify({"events": evs, "next": evs[-1]["seq"] if evs else since})
+
+
+@api.route("/events/stream", methods=["GET"])
+def events_stream():
+    sim = current_sim()
+    since = int(request.args.get("since", sim.events.last_seq))
+
+    def gen(seq):
+        while True:
+            evs = sim.events.since(seq, timeout=15.0)
+            if not evs:
+                yield ": keep-alive\n\n"
+                continue
+            for e in evs:
+                seq = e["seq"]
+                yield f"id: {seq}\nevent: {e['type']}\ndata: {json.dumps(e)}\n\n"
+
+    return Response(gen(since), mimetype="text/event-stream")
+
+
+@api.route("/stream.mjpg", methods=["GET"])
+def stream_mjpg():
+    preview = sim_context().preview()
+    preview.start()
+    return Response(preview.frames(), mimetype="multipart/x-mixed-replace; boundary=frame")
+
+
+@api.route("/stream_stats", methods=["GET"])
+def stream_stats():
+    return jsonify(sim_context().preview().stats())
+
+
+@api.route("/movej", methods=["POST"])
 def movej_route():
+    sim = current_sim()
     body = request.get_json(force=True)
     targets = body.get("targets")
     duration = float(body.get("duration", 2.0))
     if not isinstance(targets, list) or len(targets) != len(sim.arm_joint_indices):
         return jsonify({"error": f"targets must be list of length {len(sim.arm_joint_indices)}"}), 400
-    sim.movej(targets, duration)
-    return jsonify({"ok": True, "final": sim.get_joint_positions()})
-
-
-@app.route("/move_ik", methods=["POST"])
+    with sim.lock:
+        busy = servo_conflict(sim)
+        if busy:
+            return busy
+        s0 = sim.step_count
+        sim.movej(targets, duration, **settle_opts(body))
+        final = sim.get_joint_positions()
+        steps = sim.step_count - s0
+    return jsonify({"ok": True, "final": final, "steps": steps})
+
+
+@api.route("/move_ik", methods=["POST"])
 def move_ik_route():
+    sim = current_sim()
     body = request.get_json(force=True)
     pos = body.get("pos")
     orn = body.get("orn")
     duration = float(body.get("duration", 1.5))
     if not isinstance(pos, list) or len(pos) != 3:
         return jsonify({"error": "pos must be [x,y,z]"}), 400
-    sim.move_ik(pos, orn, duration)
-    return jsonify({"ok": True})
-
-
-@app.route("/snapshot", methods=["POST"])
+    with sim.lock:
+        busy = servo_conflict(sim)
+        if busy:
+            return busy
+        # Opt-in: the index is approximate (cell centres, few seeds) and can reject reachable targets
+        if body.get("check_reach", False) and sim.reachable(pos, orn) is False:
+            return jsonify({"ok": False, "error": "target unreachable (reachability index)"}), 422
+        s0 = sim.step_count
+        sim.move_ik(pos, orn, duration, **settle_opts(body))
+        steps = sim.step_count - s0
+    return jsonify({"ok": True, "steps": steps})
+
+
+@api.route("/servo/start", methods=["POST"])
+def servo_start():
+    body = request.get_json(silent=True) or {}
+    servo = sim_context().servo()
+    delay = float(body["delay"]) if "delay" in body else None
+    force = float(body["force"]) if "force" in body else None
+    started = servo.start(delay, force)
+    return jsonify({"ok": True, "started": started, **servo.stats()})
+
+
+@api.route("/servo/stop", methods=["POST"])
+def servo_stop():
+    return jsonify({"ok": True, **sim_context().servo().stop()})
+
+
+@api.route("/servo/status", methods=["GET"])
+def servo_status():
+    return jsonify(sim_context().servo().stats())
+
+
+def _servo_push(servo, sp: dict) -> int:
+    return servo.push(sp.get("q"), sp.get("t"), sp.get("pos"), sp.get("orn"))
+
+
+@api.route("/servo/setpoints", methods=["POST"])
+def servo_setpoints():
+    # JSON {"setpoints": [...]} or one setpoint, or an NDJSON body (one setpoint per line)
+    # that may be streamed chunked for as long as the client likes; each line is queued as
+    # soon as it arrives. Setpoint: {"t": s, "q": [...]} or {"t": s, "pos": [...], "orn": [...]}
+    servo = sim_context().servo()
+    if not servo.running:
+        return jsonify({"error": "servo not running; POST /servo/start first"}), 409
+    accepted, rejected, error = 0, 0, None
+    if request.mimetype == "application/x-ndjson":
+        lines = iter(request.stream.readline, b"")
+        setpoints = (json.loads(line) for line in lines if line.strip())
+    else:
+        body = request.get_json(force=True)
+        setpoints = body.get("setpoints", [body]) if isinstance(body, dict) else body
+    try:
+        for sp in setpoints:
+            try:
+                _servo_push(servo, sp)
+                accepted += 1
+            except (ValueError, TypeError) as e:
+                rejected += 1
+                error = error or str(e)
+    except json.JSONDecodeError as e:
+        error = f"bad NDJSON line: {e}"
+    status = servo.stats()
+    return jsonify({"ok": error is None, "accepted": accepted, "rejected": rejected, "error": error,
+                    "queued": status["queued"], "underruns": status["underruns"]})
+
+
+@api.route("/reachable", methods=["POST"])
+def reachable_route():
+    sim = current_sim()
+    body = request.get_json(force=True)
+    if not isinstance(body.get("pos"), list) or len(body["pos"]) != 3:
+        return jsonify({"error": "pos must be [x,y,z]"}), 400
+    if sim.reach_index is None:
+        return jsonify({"error": "no reachability index loaded (build with reachability.py)"}), 404
+    with sim.lock:
+        orn = body.get("orn") or sim.get_ee_pose()[1]
+    cell = sim.reach_index.query(body.get("pos"), orn)
+    return jsonify({"known": cell is not None, **(cell or {})})
+
+
+@api.route("/plan", methods=["POST"])
+def plan_route():
+    # Collision-free path to joint `targets` (or IK of `pos`/`orn`); executes it unless execute=false
+    sim = current_sim()
+    body = request.get_json(force=True)
+    targets = body.get("targets")
+    if targets is None and body.get("pos") is not None:
+        with sim.lock:
+            targets = sim.solve_ik(body["pos"], body.get("orn"))
+    if not isinstance(targets, list) or len(targets) != len(sim.arm_joint_indices):
+        return jsonify({"error": f"targets must be list of length {len(sim.arm_joint_indices)} (or give pos)"}), 400
+    planner = sim_context().planner()
+    with planner.lock:
+        result = planner.plan(sim, targets, timeout=float(body.get("timeout", 5.0)), seed=body.get("seed"))
+    if not result["ok"]:
+        return jsonify(result), 422
+    if body.get("execute", True):
+        with sim.lock:
+            busy = servo_conflict(sim)
+            if busy:
+                return busy
+            sim.follow_path(result["path"], float(body.get("duration", 2.0)))
+            result["final"] = sim.get_joint_positions()
+    return jsonify(result)
+
+
+@api.route("/command", methods=["POST"])
+def command_route():
+    # Instruction (or an explicit "plan") -> compiled skill plan -> executed, in one request
+    from skills import PlanError, execute_plan, validate_plan
+
+    sim = current_sim()
+    body = request.get_json(force=True)
+    compiler = sim_context().compiler()
+    # One lock from reading the scene to the last step: a concurrent command can't move
+    # objects between compiling against this scene and executing the plan
+    with sim.lock:
+        scene = {"objects": {name: sim.body_pose(b)[0] for name, b in sim.named_bodies().items()
+                             if b not in (sim.plane_id, sim.panda)}}
+        t0 = time.perf_counter()
+        try:
+            if body.get("plan") is not None:
+                plan, cached = validate_plan(body["plan"]), False
+            elif isinstance(body.get("instruction"), str):
+                plan, cached = compiler.compile(body["instruction"], scene)
+            else:
+                return jsonify({"error": "instruction (string) or plan required"}), 400
+        except PlanError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+        out = {"plan": plan, "cached": cached, "compile_ms": (time.perf_counter() - t0) * 1000.0}
+        if not body.get("execute", True):
+            return jsonify({"ok": True, **out})
+        busy = servo_conflict(sim)
+        if busy:
+            return busy
+        result = execute_plan(sim, plan)
+    return jsonify({**result, **out}), 200 if result["ok"] else 422
+
+
+@api.route("/plan_cache", methods=["GET"])
+def plan_cache_stats():
+    return jsonify(sim_context().compiler().stats())
+
+
+@api.route("/snapshot", methods=["POST"])
 def snapshot_route():
     try:
+        sim = current_sim()
         body = request.get_json(silent=True) or {}
         path = body.get("path", os.path.abspath("snapshot.png"))
-        saved = sim.snapshot(path)
-        return jsonify({"ok": True, "path": saved})
+        modalities = body.get("modalities", ["rgb"])
+        camera = body.get("camera", "default")
+        depth_format = body.get("depth_format", "npz")
+        tags = body.get("tags", [])
+        # "manifest": path, or false to skip; default <frame dir>/manifest.jsonl
+        manifest = body.get("manifest", "")
+        if manifest is False:
+            manifest = None
+        # "publish": also write into the shared-memory frame ring ("path": null skips files)
+        publish = bool(body.get("publish", False))
+        with sim.lock:
+            if publish and sim.frame_ring is None:
+                return jsonify({"ok": False, "error": "no frame ring (POST /frame_ring first)"}), 409
+            hits = sim.render_cache.hits
+            files = sim.snapshot(path, modalities, camera, depth_format, tags, manifest, publish)
+            cached = sim.render_cache.hits > hits
+        return jsonify({"ok": True, "path": files.get("rgb", path), "files": files, "cached": cached})
     except Exception as e:
         return jsonify({"ok": False, "error": str(e)}), 500
 
 
-@app.route("/spawn_cube", methods=["POST"])
+@api.route("/capture_grid", methods=["POST"])
+def capture_grid_route():
+    # {"cameras": [...], "lightings": [preset name or {direction, color, ambient, diffuse,
+    #  specular, shadows, name}], "layout": "files"|"stack", "out_dir", "modalities"}.
+    # A stack without out_dir comes back as npz (rgb [C, L, H, W, 3]).
+    sim = current_sim()
+    body = request.get_json(force=True)
+    layout = body.get("layout", "files")
+    manifest = body.get("manifest", "")
+    try:
+        with sim.lock:
+            hits = sim.render_cache.hits
+            out = sim.capture_grid(body.get("out_dir"), body.get("cameras", ["default"]),
+                                   body.get("lightings", ["default"]), body.get("modalities", ["rgb"]), layout,
+                                   body.get("prefix", "grid"), body.get("tags", []),
+                                   None if manifest is False else manifest)
+            cached = sim.render_cache.hits - hits
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    arrays = out.pop("arrays", None)
+    if layout == "stack" and not body.get("out_dir"):
+        return _npz_response({**arrays, "cameras": np.array(out["cameras"]),
+                              "lightings": np.array([l["name"] for l in out["lightings"]])})
+    return jsonify({"ok": True, "cached_renders": cached, **out})
+
+
+@api.route("/frame_ring", methods=["GET", "POST", "DELETE"])
+def frame_ring_route():
+    # POST {name, slots, camera, depth, replace} (re)creates the ring local readers attach to by
+    # name; an existing segment of that name is only replaced with replace=true, never if live
+    sim = current_sim()
+    with sim.lock:
+        if request.method == "POST":
+            body = request.get_json(silent=True) or {}
+            try:
+                sim.open_frame_ring(body.get("name", "panda_frames"), int(body.get("slots", 8)),
+                                    body.get("camera", "default"), bool(body.get("depth", True)),
+                                    replace=bool(body.get("replace", False)))
+            except FileExistsError as e:
+                return jsonify({"open": False, "error": str(e)}), 409
+        elif request.method == "DELETE" and sim.frame_ring is not None:
+            sim.frame_ring.unlink()
+            sim.frame_ring = None
+        ring = sim.frame_ring
+        if ring is None:
+            return jsonify({"open": False})
+        return jsonify({"open": True, "name": ring.name, "slots": ring.slots, "height": ring.height,
+                        "width": ring.width, "depth": ring.has_depth, "published": ring.published})
+
+
+@api.route("/render_cache", methods=["GET", "POST"])
+def render_cache_stats():
+    # POST {"enabled": bool} turns the cache on/off (e.g. for benchmarks); entries are dropped
+    sim = current_sim()
+    with sim.lock:
+        if request.method == "POST":
+            body = request.get_json(silent=True) or {}
+            if "enabled" in body:
+                sim.render_cache.enabled = bool(body["enabled"])
+            sim.render_cache.clear()
+        return jsonify(sim.render_cache.stats())
+
+
+@api.route("/pointcloud", methods=["POST"])
+def pointcloud_route():
+    # Binary float32 cloud, row-major [N, 3] (xyz) or [N, 6] (xyz + rgb); shape in X-Shape
+    sim = current_sim()
+    body = request.get_json(silent=True) or {}
+    camera = body.get("camera", "default")
+    voxel = body.get("voxel")
+    with_rgb = bool(body.get("rgb", False))
+    with sim.lock:
+        named = sim.named_bodies()
+        ids = body.get("ids")
+        if body.get("objects"):
+            missing = [o for o in body["objects"] if o not in named]
+            if missing:
+                return jsonify({"error": f"unknown objects {missing}", "known": sorted(named)}), 400
+            ids = list(ids or []) + [named[o] for o in body["objects"]]
+        frame = sim.render(camera)
+    from pointcloud import frame_to_cloud
+    cloud = frame_to_cloud(frame, ids=ids, voxel=float(voxel) if voxel else None, with_rgb=with_rgb)
+    resp = Response(cloud.tobytes(), mimetype="application/octet-stream")
+    resp.headers["X-Shape"] = f"{cloud.shape[0]},{cloud.shape[1]}"
+    resp.headers["X-Dtype"] = "float32"
+    return resp
+
+
+@api.route("/raycast", methods=["POST"])
+def raycast_route():
+    # Body: float32 [N, 6] (origin xyz, target xyz) as application/octet-stream, or JSON
+    # {"origins", "targets"}. Returns npz columns (body, link, fraction, pos, normal);
+    # ?format=json for JSON. ?threads=N caps PyBullet's worker threads (0 = all cores).
+    from raycast import cast_rays
+
+    sim = current_sim()
+    if request.mimetype == "application/octet-stream":
+        rays = np.frombuffer(request.get_data(), dtype=np.float32)
+        if rays.size % 6:
+            return jsonify({"error": "body must be float32 [N, 6]"}), 400
+        rays = rays.reshape(-1, 6)
+        origins, targets = rays[:, :3], rays[:, 3:]
+    else:
+        body = request.get_json(force=True)
+        origins, targets = np.asarray(body.get("origins", [])), np.asarray(body.get("targets", []))
+    try:
+        with sim.lock:
+            hits = cast_rays(origins, targets, int(request.args.get("threads", 0)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if request.args.get("format") == "json":
+        return jsonify({k: v.tolist() for k, v in hits.items()})
+    return _npz_response(hits)
+
+
+@api.route("/probe_score", methods=["POST"])
+def probe_score_route():
+    # {"points": [[x,y,z], ...], "cameras": ["default"], "clearance": 0.05}
+    from camera import get_camera
+    from raycast import probe_scores
+
+    sim = current_sim()
+    body = request.get_json(force=True)
+    points = np.asarray(body.get("points", []), dtype=np.float64)
+    if points.ndim != 2 or points.shape[1] != 3:
+        return jsonify({"error": "points must be [[x,y,z], ...]"}), 400
+    try:
+        cams = [get_camera(c) for c in body.get("cameras", ["default"])]
+    except KeyError as e:
+        return jsonify({"error": str(e)}), 400
+    with sim.lock:
+        scores = probe_scores(sim, points, cams, clearance=float(body.get("clearance", 0.05)))
+    return jsonify({"cameras": [c.name for c in cams], **{k: v.tolist() for k, v in scores.items()}})
+
+
+@api.route("/spawn_cube", methods=["POST"])
 def spawn_cube():
+    sim = current_sim()
     body = request.get_json(silent=True) or {}
     pos = body.get("pos", [0.5, 0.0, 0.025])
-    cid = sim.spawn_cube(pos)
+    with sim.lock:
+        cid = sim.spawn_cube(pos)
     return jsonify({"ok": True, "cube_id": cid})
 
 
-@app.route("/align_cube_to_ee", methods=["POST"])
+@api.route("/spawn_mesh", methods=["POST"])
+def spawn_mesh():
+    # OBJ/STL -> cached URDF with convex-decomposed collision (mesh_assets.py), then spawn it.
+    # A mesh not in the cache yet is built in a worker process (MeshWarmer): 202 until it is ready.
+    ctx = sim_context()
+    sim = ctx.sim()
+    body = request.get_json(force=True)
+    mesh = body.get("mesh")
+    if not mesh or not os.path.exists(mesh):
+        return jsonify({"error": f"mesh file not found: {mesh}"}), 400
+    name = body.get("name") or os.path.splitext(os.path.basename(mesh))[0]
+    warmer = ctx.mesh_warmer()
+    try:
+        meta = warmer.request(mesh, scale=float(body.get("scale", 1.0)), mass=float(body.get("mass", 0.1)),
+                              vhacd=body.get("vhacd"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:  # the background build failed; the next request retries it
+        return jsonify({"error": f"mesh import failed: {type(e).__name__}: {e}"}), 500
+    if meta is None:
+        return jsonify({"ok": False, "building": True, "mesh": mesh, "pending": warmer.pending()}), 202
+    t0 = time.perf_counter()
+    with sim.lock:
+        bid = sim.spawn_mesh(meta["urdf"], name, body.get("pos", [0.5, 0.0, 0.05]), body.get("orn", [0, 0, 0, 1]),
+                             bool(body.get("fixed", False)))
+    return jsonify({"ok": True, "name": name, "body": bid, "urdf": meta["urdf"], "cached": meta["cached"],
+                    "import_ms": meta["import_ms"], "load_ms": (time.perf_counter() - t0) * 1000.0,
+                    "triangles": meta["triangles"], "hulls": meta["hulls"]})
+
+
+@api.route("/remove_object", methods=["POST"])
+def remove_object():
+    sim = current_sim()
+    body = request.get_json(force=True)
+    with sim.lock:
+        ok = sim.remove_object(body.get("name", ""))
+    return jsonify({"ok": ok}), 200 if ok else 404
+
+
+@api.route("/align_cube_to_ee", methods=["POST"])
 def align_cube_to_ee():
+    sim = current_sim()
     body = request.get_json(silent=True) or {}
     offset = body.get("offset", [0, 0, -0.06])
-    ok = sim.align_cube_to_ee(offset)
+    with sim.lock:
+        ok = sim.align_cube_to_ee(offset)
     return jsonify({"ok": ok})
 
 
-@app.route("/force_grasp", methods=["POST"])
+@api.route("/force_grasp", methods=["POST"])
 def force_grasp():
-    ok = sim.force_grasp()
+    sim = current_sim()
+    with sim.lock:
+        ok = sim.force_grasp()
     return jsonify({"ok": ok})
 
 
-@app.route("/gripper", methods=["POST"])
+@api.route("/gripper", methods=["POST"])
 def gripper():
+    sim = current_sim()
     body = request.get_json(force=True)
     width = float(body.get("width", 0.08))
-    sim.set_gripper_width(width)
-    grasped = False
-    if width <= 0.01:
-        grasped = sim.try_grasp_constraint()
-        if not grasped:
-            sim.align_cube_to_ee([0, 0, -0.06])
-            grasped = sim.force_grasp()
-    return jsonify({"ok": True, "width": width, "grasped": grasped})
+    with sim.lock:
+        s0 = sim.step_count
+        grasped = sim.gripper(width, **settle_opts(body))
+        steps = sim.step_count - s0
+    return jsonify({"ok": True, "width": width, "grasped": grasped, "steps": steps})
 
 
-@app.route("/gripper_raw", methods=["POST"])
+@api.route("/gripper_raw", methods=["POST"])
 def gripper_raw():
+    sim = current_sim()
     body = request.get_json(force=True)
     width = float(body.get("width", 0.08))
-    sim.set_gripper_width(width)
-    return jsonify({"ok": True, "width": width})
+    with sim.lock:
+        s0 = sim.step_count
+        sim.set_gripper_width(width, **settle_opts(body))
+        steps = sim.step_count - s0
+    return jsonify({"ok": True, "width": width, "steps": steps})
 
 
-@app.route("/release", methods=["POST"])
+@api.route("/release", methods=["POST"])
 def release():
-    sim.release_constraint()
-    sim.set_gripper_width(0.05)
-    return jsonify({"ok": True})
+    sim = current_sim()
+    body = request.get_json(silent=True) or {}
+    with sim.lock:
+        s0 = sim.step_count
+        sim.release(**settle_opts(body))
+        steps = sim.step_count - s0
+    return jsonify({"ok": True, "steps": steps})
+
+
+@api.route("/record/start", methods=["POST"])
+def record_start():
+    sim = current_sim()
+    body = request.get_json(silent=True) or {}
+    path = body.get("path", os.path.abspath("session.jsonl.gz"))
+    with sim.lock:
+        if sim.recorder is not None:
+            return jsonify({"error": f"already recording to {sim.recorder.path}"}), 409
+        if body.get("reset", False):
+            # Start from a clean scene: nothing mid-impact whose contact caches a replay can't restore
+            sim.remove_cube()
+            sim.reset()
+        sim.recorder = CommandRecorder(path, sim)
+    return jsonify({"ok": True, "path": path})
+
+
+@api.route("/record/stop", methods=["POST"])
+def record_stop():
+    sim = current_sim()
+    with sim.lock:
+        rec = sim.recorder
+        if rec is None:
+            return jsonify({"error": "not recording"}), 409
+        sim.recorder = None
+        rec.close(sim)
+    return jsonify({"ok": True, "path": rec.path, "commands": rec.count})
+
+
+@api.route("/manifest_reset", methods=["POST"])
+def manifest_reset():
+    sim = current_sim()
+    body = request.get_json(silent=True) or {}
+    path = body.get("path")
+    if not path:
+        return jsonify({"error": "path required"}), 400
+    with sim.lock:
+        sim.manifest_for(path).truncate()
+        sim.pending_tags = []
+    return jsonify({"ok": True, "path": os.path.abspath(path)})
+
+
+@api.route("/stats", methods=["GET"])
+def stats():
+    # Read without sim.lock so monitors stay responsive while commands run
+    sim = current_sim()
+    steps, step_time = sim.step_count, sim.step_time
+    return jsonify({
+        "step_count": steps,
+        "sim_time": steps * sim.dt,
+        "step_time_s": step_time,
+        "physics_steps_per_s": steps / step_time if step_time else 0.0,
+        "uptime_s": time.time() - sim.t_start,
+    })
+
+
+@api.after_app_request
+def _count_profiled_request(response):
+    profiler = sim_context().profiler
+    if profiler is not None:
+        profiler.on_request()
+    return response
+
+
+@api.route("/admin/profile", methods=["GET"])
+def admin_profile():
+    # Sample all threads for `seconds` (max 60), or until `requests` requests finished.
+    # Loopback only unless PROFILE_REMOTE=1; one profile at a time.
+    if request.remote_addr not in ("127.0.0.1", "::1") and os.environ.get("PROFILE_REMOTE") != "1":
+        return jsonify({"error": "profiling is only allowed from localhost"}), 403
+    from profiler import SamplingProfiler
+
+    ctx = sim_context()
+    seconds = min(60.0, float(request.args.get("seconds", 10.0)))
+    n_requests = int(request.args["requests"]) if "requests" in request.args else None
+    prof = SamplingProfiler(float(request.args.get("interval", 0.005)))
+    if not ctx.profile_lock.acquire(blocking=False):
+        return jsonify({"error": "a profile is already running"}), 409
+    try:
+        ctx.profiler = prof
+        prof.run(seconds, n_requests, ignore=[threading.get_ident()])
+    finally:
+        ctx.profiler = None
+        ctx.profile_lock.release()
+    if request.args.get("format") == "json":
+        return jsonify({**prof.summary(), "top": prof.top(int(request.args.get("top", 25)))})
+    headers = {
+        "Content-Disposition": f"attachment; filename=profile_{time.strftime('%Y%m%d_%H%M%S')}.folded",
+        "X-Profile-Samples": str(prof.samples),
+        "X-Profile-Overhead": f"{prof.summary()['overhead']:.4f}",
+    }
+    return Response(prof.collapsed(), mimetype="text/plain", headers=headers)
+
+
+@api.route("/startup", methods=["GET"])
+def startup():
+    # Cold-start timings; sim_* appear once the simulator has been created
+    ctx = sim_context()
+    return jsonify({"sim_started": ctx.started, **ctx.timings})
+
+
+# Cheap: the simulator is only created on the first request (or with SIM_EAGER=1)
+app = create_app()
 
 
 if __name__ == "__main__":
+    # Optional low-latency local transport (see uds_transport.py)
+    uds_path = os.environ.get("UDS_PATH")
+    if uds_path:
+        from uds_transport import serve_in_thread
+        serve_in_thread(app.extensions["sim_context"].sim(), uds_path)
+        print("UDS transport listening on", uds_path)
     port = int(os.environ.get("PORT", 5001))
     app.run(host="0.0.0.0", port=port)
-
-
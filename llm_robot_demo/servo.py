@@ -0,0 +1,186 @@
+"""Streaming setpoint servo mode.
+
+Instead of a chain of tiny blocking /movej calls, a client pushes timestamped setpoints
+(joints, or a Cartesian pose solved with IK on arrival) and moves on. A background thread
+steps the sim at the physics rate (one step per `sim.dt` of wall time) and each tick
+commands the arm to the setpoint trajectory linearly interpolated at that instant.
+
+Timing: setpoint `t` is in the client's clock (seconds). The first setpoint after
+`start()` pins the client clock to the server's, and every setpoint is played back
+`delay` seconds after its time, so that much network jitter is absorbed. Without `t`,
+a setpoint plays back `delay` after it arrives.
+
+Reported in `stats()`:
+    tracking_error   |q_actual - q_target| (max over joints) after each tick: last, max, rms
+    underruns        times the queue ran dry while streaming (the arm holds the last setpoint)
+    late             setpoints that arrived after their playback time (applied at once)
+    overruns         times the loop fell > 0.1 s behind, e.g. a slow request held the lock
+    error            why the loop died, if it did (servo mode is then off; start() again)
+
+Each tick goes through `PandaSim.servo_step`, so a session recorded while servoing replays
+the servoed motion tick by tick. While the servo runs, blocking arm moves (/movej,
+/move_ik, /plan, /command and their UDS ops) are refused with 409.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+import numpy as np
+
+
+class ServoController:
+    def __init__(self, sim, delay: float = 0.05, force: float = 87.0):
+        self.sim = sim
+        self.delay = delay
+        self.force = force
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._reset()
+
+    def _reset(self):
+        self._setpoints = deque()  # (server time, q), increasing time
+        self._prev = None  # last setpoint passed: (time, q)
+        self._offset = None  # server time - client time
+        self._starved = False
+        self._t_start = time.monotonic()
+        self._err_sq = 0.0
+        self.ticks = 0
+        self.accepted = 0
+        self.dropped = 0
+        self.late = 0
+        self.underruns = 0
+        self.underrun_ticks = 0
+        self.overruns = 0
+        self.err_last = 0.0
+        self.err_max = 0.0
+        self.error = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self, delay: Optional[float] = None, force: Optional[float] = None) -> bool:
+        with self._cond:
+            if self._running:
+                return False
+            self._reset()
+            if delay is not None:
+                self.delay = delay
+            if force is not None:
+                self.force = force
+            with self.sim.lock:
+                self._prev = (time.monotonic(), np.array(self.sim.get_joint_positions()))
+            self._running = True
+        self._thread = threading.Thread(target=self._loop, name="servo", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> dict:
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.stats()
+
+    def push(self, q: Optional[List[float]] = None, t: Optional[float] = None,
+             pos: Optional[List[float]] = None, orn: Optional[List[float]] = None) -> int:
+        """Queue one setpoint; returns the queue depth. Raises ValueError on bad input."""
+        if not self._running:
+            raise ValueError("servo not running")
+        if q is None:
+            if pos is None:
+                raise ValueError("setpoint needs q or pos")
+            with self.sim.lock:
+                q = self.sim.solve_ik(pos, orn)
+        q = np.asarray(q, dtype=float)
+        if q.shape != (len(self.sim.arm_joint_indices),):
+            raise ValueError(f"q must have {len(self.sim.arm_joint_indices)} values")
+        now = time.monotonic()
+        with self._cond:
+            if t is None:
+                ts = now + self.delay
+            else:
+                if self._offset is None:
+                    self._offset = now - t
+                ts = t + self._offset + self.delay
+            if self._setpoints and ts <= self._setpoints[-1][0]:
+                self.dropped += 1  # out of order
+                return len(self._setpoints)
+            if ts < now:
+                self.late += 1
+            self._setpoints.append((ts, q))
+            self.accepted += 1
+            return len(self._setpoints)
+
+    def _target(self, now: float):
+        # Caller holds self._cond
+        sp = self._setpoints
+        while sp and sp[0][0] <= now:
+            self._prev = sp.popleft()
+        if not sp:
+            return self._prev[1], True
+        (ta, qa), (tb, qb) = self._prev, sp[0]
+        alpha = min(1.0, max(0.0, (now - ta) / (tb - ta))) if tb > ta else 1.0
+        return qa + alpha * (qb - qa), False
+
+    def _loop(self):
+        # Any failure ends servo mode: clear _running so status and start() see it, and
+        # keep the error for /servo/status
+        try:
+            sim = self.sim
+            next_t = time.monotonic()
+            while self._running:
+                now = time.monotonic()
+                if now < next_t:
+                    time.sleep(next_t - now)
+                elif now - next_t > 0.1:
+                    # Don't replay a backlog of ticks at full speed; resume from now
+                    self.overruns += 1
+                    next_t = now
+                with self._cond:
+                    q, starved = self._target(next_t)
+                    if starved and self.accepted:
+                        self.underrun_ticks += 1
+                        if not self._starved:
+                            self.underruns += 1
+                            sim.events.emit("servo_underrun", t=sim.now(), step=sim.step_count)
+                    self._starved = starved
+                with sim.lock:
+                    sim.servo_step(q.tolist(), self.force)
+                    actual = np.array(sim.get_joint_positions())
+                err = float(np.abs(actual - q).max())
+                self.ticks += 1
+                self.err_last = err
+                self.err_max = max(self.err_max, err)
+                self._err_sq += err * err
+                next_t += sim.dt
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._running = False
+
+    def stats(self) -> dict:
+        elapsed = time.monotonic() - self._t_start
+        return {
+            "running": self._running,
+            "error": self.error,
+            "delay": self.delay,
+            "ticks": self.ticks,
+            "rate_hz": self.ticks / elapsed if elapsed > 0 else 0.0,
+            "queued": len(self._setpoints),
+            "accepted": self.accepted,
+            "dropped": self.dropped,
+            "late": self.late,
+            "underruns": self.underruns,
+            "underrun_ticks": self.underrun_ticks,
+            "overruns": self.overruns,
+            "tracking_error": {
+                "last": self.err_last,
+                "max": self.err_max,
+                "rms": (self._err_sq / self.ticks) ** 0.5 if self.ticks else 0.0,
+            },
+        }
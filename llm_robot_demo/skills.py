@@ -0,0 +1,176 @@
+"""Typed robot skills that a compiled plan is made of (see plan_compiler.py).
+
+A plan is a list of steps `{"skill": name, "args": {...}}`. `validate_plan` checks names
+and argument types against SKILLS and fills in defaults; `execute_plan` runs the steps
+on a PandaSim server-side, taking the sim lock per step so events/preview keep flowing.
+"""
+
+import time
+from typing import Dict, List
+
+import numpy as np
+
+
+HOME = [0, -0.4, 0, -2.0, 0, 1.7, 0.8]
+
+# World-frame unit vectors for relative moves, as seen from the default camera
+DIRECTIONS = {
+    "left": [0.0, 1.0, 0.0],
+    "right": [0.0, -1.0, 0.0],
+    "forward": [1.0, 0.0, 0.0],
+    "back": [-1.0, 0.0, 0.0],
+    "up": [0.0, 0.0, 1.0],
+    "down": [0.0, 0.0, -1.0],
+}
+
+# skill -> {arg: (type, default)}; a default of None means optional
+SKILLS: Dict[str, Dict[str, tuple]] = {
+    "approach": {"object": (str, "cube"), "height": (float, 0.05), "duration": (float, 1.2)},
+    # object defaults to the one the plan last approached
+    "grasp": {"object": (str, None), "width": (float, 0.0)},
+    "lift": {"height": (float, 0.1), "duration": (float, 1.0)},
+    "move": {"direction": (str, None), "distance": (float, 0.2), "pos": (list, None), "duration": (float, 1.5)},
+    "place": {"height": (float, 0.01), "duration": (float, 1.0)},
+    "release": {},
+    "home": {"duration": (float, 1.5)},
+}
+
+
+class PlanError(ValueError):
+    pass
+
+
+def validate_plan(plan: List[dict]) -> List[dict]:
+    """Normalized copy of `plan` with defaults filled in; raises PlanError."""
+    if not isinstance(plan, list) or not plan:
+        raise PlanError("plan must be a non-empty list of steps")
+    out = []
+    for i, step in enumerate(plan):
+        name = step.get("skill") if isinstance(step, dict) else None
+        if name not in SKILLS:
+            raise PlanError(f"step {i}: unknown skill {name!r} (known: {sorted(SKILLS)})")
+        schema = SKILLS[name]
+        given = step.get("args") or {}
+        if not isinstance(given, dict):
+            raise PlanError(f"step {i} ({name}): args must be an object")
+        unknown = set(given) - set(schema)
+        if unknown:
+            raise PlanError(f"step {i} ({name}): unknown args {sorted(unknown)}")
+        args = {}
+        for key, (typ, default) in schema.items():
+            val = given.get(key, default)
+            if val is None:
+                continue
+            if typ is list:
+                # list("abc") would pass as three characters; list args are numeric vectors
+                if not isinstance(val, (list, tuple)) or not all(
+                        isinstance(v, (int, float)) and not isinstance(v, bool) for v in val):
+                    raise PlanError(f"step {i} ({name}): {key} must be a list of numbers")
+                args[key] = [float(v) for v in val]
+                continue
+            try:
+                args[key] = typ(val)
+            except (TypeError, ValueError):
+                raise PlanError(f"step {i} ({name}): {key} must be {typ.__name__}")
+        if name == "move":
+            if "pos" in args and len(args["pos"]) != 3:
+                raise PlanError(f"step {i} (move): pos must be [x,y,z]")
+            if "pos" not in args and args.get("direction") not in DIRECTIONS:
+                raise PlanError(f"step {i} (move): direction must be one of {sorted(DIRECTIONS)} (or give pos)")
+        out.append({"skill": name, "args": args})
+    return out
+
+
+def _graspable(sim, object: str) -> int:
+    body = sim.named_bodies().get(object)
+    if body is None or body in (sim.plane_id, sim.panda):
+        raise PlanError(f"no graspable object {object!r}")
+    return body
+
+
+def _approach(sim, object: str, height: float, duration: float):
+    pos = sim.body_pose(_graspable(sim, object))[0]
+    # Above the object, then straight down to grasp height (as in grab_object_ik.py)
+    sim.set_gripper_width(0.08)
+    sim.move_ik([pos[0] - 0.01, pos[1], pos[2] + height], None, duration)
+    sim.move_ik([pos[0] - 0.01, pos[1], pos[2] + 0.01], None, duration * 0.75)
+
+
+def _grasp(sim, object: str, width: float):
+    # Close on whatever is between the fingers and latch only the named body, and only if
+    # both fingers touch it (sim.gripper() would snap the cube into the hand instead)
+    body = _graspable(sim, object)
+    sim.set_gripper_width(width, settle=True)
+    if not sim.try_grasp_constraint(body):
+        raise PlanError(f"grasp failed: fingers not both in contact with {object!r}")
+
+
+def _lift(sim, height: float, duration: float):
+    pos = sim.get_ee_pose()[0]
+    sim.move_ik([pos[0], pos[1], pos[2] + height], None, duration)
+
+
+def _move(sim, direction: str = None, distance: float = 0.2, pos: list = None, duration: float = 1.5):
+    if pos is None:
+        pos = (np.array(sim.get_ee_pose()[0]) + distance * np.array(DIRECTIONS[direction])).tolist()
+    sim.move_ik(pos, None, duration)
+    # The reachability index only seeds IK; whether the target was reached is checked here
+    err = float(np.linalg.norm(np.array(sim.get_ee_pose()[0]) - np.array(pos)))
+    if err > 0.02:
+        raise PlanError(f"target {np.round(pos, 3).tolist()} not reached (off by {err * 100:.1f} cm)")
+
+
+def _place(sim, height: float, duration: float):
+    # Lower until the held object's underside is `height` above the table, then let go
+    held = sim.attached_body()
+    if held is None:
+        raise PlanError("place: nothing is held")
+    ee = sim.get_ee_pose()[0]
+    drop = sim.body_aabb(held)[0][2] - height
+    sim.move_ik([ee[0], ee[1], ee[2] - max(0.0, drop)], None, duration)
+    sim.release()
+
+
+def _release(sim):
+    sim.release()
+
+
+def _home(sim, duration: float):
+    sim.movej(HOME, duration)
+
+
+_EXECUTORS = {
+    "approach": _approach,
+    "grasp": _grasp,
+    "lift": _lift,
+    "move": _move,
+    "place": _place,
+    "release": _release,
+    "home": _home,
+}
+
+
+def execute_plan(sim, plan: List[dict]) -> dict:
+    """Run validated `plan` on `sim`; stops at the first failing step."""
+    results = []
+    target = "cube"
+    for i, step in enumerate(plan):
+        args = dict(step["args"])
+        if step["skill"] == "approach":
+            target = args["object"]
+        elif step["skill"] == "grasp":
+            args.setdefault("object", target)
+        t0 = time.perf_counter()
+        with sim.lock:
+            s0 = sim.step_count
+            try:
+                _EXECUTORS[step["skill"]](sim, **args)
+                ok, error = True, None
+            except PlanError as e:
+                ok, error = False, str(e)
+            steps = sim.step_count - s0
+        results.append({"skill": step["skill"], "ok": ok, "steps": steps,
+                        "ms": (time.perf_counter() - t0) * 1000.0, **({"error": error} if error else {})})
+        if not ok:
+            return {"ok": False, "failed_step": i, "results": results}
+    return {"ok": True, "results": results}
@@ -0,0 +1,83 @@
+import os
+import socket
+import struct
+from typing import List, Optional
+
+import numpy as np
+
+from uds_transport import (
+    DEFAULT_PATH,
+    OP_GRIPPER,
+    OP_GRIPPER_RAW,
+    OP_MOVE_IK,
+    OP_MOVEJ,
+    OP_SERVO,
+    OP_SNAPSHOT,
+    OP_STATE,
+    STATUS_OK,
+    pack_f64,
+    recv_frame,
+    send_frame,
+    unpack_f64,
+    unpack_image,
+)
+
+
+class UDSClient:
+    """Client for the binary Unix-socket transport (see uds_transport.py)."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get("UDS_PATH", DEFAULT_PATH)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _call(self, op: int, *parts):
+        send_frame(self.sock, op, *parts)
+        status, payload = recv_frame(self.sock)
+        if status != STATUS_OK:
+            raise RuntimeError(bytes(payload).decode("utf-8", errors="replace"))
+        return payload
+
+    def state(self) -> np.ndarray:
+        return unpack_f64(self._call(OP_STATE))
+
+    def movej(self, targets: List[float], duration: float = 2.0) -> np.ndarray:
+        return unpack_f64(self._call(OP_MOVEJ, pack_f64([duration, *targets])))
+
+    def move_ik(self, pos: List[float], orn: Optional[List[float]] = None, duration: float = 1.5) -> np.ndarray:
+        vals = [duration, *pos] + (list(orn) if orn is not None else [])
+        return unpack_f64(self._call(OP_MOVE_IK, pack_f64(vals)))
+
+    def gripper(self, width: float) -> bool:
+        return bool(self._call(OP_GRIPPER, struct.pack("<d", width))[0])
+
+    def gripper_raw(self, width: float) -> int:
+        # Fingers only, like /gripper_raw; returns the physics steps used
+        return struct.unpack("<I", self._call(OP_GRIPPER_RAW, struct.pack("<d", width)))[0]
+
+    def servo(self, targets: List[float], t: Optional[float] = None) -> int:
+        # Queues a setpoint and returns at once (queue depth); motion happens on the servo thread
+        vals = [float("nan") if t is None else t, *targets]
+        return struct.unpack("<I", self._call(OP_SERVO, pack_f64(vals)))[0]
+
+    def snapshot(self, path: Optional[str] = None) -> np.ndarray:
+        payload = path.encode("utf-8") if path else b""
+        return unpack_image(self._call(OP_SNAPSHOT, payload))
+
+
+if __name__ == "__main__":
+    with UDSClient() as c:
+        print("Current joints:", c.state())
+        print("Moving to demo pose...")
+        print(c.movej([0.0, -0.3, 0.0, -1.8, 0.0, 1.6, 0.7], duration=3.0))
+        img = c.snapshot()
+        print("snapshot", img.shape, img.dtype)
@@ -0,0 +1,202 @@
+"""Length-prefixed binary RPC over a Unix domain socket.
+
+Same operations as the REST API, without HTTP/JSON on the hot path.
+
+Frame layout (little endian):
+    request:  u32 length | u8 op     | payload
+    response: u32 length | u8 status | payload
+`length` counts the bytes after the length field (op/status + payload).
+
+Payloads:
+    STATE     req: -                                   resp: f64[n] joints
+    MOVEJ     req: f64 duration, f64[n] targets        resp: f64[n] final joints
+    MOVE_IK   req: f64 duration, f64[3] pos [, f64[4] orn]
+                                                       resp: f64[n] final joints
+    GRIPPER   req: f64 width                           resp: u8 grasped
+    GRIPPER_RAW req: f64 width                         resp: u32 steps  (fingers only, no latching)
+    SNAPSHOT  req: [utf-8 path to also save a PNG]     resp: u16 h, u16 w, u8 c, u8[h*w*c]
+              (same as POST /snapshot: recorded; a saved PNG goes into its default manifest)
+    SERVO     req: f64 t (NaN: on arrival), f64[n] q  resp: u32 queued setpoints
+              (queues a servo setpoint without waiting for motion; start with POST /servo/start)
+Errors come back with status 1 and a utf-8 message.
+"""
+
+import os
+import socket
+import socketserver
+import stat
+import struct
+import threading
+
+import numpy as np
+
+
+DEFAULT_PATH = "/tmp/panda_sim.sock"
+
+OP_STATE = 1
+OP_MOVEJ = 2
+OP_MOVE_IK = 3
+OP_GRIPPER = 4
+OP_SNAPSHOT = 5
+OP_SERVO = 6
+OP_GRIPPER_RAW = 7
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+HEAD = struct.Struct("<IB")
+IMG_HEAD = struct.Struct("<HHB")
+F64 = np.dtype("<f8")
+
+
+def recv_exact(sock: socket.socket, n: int) -> bytearray:
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        k = sock.recv_into(view[got:], n - got)
+        if k == 0:
+            raise ConnectionError("socket closed")
+        got += k
+    return buf
+
+
+def send_frame(sock: socket.socket, code: int, *parts) -> None:
+    # Scatter-gather send so large image payloads are not concatenated/copied
+    size = sum(len(memoryview(b).cast("B")) for b in parts)
+    sock.sendmsg([HEAD.pack(size + 1, code), *parts])
+
+
+def recv_frame(sock: socket.socket):
+    length, code = HEAD.unpack(recv_exact(sock, HEAD.size))
+    payload = recv_exact(sock, length - 1) if length > 1 else bytearray()
+    return code, payload
+
+
+def pack_f64(values) -> bytes:
+    return np.ascontiguousarray(values, dtype=F64).tobytes()
+
+
+def unpack_f64(buf) -> np.ndarray:
+    return np.frombuffer(buf, dtype=F64)
+
+
+def pack_image(img: np.ndarray):
+    img = np.ascontiguousarray(img, dtype=np.uint8)
+    h, w = img.shape[:2]
+    c = img.shape[2] if img.ndim == 3 else 1
+    return IMG_HEAD.pack(h, w, c), memoryview(img).cast("B")
+
+
+def unpack_image(buf) -> np.ndarray:
+    h, w, c = IMG_HEAD.unpack_from(buf)
+    img = np.frombuffer(buf, dtype=np.uint8, offset=IMG_HEAD.size, count=h * w * c)
+    return img.reshape((h, w, c)) if c > 1 else img.reshape((h, w))
+
+
+def _dispatch(sim, op: int, payload) -> tuple:
+    n = len(sim.arm_joint_indices)
+    if op == OP_STATE:
+        with sim.lock:
+            return (pack_f64(sim.get_joint_positions()),)
+    if op == OP_MOVEJ:
+        vals = unpack_f64(payload)
+        if len(vals) != n + 1:
+            raise ValueError(f"movej expects duration + {n} targets")
+        with sim.lock:
+            if sim.arm_busy():
+                raise ValueError("servo mode is active")
+            sim.movej(vals[1:].tolist(), float(vals[0]))
+            return (pack_f64(sim.get_joint_positions()),)
+    if op == OP_MOVE_IK:
+        vals = unpack_f64(payload)
+        if len(vals) not in (4, 8):
+            raise ValueError("move_ik expects duration, pos[3] and optional orn[4]")
+        orn = vals[4:8].tolist() if len(vals) == 8 else None
+        with sim.lock:
+            if sim.arm_busy():
+                raise ValueError("servo mode is active")
+            sim.move_ik(vals[1:4].tolist(), orn, float(vals[0]))
+            return (pack_f64(sim.get_joint_positions()),)
+    if op == OP_GRIPPER:
+        (width,) = struct.unpack("<d", payload)
+        with sim.lock:
+            grasped = sim.gripper(width)
+        return (struct.pack("<B", int(grasped)),)
+    if op == OP_GRIPPER_RAW:
+        (width,) = struct.unpack("<d", payload)
+        with sim.lock:
+            s0 = sim.step_count
+            sim.set_gripper_width(width)
+            return (struct.pack("<I", sim.step_count - s0),)
+    if op == OP_SNAPSHOT:
+        # Through sim.snapshot like POST /snapshot: recorded, counted, and saved frames
+        # go into the default manifest
+        path = bytes(payload).decode("utf-8") if payload else None
+        with sim.lock:
+            sim.snapshot(path)
+            rgb = sim.last_frame.rgb
+        return pack_image(rgb)
+    if op == OP_SERVO:
+        vals = unpack_f64(payload)
+        if len(vals) != n + 1:
+            raise ValueError(f"servo expects t + {n} targets")
+        if sim.servo is None:
+            raise ValueError("servo not running")
+        t = None if np.isnan(vals[0]) else float(vals[0])
+        return (struct.pack("<I", sim.servo.push(vals[1:].tolist(), t)),)
+    raise ValueError(f"unknown op {op}")
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sim = self.server.sim
+        sock = self.request
+        while True:
+            try:
+                op, payload = recv_frame(sock)
+            except (ConnectionError, struct.error):
+                return
+            try:
+                parts = _dispatch(sim, op, payload)
+                send_frame(sock, STATUS_OK, *parts)
+            except Exception as e:
+                send_frame(sock, STATUS_ERROR, str(e).encode("utf-8"))
+
+
+def _remove_stale_socket(path: str) -> None:
+    """Unlink a socket left behind by a dead server; refuse if one still answers."""
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        pass
+    else:
+        raise FileExistsError(f"another server is listening on {path}")
+    finally:
+        probe.close()
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class UDSServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, sim):
+        _remove_stale_socket(path)
+        self.sim = sim
+        super().__init__(path, _Handler)
+
+
+def serve_in_thread(sim, path: str = DEFAULT_PATH) -> UDSServer:
+    server = UDSServer(path, sim)
+    threading.Thread(target=server.serve_forever, name="uds-transport", daemon=True).start()
+    return server
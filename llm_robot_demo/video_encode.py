@@ -0,0 +1,118 @@
+"""Chunked multi-process H.264 encoding for long frame sequences.
+
+Frames are split into GOP-aligned chunks (every chunk starts on a keyframe and
+GOPs are closed), each chunk is encoded by its own process with the same encoder
+settings as the serial path, and the pieces are joined losslessly with the ffmpeg
+concat demuxer (`-c copy`). Frame count and timing match a serial encode.
+"""
+
+import argparse
+import glob
+import math
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence
+
+
+def _writer_params(gop: int) -> List[str]:
+    # Fixed, closed GOPs so chunk boundaries always fall on a keyframe
+    return [
+        "-g", str(gop),
+        "-keyint_min", str(gop),
+        "-sc_threshold", "0",
+        "-x264-params", f"keyint={gop}:min-keyint={gop}:scenecut=0:open-gop=0",
+    ]
+
+
+def _encode_chunk(frames: Sequence[str], out_path: str, fps: float, gop: int, codec: str,
+                  transform: Optional[Callable] = None) -> str:
+    import imageio.v2 as imageio
+
+    writer = imageio.get_writer(out_path, fps=fps, codec=codec, ffmpeg_params=_writer_params(gop))
+    try:
+        for fn in frames:
+            img = imageio.imread(fn)
+            if transform is not None:
+                img = transform(fn, img)
+            writer.append_data(img)
+    finally:
+        writer.close()
+    return out_path
+
+
+def _concat(parts: Sequence[str], out_path: str, workdir: str):
+    import imageio_ffmpeg
+
+    list_file = os.path.join(workdir, "parts.txt")
+    with open(list_file, "w") as f:
+        for part in parts:
+            f.write(f"file '{os.path.abspath(part)}'\n")
+    cmd = [
+        imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-loglevel", "error",
+        "-f", "concat", "-safe", "0", "-i", list_file,
+        "-c", "copy", "-movflags", "+faststart", out_path,
+    ]
+    subprocess.run(cmd, check=True)
+
+
+def encode_video(
+    frames: Sequence[str],
+    out_path: str,
+    fps: float = 30,
+    workers: Optional[int] = None,
+    gop: Optional[int] = None,
+    codec: str = "libx264",
+    transform: Optional[Callable] = None,
+) -> str:
+    """Encode image files to `out_path`; parallel when there are enough frames.
+
+    `transform(path, img) -> img` runs in the worker processes, so it must be a
+    module-level (picklable) function.
+    """
+    frames = list(frames)
+    if not frames:
+        raise ValueError("no frames to encode")
+    gop = gop or max(1, int(round(fps * 2)))
+    workers = workers or os.cpu_count() or 1
+    # Chunk length is a whole number of GOPs
+    chunk = max(1, math.ceil(len(frames) / workers / gop)) * gop
+    if workers <= 1 or len(frames) <= chunk:
+        return _encode_chunk(frames, out_path, fps, gop, codec, transform)
+
+    with tempfile.TemporaryDirectory(prefix="chunks_", dir=os.path.dirname(os.path.abspath(out_path))) as tmp:
+        pieces = [frames[i:i + chunk] for i in range(0, len(frames), chunk)]
+        parts = [os.path.join(tmp, f"part_{k:04d}.mp4") for k in range(len(pieces))]
+        with ProcessPoolExecutor(max_workers=min(workers, len(pieces))) as pool:
+            futures = [
+                pool.submit(_encode_chunk, piece, part, fps, gop, codec, transform)
+                for piece, part in zip(pieces, parts)
+            ]
+            for fut in futures:
+                fut.result()
+        _concat(parts, out_path, tmp)
+    return out_path
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Encode a frame sequence, in parallel chunks when long")
+    ap.add_argument("pattern", help="glob for input frames, e.g. 'frames/pp_*.png'")
+    ap.add_argument("out", help="output .mp4")
+    ap.add_argument("--fps", type=float, default=30)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--gop", type=int, default=None)
+    args = ap.parse_args()
+
+    frames = sorted(glob.glob(args.pattern))
+    if not frames:
+        raise SystemExit(f"No frames match {args.pattern}")
+    encode_video(frames, args.out, fps=args.fps, workers=args.workers, gop=args.gop)
+
+    import imageio_ffmpeg
+    nframes, secs = imageio_ffmpeg.count_frames_and_secs(args.out)
+    print("wrote", os.path.abspath(args.out), f"({nframes} frames, {secs:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()